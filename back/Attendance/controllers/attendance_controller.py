@@ -1,17 +1,34 @@
 import httpx
 from fastapi import HTTPException
-from datetime import datetime
-from typing import Dict, List
+from datetime import datetime, date
+from typing import Dict, List, Tuple
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.attendance import AttendanceRecord, Excuse, ExcuseApproval
+from models.attendance import AttendanceRecord, Excuse, ExcuseApproval, ExcuseBulkApproval
 from utils.supabase import (
     SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE_KEY,
     get_tenant_from_email, get_tenant_info, get_user_by_email
 )
+from utils.attendance_snapshot import (
+    get_attendance_matrix, get_attendance_rollup, apply_attendance_rows, refresh_attendance_days
+)
+from utils.excuse_events import excuse_hub
+from utils.pagination import DEFAULT_LIMIT, keyset_params, select_param, parse_total, page_response
+
+# Máximo de ids por filtro id=in.(...) para no exceder el largo de URL
+IN_FILTER_CHUNK = 200
+
+# Rango máximo del mapa de calor (un año)
+MAX_HEATMAP_DAYS = 366
+
+EXCUSA_COLUMNAS = [
+    "id", "estudiante_id", "curso_id", "fecha_inicio", "fecha_fin", "motivo",
+    "documento_url", "creado_por", "estado", "comentario_director",
+    "aprobado_por", "fecha_aprobacion", "created_at"
+]
 
 class AttendanceController:
     
@@ -55,7 +72,9 @@ class AttendanceController:
                 headers=headers
             )
             if response.status_code in [200, 201]:
-                return {"success": True, "asistencia": response.json()}
+                asistencia = response.json()
+                apply_attendance_rows(schema, asistencia)
+                return {"success": True, "asistencia": asistencia}
             else:
                 raise HTTPException(status_code=500, detail=f"Error al registrar asistencia: {response.text}")
     
@@ -100,7 +119,9 @@ class AttendanceController:
                 headers=headers
             )
             if response.status_code in [200, 201]:
-                return {"success": True, "excusa": response.json()}
+                excusa = response.json()
+                excuse_hub.publish(schema, "excusa_creada", excusa)
+                return {"success": True, "excusa": excusa}
             else:
                 raise HTTPException(status_code=500, detail=f"Error al crear excusa: {response.text}")
     
@@ -140,10 +161,83 @@ class AttendanceController:
                 headers=headers
             )
             if response.status_code == 200:
-                return {"success": True, "excusa": response.json()}
+                excusa = response.json()
+                excuse_hub.publish(schema, "excusa_actualizada", excusa)
+                return {"success": True, "excusa": excusa}
             else:
                 raise HTTPException(status_code=500, detail=f"Error al aprobar excusa: {response.text}")
     
+    @staticmethod
+    async def approve_excuses_bulk(bulk: ExcuseBulkApproval, email: str) -> Dict:
+        """Aprobar/rechazar varias excusas en una sola operación (solo director)"""
+        tenant_domain = get_tenant_from_email(email)
+        if not tenant_domain:
+            raise HTTPException(status_code=400, detail="Tenant no identificado")
+        
+        tenant_info = await get_tenant_info(tenant_domain)
+        if not tenant_info:
+            raise HTTPException(status_code=404, detail="Tenant no encontrado")
+        
+        schema = tenant_info["schema_name"]
+        user_data = await get_user_by_email(email, schema)
+        if not user_data or user_data.get("rol") not in ["Director", "Admin"]:
+            raise HTTPException(status_code=403, detail="Solo el director puede aprobar excusas")
+        
+        # Una decisión por excusa: si un id se repite, gana la última
+        decisiones = {decision.excuse_id: decision for decision in bulk.decisiones}
+        
+        # Agrupar por (estado, comentario): cada grupo se aplica con un solo PATCH
+        grupos: Dict[Tuple[str, str], List[int]] = {}
+        for decision in decisiones.values():
+            key = (decision.estado, decision.comentario_director)
+            grupos.setdefault(key, []).append(decision.excuse_id)
+        
+        fecha_aprobacion = datetime.utcnow().isoformat()
+        actualizadas = []
+        
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            headers = {
+                "apikey": SUPABASE_SERVICE_ROLE_KEY,
+                "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
+                "Content-Type": "application/json",
+                "Prefer": "return=representation"
+            }
+            table_name = f"{schema}_excusas"
+            for (estado, comentario), ids in grupos.items():
+                payload = {
+                    "estado": estado,
+                    "comentario_director": comentario,
+                    "aprobado_por": user_data["id"],
+                    "fecha_aprobacion": fecha_aprobacion
+                }
+                for i in range(0, len(ids), IN_FILTER_CHUNK):
+                    ids_query = ",".join(map(str, ids[i:i + IN_FILTER_CHUNK]))
+                    response = await client.patch(
+                        f"{SUPABASE_URL}/rest/v1/{table_name}?id=in.({ids_query})",
+                        json=payload,
+                        headers=headers
+                    )
+                    if response.status_code != 200:
+                        raise HTTPException(
+                            status_code=500,
+                            detail=f"Error al aprobar excusas: {response.text}"
+                        )
+                    actualizadas.extend(response.json())
+        
+        # El conteo sale de las filas que devolvió la base, no de lo pedido
+        actualizadas = list({excusa["id"]: excusa for excusa in actualizadas}.values())
+        if actualizadas:
+            excuse_hub.publish(schema, "excusa_actualizada", actualizadas)
+        
+        encontradas = {excusa["id"] for excusa in actualizadas}
+        no_encontradas = sorted(set(decisiones) - encontradas)
+        return {
+            "success": True,
+            "actualizadas": len(actualizadas),
+            "no_encontradas": no_encontradas,
+            "excusas": actualizadas
+        }
+    
     @staticmethod
     async def get_student_attendance(estudiante_id: int, curso_id: int, email: str) -> Dict:
         """Obtener asistencias de un estudiante"""
@@ -203,6 +297,37 @@ class AttendanceController:
             else:
                 raise HTTPException(status_code=500, detail="Error al obtener excusas")
     
+    @staticmethod
+    async def open_pending_excuses_stream(email: str) -> Tuple[str, List[Dict]]:
+        """Autorizar una sola vez el stream SSE de excusas y devolver el snapshot inicial (solo director)"""
+        tenant_domain = get_tenant_from_email(email)
+        if not tenant_domain:
+            raise HTTPException(status_code=400, detail="Tenant no identificado")
+        
+        tenant_info = await get_tenant_info(tenant_domain)
+        if not tenant_info:
+            raise HTTPException(status_code=404, detail="Tenant no encontrado")
+        
+        schema = tenant_info["schema_name"]
+        user_data = await get_user_by_email(email, schema)
+        if not user_data or user_data.get("rol") not in ["Director", "Admin"]:
+            raise HTTPException(status_code=403, detail="Solo el director puede ver excusas pendientes")
+        
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            headers = {
+                "apikey": SUPABASE_ANON_KEY,
+                "Authorization": f"Bearer {SUPABASE_ANON_KEY}"
+            }
+            table_name = f"{schema}_excusas"
+            response = await client.get(
+                f"{SUPABASE_URL}/rest/v1/{table_name}?estado=eq.pendiente&select=*&order=created_at.desc",
+                headers=headers
+            )
+            if response.status_code == 200:
+                return schema, response.json()
+            else:
+                raise HTTPException(status_code=500, detail="Error al obtener excusas")
+    
     @staticmethod
     async def get_attendance_history(curso_id: int, fecha_inicio: str, fecha_fin: str, email: str) -> Dict:
         """Obtener historial de asistencias de un curso (profesores/director)"""
@@ -258,6 +383,7 @@ class AttendanceController:
                 "Prefer": "return=representation"
             }
             table_name = f"{schema}_asistencias"
+            
             payload = {
                 "estado": estado,
                 "observaciones": observaciones
@@ -268,7 +394,9 @@ class AttendanceController:
                 headers=headers
             )
             if response.status_code == 200:
-                return {"success": True, "asistencia": response.json()}
+                asistencia = response.json()
+                await refresh_attendance_days(schema, asistencia)
+                return {"success": True, "asistencia": asistencia}
             else:
                 raise HTTPException(status_code=500, detail=f"Error al actualizar asistencia: {response.text}")
     
@@ -291,7 +419,8 @@ class AttendanceController:
         async with httpx.AsyncClient(timeout=10.0) as client:
             headers = {
                 "apikey": SUPABASE_SERVICE_ROLE_KEY,
-                "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}"
+                "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
+                "Prefer": "return=representation"
             }
             table_name = f"{schema}_asistencias"
             response = await client.delete(
@@ -299,13 +428,58 @@ class AttendanceController:
                 headers=headers
             )
             if response.status_code in [200, 204]:
+                if response.status_code == 200:
+                    eliminadas = response.json()
+                    await refresh_attendance_days(schema, eliminadas)
                 return {"success": True, "message": "Asistencia eliminada"}
             else:
                 raise HTTPException(status_code=500, detail=f"Error al eliminar asistencia: {response.text}")
     
     @staticmethod
-    async def get_all_excuses(email: str, estado: str = None) -> Dict:
-        """Obtener todas las excusas con filtro opcional por estado (director)"""
+    def _excuse_filters(estado: str = None, curso_id: int = None, estudiante_id: int = None,
+                        desde: str = None, hasta: str = None) -> List[Tuple[str, str]]:
+        """Filtros de excusas delegados a PostgREST"""
+        params = []
+        if estado:
+            params.append(("estado", f"eq.{estado}"))
+        if curso_id is not None:
+            params.append(("curso_id", f"eq.{curso_id}"))
+        if estudiante_id is not None:
+            params.append(("estudiante_id", f"eq.{estudiante_id}"))
+        # Ventana de fechas: excusas que se solapan con [desde, hasta]
+        if desde:
+            params.append(("fecha_fin", f"gte.{desde}"))
+        if hasta:
+            params.append(("fecha_inicio", f"lte.{hasta}"))
+        return params
+    
+    @staticmethod
+    async def _list_excuses_page(schema: str, filters: List[Tuple[str, str]], limit: int,
+                                 cursor: str, select: str, error_detail: str) -> Dict:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            headers = {
+                "apikey": SUPABASE_ANON_KEY,
+                "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
+                "Prefer": "count=estimated"
+            }
+            table_name = f"{schema}_excusas"
+            params = [("select", select_param(select, EXCUSA_COLUMNAS))]
+            params += filters
+            params += keyset_params(cursor, limit)
+            
+            response = await client.get(f"{SUPABASE_URL}/rest/v1/{table_name}", params=params, headers=headers)
+            if response.status_code in [200, 206]:
+                excusas = response.json()
+                total = parse_total(response.headers.get("content-range"))
+                return {"excusas": excusas, **page_response(excusas, limit, total)}
+            else:
+                raise HTTPException(status_code=500, detail=error_detail)
+    
+    @staticmethod
+    async def get_all_excuses(email: str, estado: str = None, curso_id: int = None,
+                              estudiante_id: int = None, desde: str = None, hasta: str = None,
+                              limit: int = DEFAULT_LIMIT, cursor: str = None, select: str = None) -> Dict:
+        """Obtener excusas paginadas con filtros opcionales (director)"""
         tenant_domain = get_tenant_from_email(email)
         if not tenant_domain:
             raise HTTPException(status_code=400, detail="Tenant no identificado")
@@ -319,25 +493,16 @@ class AttendanceController:
         if not user_data or user_data.get("rol") not in ["director", "admin", "Director"]:
             raise HTTPException(status_code=403, detail="Solo el director puede ver todas las excusas")
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            headers = {
-                "apikey": SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {SUPABASE_ANON_KEY}"
-            }
-            table_name = f"{schema}_excusas"
-            url = f"{SUPABASE_URL}/rest/v1/{table_name}?select=*&order=created_at.desc"
-            if estado:
-                url += f"&estado=eq.{estado}"
-            
-            response = await client.get(url, headers=headers)
-            if response.status_code == 200:
-                return {"excusas": response.json()}
-            else:
-                raise HTTPException(status_code=500, detail="Error al obtener excusas")
+        filters = AttendanceController._excuse_filters(estado, curso_id, estudiante_id, desde, hasta)
+        return await AttendanceController._list_excuses_page(
+            schema, filters, limit, cursor, select, "Error al obtener excusas"
+        )
     
     @staticmethod
-    async def get_my_excuses(email: str) -> Dict:
-        """Obtener excusas creadas por el usuario actual (profesores/padres)"""
+    async def get_my_excuses(email: str, estado: str = None, curso_id: int = None,
+                             estudiante_id: int = None, desde: str = None, hasta: str = None,
+                             limit: int = DEFAULT_LIMIT, cursor: str = None, select: str = None) -> Dict:
+        """Obtener excusas paginadas creadas por el usuario actual (profesores/padres)"""
         tenant_domain = get_tenant_from_email(email)
         if not tenant_domain:
             raise HTTPException(status_code=400, detail="Tenant no identificado")
@@ -351,18 +516,108 @@ class AttendanceController:
         if not user_data:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
         
-        user_id = user_data["id"]
+        filters = [("creado_por", f"eq.{user_data['id']}")]
+        filters += AttendanceController._excuse_filters(estado, curso_id, estudiante_id, desde, hasta)
+        return await AttendanceController._list_excuses_page(
+            schema, filters, limit, cursor, select, "Error al obtener tus excusas"
+        )
+    
+    @staticmethod
+    async def get_student_analytics(estudiante_id: int, curso_id: int, email: str,
+                                    fecha_inicio: str = None, fecha_fin: str = None) -> Dict:
+        """Tasa de asistencia y rachas de un estudiante en un curso (profesores/director)"""
+        tenant_domain = get_tenant_from_email(email)
+        if not tenant_domain:
+            raise HTTPException(status_code=400, detail="Tenant no identificado")
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            headers = {
-                "apikey": SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {SUPABASE_ANON_KEY}"
-            }
-            table_name = f"{schema}_excusas"
-            url = f"{SUPABASE_URL}/rest/v1/{table_name}?creado_por=eq.{user_id}&select=*&order=created_at.desc"
-            
-            response = await client.get(url, headers=headers)
-            if response.status_code == 200:
-                return {"excusas": response.json()}
-            else:
-                raise HTTPException(status_code=500, detail="Error al obtener tus excusas")
+        tenant_info = await get_tenant_info(tenant_domain)
+        if not tenant_info:
+            raise HTTPException(status_code=404, detail="Tenant no encontrado")
+        
+        schema = tenant_info["schema_name"]
+        user_data = await get_user_by_email(email, schema)
+        if not user_data or user_data.get("rol") not in ["Profesor", "Director", "Admin"]:
+            raise HTTPException(status_code=403, detail="No tienes permisos para ver estadísticas")
+        
+        try:
+            inicio = date.fromisoformat(fecha_inicio) if fecha_inicio else None
+            fin = date.fromisoformat(fecha_fin) if fecha_fin else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato de fecha inválido (YYYY-MM-DD)")
+        
+        try:
+            matrix = await get_attendance_matrix(schema)
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=500, detail=f"Error al cargar asistencias: {e}")
+        
+        return matrix.summary(estudiante_id, curso_id, inicio, fin)
+    
+    @staticmethod
+    async def get_course_analytics(curso_id: int, email: str,
+                                   fecha_inicio: str = None, fecha_fin: str = None) -> Dict:
+        """Tasa de asistencia y rachas de todos los estudiantes de un curso (profesores/director)"""
+        tenant_domain = get_tenant_from_email(email)
+        if not tenant_domain:
+            raise HTTPException(status_code=400, detail="Tenant no identificado")
+        
+        tenant_info = await get_tenant_info(tenant_domain)
+        if not tenant_info:
+            raise HTTPException(status_code=404, detail="Tenant no encontrado")
+        
+        schema = tenant_info["schema_name"]
+        user_data = await get_user_by_email(email, schema)
+        if not user_data or user_data.get("rol") not in ["Profesor", "Director", "Admin"]:
+            raise HTTPException(status_code=403, detail="No tienes permisos para ver estadísticas")
+        
+        try:
+            inicio = date.fromisoformat(fecha_inicio) if fecha_inicio else None
+            fin = date.fromisoformat(fecha_fin) if fecha_fin else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato de fecha inválido (YYYY-MM-DD)")
+        
+        try:
+            matrix = await get_attendance_matrix(schema)
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=500, detail=f"Error al cargar asistencias: {e}")
+        
+        estudiantes = [
+            matrix.summary(estudiante_id, curso_id, inicio, fin)
+            for estudiante_id in sorted(matrix.course_students(curso_id))
+        ]
+        return {"curso_id": curso_id, "estudiantes": estudiantes}
+    
+    @staticmethod
+    async def get_attendance_heatmap(fecha_inicio: str, fecha_fin: str, email: str, curso_id: int = None) -> Dict:
+        """Mapa de calor diario de asistencia del tenant o de un curso (profesores/director)"""
+        tenant_domain = get_tenant_from_email(email)
+        if not tenant_domain:
+            raise HTTPException(status_code=400, detail="Tenant no identificado")
+        
+        tenant_info = await get_tenant_info(tenant_domain)
+        if not tenant_info:
+            raise HTTPException(status_code=404, detail="Tenant no encontrado")
+        
+        schema = tenant_info["schema_name"]
+        user_data = await get_user_by_email(email, schema)
+        if not user_data or user_data.get("rol") not in ["Profesor", "Director", "Admin"]:
+            raise HTTPException(status_code=403, detail="No tienes permisos para ver el mapa de asistencia")
+        
+        try:
+            inicio = date.fromisoformat(fecha_inicio)
+            fin = date.fromisoformat(fecha_fin)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato de fecha inválido (YYYY-MM-DD)")
+        if fin < inicio or (fin - inicio).days > MAX_HEATMAP_DAYS:
+            raise HTTPException(status_code=400, detail=f"Rango de fechas inválido (máximo {MAX_HEATMAP_DAYS} días)")
+        
+        try:
+            rollup = await get_attendance_rollup(schema)
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=500, detail=f"Error al cargar asistencias: {e}")
+        
+        return {
+            "curso_id": curso_id,
+            "fecha_inicio": fecha_inicio,
+            "fecha_fin": fecha_fin,
+            "dias": rollup.heatmap(inicio, fin, curso_id)
+        }
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, Literal
+from pydantic import BaseModel, Field
+from typing import Optional, Literal, List
 from datetime import date, datetime
 
 class AttendanceRecord(BaseModel):
@@ -21,3 +21,11 @@ class ExcuseApproval(BaseModel):
     excuse_id: int
     estado: Literal["aprobada", "rechazada"]
     comentario_director: Optional[str] = None
+
+class ExcuseDecision(BaseModel):
+    excuse_id: int
+    estado: Literal["aprobada", "rechazada"]
+    comentario_director: Optional[str] = None
+
+class ExcuseBulkApproval(BaseModel):
+    decisiones: List[ExcuseDecision] = Field(..., min_length=1, max_length=1000)
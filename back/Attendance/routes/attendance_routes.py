@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Header, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.attendance import AttendanceRecord, Excuse, ExcuseApproval
+from models.attendance import AttendanceRecord, Excuse, ExcuseApproval, ExcuseBulkApproval
 from controllers.attendance_controller import AttendanceController
 from utils.supabase import get_current_user
+from utils.excuse_events import stream_events
+from utils.stream_tickets import stream_tickets
+from utils.pagination import DEFAULT_LIMIT, MAX_LIMIT
 
 router = APIRouter(prefix="/api/attendance", tags=["Attendance"])
 
@@ -28,6 +32,12 @@ async def approve_excuse(approval: ExcuseApproval, authorization: str = Header(N
     user = await get_current_user(authorization)
     return await AttendanceController.approve_excuse(approval, user["email"])
 
+@router.patch("/excuses/approve-bulk")
+async def approve_excuses_bulk(bulk: ExcuseBulkApproval, authorization: str = Header(None)):
+    """Aprobar/rechazar varias excusas en una sola petición (solo director)"""
+    user = await get_current_user(authorization)
+    return await AttendanceController.approve_excuses_bulk(bulk, user["email"])
+
 @router.get("/student/{estudiante_id}")
 async def get_student_attendance(
     estudiante_id: int,
@@ -44,6 +54,33 @@ async def get_pending_excuses(authorization: str = Header(None)):
     user = await get_current_user(authorization)
     return await AttendanceController.get_pending_excuses(user["email"])
 
+@router.post("/excuses/stream-ticket")
+async def create_stream_ticket(authorization: str = Header(None)):
+    """Ticket de un solo uso y pocos segundos para abrir /excuses/stream con EventSource"""
+    user = await get_current_user(authorization)
+    return {"ticket": stream_tickets.issue(user["email"]), "expires_in": stream_tickets.ttl}
+
+@router.get("/excuses/stream")
+async def stream_pending_excuses(
+    request: Request,
+    ticket: str = Query(default=None),
+    authorization: str = Header(None)
+):
+    """Stream SSE de excusas nuevas y decididas (solo director)
+    EventSource no permite headers: se autentica con ?ticket= de POST /excuses/stream-ticket"""
+    if authorization:
+        email = (await get_current_user(authorization))["email"]
+    else:
+        email = stream_tickets.redeem(ticket) if ticket else None
+        if not email:
+            raise HTTPException(status_code=401, detail="Ticket de stream inválido o vencido")
+    schema, snapshot = await AttendanceController.open_pending_excuses_stream(email)
+    return StreamingResponse(
+        stream_events(schema, snapshot, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/history/{curso_id}")
 async def get_attendance_history(
     curso_id: int,
@@ -75,14 +112,69 @@ async def delete_attendance(asistencia_id: int, authorization: str = Header(None
 @router.get("/excuses/all")
 async def get_all_excuses(
     estado: str = Query(default=None),
+    curso_id: int = Query(default=None),
+    estudiante_id: int = Query(default=None),
+    desde: str = Query(default=None),
+    hasta: str = Query(default=None),
+    limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str = Query(default=None),
+    select: str = Query(default=None),
     authorization: str = Header(None)
 ):
-    """Obtener todas las excusas (director)"""
+    """Obtener excusas paginadas (director)"""
     user = await get_current_user(authorization)
-    return await AttendanceController.get_all_excuses(user["email"], estado)
+    return await AttendanceController.get_all_excuses(
+        user["email"], estado, curso_id, estudiante_id, desde, hasta, limit, cursor, select
+    )
 
 @router.get("/excuses/my")
-async def get_my_excuses(authorization: str = Header(None)):
-    """Obtener mis excusas creadas"""
+async def get_my_excuses(
+    estado: str = Query(default=None),
+    curso_id: int = Query(default=None),
+    estudiante_id: int = Query(default=None),
+    desde: str = Query(default=None),
+    hasta: str = Query(default=None),
+    limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str = Query(default=None),
+    select: str = Query(default=None),
+    authorization: str = Header(None)
+):
+    """Obtener mis excusas creadas (paginadas)"""
+    user = await get_current_user(authorization)
+    return await AttendanceController.get_my_excuses(
+        user["email"], estado, curso_id, estudiante_id, desde, hasta, limit, cursor, select
+    )
+
+@router.get("/analytics/student/{estudiante_id}")
+async def get_student_analytics(
+    estudiante_id: int,
+    curso_id: int = Query(...),
+    fecha_inicio: str = Query(default=None),
+    fecha_fin: str = Query(default=None),
+    authorization: str = Header(None)
+):
+    """Tasa de asistencia y rachas de un estudiante en un curso"""
+    user = await get_current_user(authorization)
+    return await AttendanceController.get_student_analytics(estudiante_id, curso_id, user["email"], fecha_inicio, fecha_fin)
+
+@router.get("/analytics/course/{curso_id}")
+async def get_course_analytics(
+    curso_id: int,
+    fecha_inicio: str = Query(default=None),
+    fecha_fin: str = Query(default=None),
+    authorization: str = Header(None)
+):
+    """Tasa de asistencia y rachas de los estudiantes de un curso"""
+    user = await get_current_user(authorization)
+    return await AttendanceController.get_course_analytics(curso_id, user["email"], fecha_inicio, fecha_fin)
+
+@router.get("/heatmap")
+async def get_attendance_heatmap(
+    fecha_inicio: str = Query(...),
+    fecha_fin: str = Query(...),
+    curso_id: int = Query(default=None),
+    authorization: str = Header(None)
+):
+    """Mapa de calor diario de asistencia (tenant completo o un curso)"""
     user = await get_current_user(authorization)
-    return await AttendanceController.get_my_excuses(user["email"])
+    return await AttendanceController.get_attendance_heatmap(fecha_inicio, fecha_fin, user["email"], curso_id)
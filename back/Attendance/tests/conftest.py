@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Los módulos del servicio se importan como en main.py (utils.*, controllers.*),
+# y back/ aporta el paquete shared
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(1, os.path.dirname(SERVICE_DIR))
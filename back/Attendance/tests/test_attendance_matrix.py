@@ -0,0 +1,67 @@
+from datetime import date
+
+from utils.attendance_matrix import AttendanceMatrix
+
+
+def matriz(*estados, inicio=date(2025, 3, 3)):
+    """Un estudiante (1) en un curso (10) con un estado por día desde `inicio`"""
+    matrix = AttendanceMatrix()
+    for offset, estado in enumerate(estados):
+        matrix.set(1, 10, date.fromordinal(inicio.toordinal() + offset), estado)
+    return matrix
+
+
+def test_set_y_get_por_dia():
+    matrix = matriz("presente", "ausente", "tardanza")
+    assert matrix.get(1, 10, "2025-03-04") == "ausente"
+    assert matrix.get(1, 10, date(2025, 3, 5)) == "tardanza"
+    assert matrix.get(1, 10, "2025-03-10") is None
+    assert matrix.get(2, 10, "2025-03-03") is None
+
+
+def test_serie_se_extiende_hacia_atras():
+    matrix = matriz("presente")
+    matrix.set(1, 10, "2025-02-28T08:00:00", "ausente")
+    assert matrix.series(1, 10).window() == bytes([2, 0, 0, 1])
+    assert matrix.get(1, 10, "2025-02-28") == "ausente"
+
+
+def test_limpiar_un_dia_sin_serie_no_la_crea():
+    matrix = AttendanceMatrix()
+    matrix.set(1, 10, "2025-03-03", None)
+    assert len(matrix) == 0
+    # Limpiar después del último registro tampoco alarga la serie
+    matrix = matriz("presente")
+    matrix.set(1, 10, "2025-03-20", None)
+    assert matrix.series(1, 10).window() == bytes([1])
+
+
+def test_resumen_cuenta_y_rachas_ignoran_huecos():
+    matrix = matriz("presente", "ausente", None, "ausente", "tardanza", "ausente", "ausente")
+    resumen = matrix.summary(1, 10)
+    assert resumen["total_registros"] == 6
+    assert resumen["conteos"] == {"presente": 1, "ausente": 4, "tardanza": 1}
+    assert resumen["tasa_asistencia"] == round(2 / 6, 4)
+    # El hueco del 5/3 no corta la racha de ausencias
+    assert resumen["racha_max_ausencias"] == 2
+    assert resumen["racha_actual_ausencias"] == 2
+    assert resumen["racha_max_presente"] == 1
+
+
+def test_resumen_por_rango_y_sin_registros():
+    matrix = matriz("presente", "ausente", "presente")
+    resumen = matrix.summary(1, 10, date(2025, 3, 4), date(2025, 3, 4))
+    assert resumen["conteos"] == {"presente": 0, "ausente": 1, "tardanza": 0}
+    vacio = matrix.summary(2, 10)
+    assert vacio["total_registros"] == 0 and vacio["tasa_asistencia"] is None
+
+
+def test_load_y_estudiantes_del_curso():
+    matrix = AttendanceMatrix()
+    matrix.load([
+        {"estudiante_id": 1, "curso_id": 10, "fecha": "2025-03-03", "estado": "presente"},
+        {"estudiante_id": 2, "curso_id": 10, "fecha": "2025-03-03", "estado": "ausente"},
+        {"estudiante_id": 1, "curso_id": 11, "fecha": "2025-03-03", "estado": "presente"},
+    ])
+    assert sorted(matrix.course_students(10)) == [1, 2]
+    assert matrix.course_students(12) == []
@@ -0,0 +1,75 @@
+from datetime import date
+
+import pytest
+
+from utils.attendance_rollup import AttendanceRollup
+from utils.attendance_snapshot import AttendanceSnapshot
+
+LUNES = date(2025, 3, 3)
+MARTES = date(2025, 3, 4)
+
+
+def fila(estudiante_id, curso_id, fecha, estado):
+    return {"estudiante_id": estudiante_id, "curso_id": curso_id, "fecha": fecha, "estado": estado}
+
+
+def test_heatmap_por_tenant_y_por_curso():
+    rollup = AttendanceRollup()
+    rollup.add(10, LUNES, "presente")
+    rollup.add(10, LUNES, "ausente")
+    rollup.add(11, LUNES, "tardanza")
+    rollup.add(11, MARTES, "presente")
+
+    assert rollup.heatmap(LUNES, LUNES) == [
+        {"fecha": "2025-03-03", "presente": 1, "ausente": 1, "tardanza": 1, "total": 3, "tasa_asistencia": 0.6667}
+    ]
+    assert [d["fecha"] for d in rollup.heatmap(LUNES, MARTES, curso_id=11)] == ["2025-03-03", "2025-03-04"]
+    assert rollup.heatmap(LUNES, MARTES, curso_id=99) == []
+
+
+def test_restar_todo_borra_el_dia():
+    rollup = AttendanceRollup()
+    rollup.add(10, LUNES, "presente")
+    rollup.add(10, LUNES, "presente", -1)
+    assert rollup.heatmap(LUNES, LUNES) == []
+    assert rollup.heatmap(LUNES, LUNES, curso_id=10) == []
+
+
+def test_conteo_negativo_es_un_error():
+    with pytest.raises(ValueError):
+        AttendanceRollup().add(10, LUNES, "ausente", -1)
+
+
+def test_estado_desconocido_se_ignora():
+    rollup = AttendanceRollup()
+    rollup.add(10, LUNES, "justificado")
+    assert rollup.heatmap(LUNES, LUNES) == []
+
+
+def test_snapshot_reaplicar_filas_es_idempotente():
+    snapshot = AttendanceSnapshot()
+    filas = [fila(1, 10, "2025-03-03", "presente"), fila(2, 10, "2025-03-03", "ausente")]
+    snapshot.load(filas)
+    snapshot.load(filas)
+    assert snapshot.rollup.heatmap(LUNES, LUNES)[0]["total"] == 2
+
+
+def test_snapshot_varias_filas_del_mismo_dia_cuentan_una_vez():
+    snapshot = AttendanceSnapshot()
+    # La más reciente gana: el rollup cuenta días de estudiante, no filas
+    snapshot.load([fila(1, 10, "2025-03-03", "ausente"), fila(1, 10, "2025-03-03", "tardanza")])
+    dia = snapshot.rollup.heatmap(LUNES, LUNES, curso_id=10)[0]
+    assert (dia["ausente"], dia["tardanza"], dia["total"]) == (0, 1, 1)
+    assert snapshot.matrix.get(1, 10, LUNES) == "tardanza"
+
+
+def test_snapshot_limpiar_un_dia_lo_resta_del_rollup():
+    snapshot = AttendanceSnapshot()
+    snapshot.load([fila(1, 10, "2025-03-03", "presente"), fila(1, 10, "2025-03-04", "ausente")])
+    snapshot.set_day(1, 10, "2025-03-03", None)
+    assert snapshot.matrix.get(1, 10, LUNES) is None
+    assert [d["fecha"] for d in snapshot.rollup.heatmap(LUNES, MARTES)] == ["2025-03-04"]
+    # Limpiar otra vez (o un día sin registro) no cambia nada
+    snapshot.set_day(1, 10, "2025-03-03", None)
+    snapshot.set_day(3, 10, "2025-03-03", None)
+    assert len(snapshot.rollup.heatmap(LUNES, MARTES)) == 1
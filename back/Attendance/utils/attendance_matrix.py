@@ -0,0 +1,120 @@
+import re
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Un byte por día: 0 = sin registro, 1 = presente, 2 = ausente, 3 = tardanza
+SIN_REGISTRO = 0
+ESTADO_CODIGOS = {"presente": 1, "ausente": 2, "tardanza": 3}
+CODIGO_ESTADOS = {codigo: estado for estado, codigo in ESTADO_CODIGOS.items()}
+
+_SIN_REGISTRO_BYTE = bytes([SIN_REGISTRO])
+_RACHA_PATTERNS = {
+    codigo: re.compile(re.escape(bytes([codigo])) + b"+")
+    for codigo in CODIGO_ESTADOS
+}
+
+
+def to_date(fecha) -> date:
+    if isinstance(fecha, date):
+        return fecha
+    return date.fromisoformat(str(fecha)[:10])
+
+
+class AttendanceSeries:
+    """Serie diaria de asistencia de un estudiante en un curso"""
+
+    __slots__ = ("inicio", "dias")
+
+    def __init__(self, inicio: int):
+        self.inicio = inicio  # ordinal del primer día de la serie
+        self.dias = bytearray()
+
+    def set(self, fecha: date, codigo: int):
+        ordinal = fecha.toordinal()
+        if ordinal < self.inicio:
+            # Extender hacia atrás rellenando con "sin registro"
+            self.dias[0:0] = bytes(self.inicio - ordinal)
+            self.inicio = ordinal
+        index = ordinal - self.inicio
+        if index >= len(self.dias):
+            if codigo == SIN_REGISTRO:
+                return
+            self.dias.extend(bytes(index - len(self.dias) + 1))
+        self.dias[index] = codigo
+
+    def get(self, fecha: date) -> int:
+        index = fecha.toordinal() - self.inicio
+        return self.dias[index] if 0 <= index < len(self.dias) else SIN_REGISTRO
+
+    def window(self, fecha_inicio: Optional[date] = None, fecha_fin: Optional[date] = None) -> bytes:
+        desde = 0 if fecha_inicio is None else max(0, fecha_inicio.toordinal() - self.inicio)
+        hasta = len(self.dias) if fecha_fin is None else max(0, fecha_fin.toordinal() - self.inicio + 1)
+        return bytes(self.dias[desde:hasta])
+
+
+class AttendanceMatrix:
+    """Representación compacta de _asistencias para analítica de un tenant"""
+
+    def __init__(self):
+        self._series: Dict[Tuple[int, int], AttendanceSeries] = {}
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def set(self, estudiante_id: int, curso_id: int, fecha, estado: Optional[str]):
+        """Registrar (o limpiar con estado=None) el estado de un día"""
+        fecha = to_date(fecha)
+        codigo = ESTADO_CODIGOS.get(estado, SIN_REGISTRO)
+        key = (estudiante_id, curso_id)
+        series = self._series.get(key)
+        if series is None:
+            if codigo == SIN_REGISTRO:
+                return
+            series = self._series[key] = AttendanceSeries(fecha.toordinal())
+        series.set(fecha, codigo)
+
+    def load(self, rows: Iterable[Dict]):
+        for row in rows:
+            self.set(row["estudiante_id"], row["curso_id"], row["fecha"], row["estado"])
+
+    def get(self, estudiante_id: int, curso_id: int, fecha) -> Optional[str]:
+        """Estado registrado de un día (None si no hay registro)"""
+        series = self._series.get((estudiante_id, curso_id))
+        return CODIGO_ESTADOS.get(series.get(to_date(fecha))) if series else None
+
+    def series(self, estudiante_id: int, curso_id: int) -> Optional[AttendanceSeries]:
+        return self._series.get((estudiante_id, curso_id))
+
+    def course_students(self, curso_id: int) -> List[int]:
+        return [estudiante for (estudiante, curso) in self._series if curso == curso_id]
+
+    def summary(self, estudiante_id: int, curso_id: int,
+                fecha_inicio: Optional[date] = None, fecha_fin: Optional[date] = None) -> Dict:
+        """Conteos, tasa de asistencia y rachas de un estudiante en un curso"""
+        series = self.series(estudiante_id, curso_id)
+        dias = series.window(fecha_inicio, fecha_fin) if series else b""
+        # Las rachas se cuentan sobre días con clase, ignorando huecos
+        registrados = dias.replace(_SIN_REGISTRO_BYTE, b"")
+
+        conteos = {estado: registrados.count(codigo) for estado, codigo in ESTADO_CODIGOS.items()}
+        total = len(registrados)
+        asistidos = conteos["presente"] + conteos["tardanza"]
+
+        return {
+            "estudiante_id": estudiante_id,
+            "curso_id": curso_id,
+            "total_registros": total,
+            "conteos": conteos,
+            "tasa_asistencia": round(asistidos / total, 4) if total else None,
+            "racha_max_ausencias": self._longest_run(registrados, ESTADO_CODIGOS["ausente"]),
+            "racha_actual_ausencias": self._trailing_run(registrados, ESTADO_CODIGOS["ausente"]),
+            "racha_max_presente": self._longest_run(registrados, ESTADO_CODIGOS["presente"]),
+        }
+
+    @staticmethod
+    def _longest_run(dias: bytes, codigo: int) -> int:
+        return max((len(m.group()) for m in _RACHA_PATTERNS[codigo].finditer(dias)), default=0)
+
+    @staticmethod
+    def _trailing_run(dias: bytes, codigo: int) -> int:
+        return len(dias) - len(dias.rstrip(bytes([codigo])))
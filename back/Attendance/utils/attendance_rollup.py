@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+ESTADOS = ("presente", "ausente", "tardanza")
+
+
+def _empty_counts() -> Dict[str, int]:
+    return {estado: 0 for estado in ESTADOS}
+
+
+class AttendanceRollup:
+    """
+    Conteos diarios por estado: (curso, fecha) y total del tenant por fecha.
+
+    Cuenta días de estudiante (lo mismo que la matriz): quien lo alimenta
+    resta el estado anterior del día y suma el nuevo.
+    """
+
+    def __init__(self):
+        self._por_curso: Dict[int, Dict[str, Dict[str, int]]] = {}
+        self._tenant: Dict[str, Dict[str, int]] = {}
+
+    def add(self, curso_id: int, fecha: date, estado: str, delta: int = 1):
+        if estado not in ESTADOS:
+            return
+        fecha = fecha.isoformat()
+        for dias in (self._por_curso.setdefault(curso_id, {}), self._tenant):
+            conteos = dias.setdefault(fecha, _empty_counts())
+            conteos[estado] += delta
+            if conteos[estado] < 0:
+                # Restar algo que nunca se sumó es un error de quien alimenta el rollup
+                raise ValueError(f"Conteo negativo de '{estado}' en el curso {curso_id} el {fecha}")
+            if not any(conteos.values()):
+                del dias[fecha]
+
+    def heatmap(self, fecha_inicio: date, fecha_fin: date, curso_id: Optional[int] = None) -> List[Dict]:
+        """Serie diaria del rango pedido (solo días con registros)"""
+        dias = self._tenant if curso_id is None else self._por_curso.get(curso_id, {})
+        resultado = []
+        # Recorrer el rango (acotado por la ruta) es más barato que ordenar todo el diccionario
+        fecha = fecha_inicio
+        while fecha <= fecha_fin:
+            conteos = dias.get(fecha.isoformat())
+            if conteos:
+                total = sum(conteos.values())
+                resultado.append({
+                    "fecha": fecha.isoformat(),
+                    **conteos,
+                    "total": total,
+                    "tasa_asistencia": round((conteos["presente"] + conteos["tardanza"]) / total, 4)
+                })
+            fecha += timedelta(days=1)
+        return resultado
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+
+from utils.attendance_matrix import AttendanceMatrix, to_date
+from utils.attendance_rollup import AttendanceRollup
+from utils.supabase import SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, fetch_all_rows
+from utils.tenant_snapshots import TenantSnapshots
+
+
+class AttendanceSnapshot:
+    """Matriz y rollup de un tenant, construidos con una sola lectura de _asistencias"""
+
+    def __init__(self):
+        self.matrix = AttendanceMatrix()
+        self.rollup = AttendanceRollup()
+
+    def set_day(self, estudiante_id: int, curso_id: int, fecha, estado: Optional[str]):
+        """Fijar el estado final de un día; el rollup se ajusta con la diferencia (idempotente)"""
+        fecha = to_date(fecha)
+        anterior = self.matrix.get(estudiante_id, curso_id, fecha)
+        if anterior == estado:
+            return
+        self.matrix.set(estudiante_id, curso_id, fecha, estado)
+        actual = self.matrix.get(estudiante_id, curso_id, fecha)
+        if anterior is not None:
+            self.rollup.add(curso_id, fecha, anterior, -1)
+        if actual is not None:
+            self.rollup.add(curso_id, fecha, actual)
+
+    def load(self, rows: Iterable[Dict]):
+        for row in rows:
+            self.set_day(row["estudiante_id"], row["curso_id"], row["fecha"], row["estado"])
+
+
+async def _build_snapshot(schema: str) -> AttendanceSnapshot:
+    snapshot = AttendanceSnapshot()
+    # Ordenadas por id: si hay varias filas para un mismo día gana la más reciente
+    snapshot.load(await fetch_all_rows(f"{schema}_asistencias", "estudiante_id,curso_id,fecha,estado"))
+    print(f"✅ Asistencias cargadas para {schema}: {len(snapshot.matrix)} series")
+    return snapshot
+
+
+def _apply_rows(snapshot: AttendanceSnapshot, rows: List[Dict]):
+    # Cada fila trae el estado final del día (None si ya no tiene registros)
+    snapshot.load(rows)
+
+
+# Snapshots por tenant (schema) construidos bajo demanda y reconstruidos al vencer el TTL
+_snapshots = TenantSnapshots(_build_snapshot, _apply_rows)
+
+
+async def get_attendance_matrix(schema: str) -> AttendanceMatrix:
+    """Obtener la matriz del tenant, construyéndola en bloque la primera vez (y al vencer el TTL)"""
+    return (await _snapshots.get(schema)).matrix
+
+
+async def get_attendance_rollup(schema: str) -> AttendanceRollup:
+    """Obtener el rollup del tenant; comparte la lectura con la matriz"""
+    return (await _snapshots.get(schema)).rollup
+
+
+def apply_attendance_rows(schema: str, rows: Iterable[Dict]):
+    """Mantener actualizado el snapshot (si ya existe o se está construyendo) tras insertar filas"""
+    _snapshots.apply(schema, list(rows))
+
+
+async def _day_state(client: httpx.AsyncClient, schema: str, estudiante_id: int,
+                     curso_id: int, fecha: str) -> Optional[str]:
+    """Estado vigente de un día: el de la fila más reciente que queda (o None si no queda ninguna)"""
+    response = await client.get(
+        f"{SUPABASE_URL}/rest/v1/{schema}_asistencias",
+        params={
+            "estudiante_id": f"eq.{estudiante_id}",
+            "curso_id": f"eq.{curso_id}",
+            "fecha": f"eq.{fecha}",
+            "select": "estado",
+            "order": "id.desc",
+            "limit": 1
+        },
+        headers={
+            "apikey": SUPABASE_SERVICE_ROLE_KEY,
+            "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}"
+        }
+    )
+    response.raise_for_status()
+    filas = response.json()
+    return filas[0]["estado"] if filas else None
+
+
+async def refresh_attendance_days(schema: str, rows: Iterable[Dict]):
+    """
+    Recalcular los días de filas editadas o borradas.
+
+    Puede haber más de una fila por estudiante, curso y día: el valor del día
+    se vuelve a leer de las filas que quedan en vez de limpiarlo.
+    """
+    if not _snapshots.is_tracked(schema):
+        return
+    dias = list(dict.fromkeys(
+        (row["estudiante_id"], row["curso_id"], str(row["fecha"])[:10]) for row in rows
+    ))
+    if not dias:
+        return
+    try:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            estados = await asyncio.gather(*(_day_state(client, schema, *dia) for dia in dias))
+    except httpx.HTTPError as e:
+        # La escritura ya se hizo: sin el estado final el snapshot se descarta y se reconstruye
+        print(f"⚠️ No se pudo recalcular el snapshot de {schema}, se reconstruirá: {e}")
+        _snapshots.invalidate(schema)
+        return
+    _snapshots.apply(schema, [
+        {"estudiante_id": estudiante_id, "curso_id": curso_id, "fecha": fecha, "estado": estado}
+        for (estudiante_id, curso_id, fecha), estado in zip(dias, estados)
+    ])
@@ -0,0 +1,78 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, List, Set
+
+# Tamaño máximo de la cola por suscriptor; si un cliente lento la llena se desconecta
+SUBSCRIBER_QUEUE_SIZE = 100
+# Intervalo de keep-alive para proxies que cierran conexiones inactivas
+HEARTBEAT_SECONDS = 15.0
+
+_DISCONNECT = object()
+
+
+class ExcuseEventHub:
+    """Fan-out en proceso de eventos de excusas por tenant (schema)"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, schema: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(schema, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, schema: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(schema)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[schema]
+
+    def subscriber_count(self, schema: str) -> int:
+        return len(self._subscribers.get(schema, ()))
+
+    def publish(self, schema: str, event: str, excusas: List[Dict]):
+        """Enviar un evento a todos los suscriptores del tenant"""
+        subscribers = self._subscribers.get(schema)
+        if not subscribers:
+            return
+        message = {"event": event, "excusas": excusas}
+        for queue in list(subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Cliente demasiado lento: se descarta y deberá reconectarse
+                self.unsubscribe(schema, queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_DISCONNECT)
+
+
+def format_sse(event: str, data) -> str:
+    payload = json.dumps(data, default=str, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def stream_events(schema: str, snapshot: List[Dict], is_disconnected) -> AsyncIterator[str]:
+    """Generador SSE: snapshot inicial de pendientes y luego eventos en vivo"""
+    queue = excuse_hub.subscribe(schema)
+    try:
+        yield "retry: 5000\n\n"
+        yield format_sse("snapshot", {"excusas": snapshot})
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if message is _DISCONNECT or await is_disconnected():
+                break
+            yield format_sse(message["event"], {"excusas": message["excusas"]})
+    finally:
+        excuse_hub.unsubscribe(schema, queue)
+
+
+excuse_hub = ExcuseEventHub()
@@ -0,0 +1,27 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi import HTTPException
+
+from shared import pagination
+from shared.postgrest import content_range_total as parse_total
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def keyset_params(cursor: Optional[str], limit: int) -> List[Tuple[str, str]]:
+    """Parámetros PostgREST para paginar por (created_at desc, id desc)"""
+    try:
+        return pagination.keyset_params(cursor, limit, MAX_LIMIT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def select_param(select: Optional[str], allowed: Iterable[str]) -> str:
+    try:
+        return pagination.select_param(select, allowed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def page_response(rows: List[Dict], limit: int, total: Optional[int]) -> Dict:
+    return {"next_cursor": pagination.next_cursor(rows, limit, MAX_LIMIT), "total": total}
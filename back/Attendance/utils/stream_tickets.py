@@ -0,0 +1,43 @@
+import os
+import secrets
+import time
+from typing import Dict, Optional, Tuple
+
+# Vida de un ticket de stream: solo tiene que alcanzar para abrir el EventSource
+STREAM_TICKET_TTL = float(os.getenv("ATTENDANCE_STREAM_TICKET_TTL", "30"))
+
+
+class StreamTicketStore:
+    """
+    Tickets de un solo uso para abrir el stream SSE.
+
+    EventSource no permite enviar headers, así que el cliente pide un ticket
+    (autenticado con su JWT) y lo pasa como query param. Lo que quede en los
+    logs de acceso ya no sirve: el ticket vence en segundos y se consume al usarlo.
+    """
+
+    def __init__(self, ttl: float = STREAM_TICKET_TTL):
+        self.ttl = ttl
+        self._tickets: Dict[str, Tuple[float, str]] = {}
+
+    def issue(self, email: str) -> str:
+        now = time.monotonic()
+        self._expire(now)
+        ticket = secrets.token_urlsafe(32)
+        self._tickets[ticket] = (now + self.ttl, email)
+        return ticket
+
+    def redeem(self, ticket: str) -> Optional[str]:
+        """Email del dueño del ticket, o None si no existe, venció o ya se usó"""
+        entry = self._tickets.pop(ticket, None)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def _expire(self, now: float):
+        vencidos = [ticket for ticket, (expires_at, _) in self._tickets.items() if expires_at < now]
+        for ticket in vencidos:
+            del self._tickets[ticket]
+
+
+stream_tickets = StreamTicketStore()
@@ -1,9 +1,11 @@
 import httpx
 import os
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from fastapi import HTTPException, Header
 import jwt
 
+from shared import postgrest
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -80,3 +82,11 @@ async def get_user_by_email(email: str, schema: str) -> Optional[Dict]:
     except Exception as e:
         print(f"❌ Error obteniendo usuario: {e}")
     return None
+
+async def fetch_all_rows(table_name: str, select: str, page_size: int = 1000) -> List[Dict]:
+    """Leer una tabla completa en páginas (max-rows de PostgREST) con una proyección"""
+    headers = {
+        "apikey": SUPABASE_SERVICE_ROLE_KEY,
+        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}"
+    }
+    return await postgrest.fetch_all_rows(f"{SUPABASE_URL}/rest/v1/{table_name}", select, headers, page_size)
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Segundos que se sirve una estructura antes de reconstruirla desde la base.
+# Cubre escrituras hechas por otros servicios (p. ej. el borrado en cascada de Courses)
+SNAPSHOT_TTL = float(os.getenv("ATTENDANCE_SNAPSHOT_TTL", "300"))
+
+
+class TenantSnapshots:
+    """
+    Estructuras en memoria por tenant, construidas bajo demanda y reconstruidas
+    al vencer el TTL.
+
+    Los cambios que llegan mientras una construcción está leyendo la base se
+    guardan y se reaplican al terminar, así no se pierden. Por eso `apply_change`
+    debe ser idempotente (aplicar el estado final de una fila, no un delta).
+    """
+
+    def __init__(self, build: Callable[[str], Awaitable[Any]],
+                 apply_change: Callable[[Any, Any], None], ttl: float = SNAPSHOT_TTL):
+        self._build = build
+        self._apply_change = apply_change
+        self.ttl = ttl
+        self._items: Dict[str, Tuple[float, Any]] = {}
+        self._pending: Dict[str, List[Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _fresh(self, schema: str) -> Optional[Any]:
+        entry = self._items.get(schema)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        return None
+
+    async def get(self, schema: str) -> Any:
+        item = self._fresh(schema)
+        if item is not None:
+            return item
+
+        lock = self._locks.setdefault(schema, asyncio.Lock())
+        async with lock:
+            item = self._fresh(schema)
+            if item is not None:
+                return item
+
+            built_at = time.monotonic()
+            self._pending[schema] = []
+            try:
+                item = await self._build(schema)
+                for change in self._pending[schema]:
+                    self._apply_change(item, change)
+            finally:
+                self._pending.pop(schema, None)
+            self._items[schema] = (built_at, item)
+            return item
+
+    def is_tracked(self, schema: str) -> bool:
+        """True si hay una estructura vigente o en construcción que deba recibir cambios"""
+        return schema in self._items or schema in self._pending
+
+    def apply(self, schema: str, change: Any):
+        """Aplicar un cambio a la estructura vigente y guardarlo si hay una construcción en curso"""
+        entry = self._items.get(schema)
+        if entry is not None:
+            try:
+                self._apply_change(entry[1], change)
+            except Exception as e:
+                # Estructura inconsistente: se descarta y la próxima lectura la reconstruye
+                print(f"❌ Error aplicando un cambio al snapshot de {schema}, se reconstruirá: {e!r}")
+                self.invalidate(schema)
+        pending = self._pending.get(schema)
+        if pending is not None:
+            pending.append(change)
+
+    def invalidate(self, schema: str):
+        """Descartar la estructura del tenant; la próxima lectura la reconstruye"""
+        self._items.pop(schema, None)
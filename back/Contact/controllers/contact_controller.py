@@ -1,133 +1,145 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from fastapi import HTTPException
 from datetime import datetime
+import asyncio
 import httpx
 import os
+import string
+import time
 
-from models.contact import ContactMessage, ContactMessageResponse, ContactMessageCreate, ContactStats
+from models.contact import ContactMessage, ContactMessageResponse, ContactMessageCreate, ContactStats, ContactStatusChange
 from utils.supabase import (
     get_tenant_from_email, 
     get_tenant_table_prefix, 
-    create_contact_message,
     get_contact_messages_by_tenant,
-    get_user_by_email
+    content_range_total,
+    chunked,
+    IN_FILTER_CHUNK
 )
+from utils.pagination import next_cursor
+from utils.contact_queue import contact_queue
+
+# Segundos que se reutilizan las estadísticas de un tenant
+STATS_TTL = 5.0
+
+# Campos del mensaje que se pueden usar en la plantilla de respuesta
+RESPUESTA_CAMPOS = ("nombre", "email", "asunto")
+
+def plantilla_campos(plantilla: str) -> List[str]:
+    """Campos usados por una plantilla; ValueError si tiene campos no permitidos o está mal formada"""
+    campos = [campo for _, campo, _, _ in string.Formatter().parse(plantilla) if campo is not None]
+    invalidos = [campo for campo in campos if campo not in RESPUESTA_CAMPOS]
+    if invalidos:
+        raise ValueError(f"Campos no permitidos en la respuesta: {', '.join(sorted(set(invalidos)))}")
+    return campos
 
 class ContactController:
     def __init__(self):
         self.supabase_url = os.getenv("SUPABASE_URL")
         self.supabase_service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        self._stats_cache: Dict[str, Tuple[float, ContactStats]] = {}
 
-    async def create_contact_message(self, message: ContactMessage, user_agent: str = None, ip_address: str = None) -> dict:
-        """Crear un nuevo mensaje de contacto"""
-        try:
-            # Obtener tenant del email
-            tenant = get_tenant_from_email(message.email)
-            if tenant == "unknown":
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Dominio no soportado: {message.email.split('@')[1]}"
-                )
+    async def accept_contact_message(self, message: ContactMessage, user_agent: str = None, ip_address: str = None) -> dict:
+        """Aceptar un mensaje en la cola write-behind; se inserta en segundo plano"""
+        tenant = get_tenant_from_email(message.email)
+        if tenant == "unknown":
+            raise HTTPException(
+                status_code=400,
+                detail=f"Dominio no soportado: {message.email.split('@')[1]}"
+            )
 
-            # Verificar si el usuario existe (opcional)
-            user = await get_user_by_email(message.email, tenant)
-            user_id = user.get("id") if user else None
-
-            # Preparar datos para insertar
-            contact_data = {
-                "nombre": message.nombre,
-                "email": message.email,
-                "mensaje": message.mensaje,
-                "asunto": message.asunto or "Consulta general",
-                "telefono": message.telefono,
-                "tenant": tenant,
-                "status": "pendiente"
-            }
-            
-            # Agregar campos opcionales solo si están disponibles
-            if user_id:
-                contact_data["user_id"] = user_id
-            if user_agent:
-                contact_data["user_agent"] = user_agent
-            if ip_address:
-                contact_data["ip_address"] = ip_address
-
-            # Crear el mensaje en la base de datos
-            result = await create_contact_message(contact_data, tenant)
-            
-            if not result:
-                raise HTTPException(status_code=500, detail="Error al crear el mensaje de contacto")
+        contact_data = {
+            "nombre": message.nombre,
+            "email": message.email,
+            "mensaje": message.mensaje,
+            "asunto": message.asunto or "Consulta general",
+            "telefono": message.telefono,
+            "tenant": tenant,
+            "status": "pendiente",
+            "user_agent": user_agent,
+            "ip_address": ip_address
+        }
+        spool_id = await contact_queue.enqueue(contact_data)
 
-            return {
-                "success": True,
-                "message": "Mensaje de contacto enviado exitosamente",
-                "data": result,
-                "tenant": tenant
-            }
+        return {
+            "success": True,
+            "message": "Mensaje de contacto recibido, será procesado en breve",
+            "id": spool_id,
+            "tenant": tenant
+        }
 
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(status_code=500, detail="Error interno del servidor")
-
-    async def get_contact_messages(self, tenant: str = None, limit: int = 50) -> List[dict]:
-        """Obtener mensajes de contacto por tenant"""
+    async def get_contact_messages(self, tenant: str = None, limit: int = 50, cursor: str = None,
+                                   status: str = None, desde: datetime = None, hasta: datetime = None,
+                                   q: str = None) -> dict:
+        """Obtener una página de mensajes de contacto por tenant; next_cursor es None en la última"""
         try:
             if not tenant:
                 raise HTTPException(status_code=400, detail="Tenant requerido")
 
-            messages = await get_contact_messages_by_tenant(tenant, limit)
+            messages, total = await get_contact_messages_by_tenant(
+                tenant, limit, cursor=cursor, status=status, desde=desde, hasta=hasta, q=q
+            )
             
             return {
                 "success": True,
                 "data": messages,
-                "total": len(messages),
+                # Total estimado de mensajes que cumplen los filtros desde el cursor (no solo esta página)
+                "total": total,
+                "next_cursor": next_cursor(messages, limit),
                 "tenant": tenant
             }
 
         except HTTPException:
             raise
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail="Error interno del servidor")
 
     async def get_contact_stats(self, tenant: str) -> ContactStats:
-        """Obtener estadísticas de contactos por tenant"""
+        """Obtener estadísticas de contactos por tenant (conteos en la base, cacheados unos segundos)"""
+        cached = self._stats_cache.get(tenant)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
         try:
             table_prefix = get_tenant_table_prefix(tenant)
             table_name = f"{table_prefix}_contact_messages"
+            url = f"{self.supabase_url}/rest/v1/{table_name}"
             
             async with httpx.AsyncClient(timeout=10.0) as client:
                 headers = {
                     "apikey": self.supabase_service_key,
-                    "Authorization": f"Bearer {self.supabase_service_key}"
+                    "Authorization": f"Bearer {self.supabase_service_key}",
+                    "Prefer": "count=exact"
                 }
                 
-                # Obtener estadísticas
-                response = await client.get(
-                    f"{self.supabase_url}/rest/v1/{table_name}?select=status,created_at",
-                    headers=headers
+                # Tres consultas diminutas en paralelo: el último mensaje trae además el total
+                # en Content-Range, y los HEAD por estado solo devuelven el conteo
+                ultimo_response, pendientes_response, respondidos_response = await asyncio.gather(
+                    client.get(url, params={"select": "created_at", "order": "created_at.desc", "limit": 1}, headers=headers),
+                    client.head(url, params={"select": "id", "status": "eq.pendiente"}, headers=headers),
+                    client.head(url, params={"select": "id", "status": "eq.respondido"}, headers=headers)
                 )
                 
-                if response.status_code == 200:
-                    messages = response.json()
-                    total = len(messages)
-                    pendientes = len([m for m in messages if m.get("status") == "pendiente"])
-                    respondidos = len([m for m in messages if m.get("status") == "respondido"])
-                    
-                    ultimo_mensaje = None
-                    if messages:
-                        ultimo_mensaje = max([m.get("created_at") for m in messages if m.get("created_at")])
-                        ultimo_mensaje = datetime.fromisoformat(ultimo_mensaje.replace('Z', '+00:00'))
-                    
-                    return ContactStats(
-                        total_mensajes=total,
-                        mensajes_pendientes=pendientes,
-                        mensajes_respondidos=respondidos,
-                        tenant=tenant,
-                        ultimo_mensaje=ultimo_mensaje
-                    )
-                else:
+                responses = (ultimo_response, pendientes_response, respondidos_response)
+                if any(r.status_code not in (200, 206) for r in responses):
                     raise HTTPException(status_code=500, detail="Error obteniendo estadísticas")
+                
+                ultimo_mensaje = None
+                ultimos = ultimo_response.json()
+                if ultimos and ultimos[0].get("created_at"):
+                    ultimo_mensaje = datetime.fromisoformat(ultimos[0]["created_at"].replace('Z', '+00:00'))
+                
+                stats = ContactStats(
+                    total_mensajes=content_range_total(ultimo_response.headers.get("content-range")) or 0,
+                    mensajes_pendientes=content_range_total(pendientes_response.headers.get("content-range")) or 0,
+                    mensajes_respondidos=content_range_total(respondidos_response.headers.get("content-range")) or 0,
+                    tenant=tenant,
+                    ultimo_mensaje=ultimo_mensaje
+                )
+                self._stats_cache[tenant] = (time.monotonic() + STATS_TTL, stats)
+                return stats
 
         except HTTPException:
             raise
@@ -164,6 +176,7 @@ class ContactController:
                 )
                 
                 if response.status_code == 204:
+                    self._stats_cache.pop(tenant, None)
                     return {
                         "success": True,
                         "message": "Estado del mensaje actualizado exitosamente"
@@ -174,4 +187,87 @@ class ContactController:
         except HTTPException:
             raise
         except Exception as e:
-            raise HTTPException(status_code=500, detail="Error interno del servidor")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+    async def bulk_update_status(self, tenant: str, cambios: List[ContactStatusChange], respuesta: str = None,
+                                 atendido_por: str = None) -> dict:
+        """
+        Cambiar el estado de muchos mensajes con un PATCH id=in.(...) por estado (y bloque).
+        Si la respuesta usa campos del mensaje ({nombre}, ...) se agrupa además por texto renderizado
+        """
+        try:
+            campos = plantilla_campos(respuesta) if respuesta else []
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        table_name = f"{get_tenant_table_prefix(tenant)}_contact_messages"
+        url = f"{self.supabase_url}/rest/v1/{table_name}"
+        headers = {
+            "apikey": self.supabase_service_key,
+            "Authorization": f"Bearer {self.supabase_service_key}",
+            "Content-Type": "application/json"
+        }
+
+        # Último cambio gana si un id viene repetido
+        status_por_id = {cambio.id: cambio.status for cambio in cambios}
+
+        try:
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                respuesta_por_id: Dict[int, Optional[str]] = {}
+                if respuesta and campos:
+                    async def leer_bloque(ids: List[int]) -> List[dict]:
+                        response = await client.get(
+                            url,
+                            params={"id": f"in.({','.join(map(str, ids))})", "select": "id," + ",".join(RESPUESTA_CAMPOS)},
+                            headers=headers
+                        )
+                        response.raise_for_status()
+                        return response.json()
+
+                    paginas = await asyncio.gather(*(leer_bloque(ids) for ids in chunked(list(status_por_id), IN_FILTER_CHUNK)))
+                    for fila in (fila for pagina in paginas for fila in pagina):
+                        respuesta_por_id[fila["id"]] = respuesta.format_map(
+                            {campo: fila.get(campo) or "" for campo in RESPUESTA_CAMPOS}
+                        )
+                    # Ids que no existen en el tenant no se parchean
+                    status_por_id = {i: s for i, s in status_por_id.items() if i in respuesta_por_id}
+                elif respuesta:
+                    respuesta_por_id = dict.fromkeys(status_por_id, respuesta)
+
+                grupos: Dict[Tuple[str, Optional[str]], List[int]] = {}
+                for message_id, status in status_por_id.items():
+                    grupos.setdefault((status, respuesta_por_id.get(message_id)), []).append(message_id)
+
+                updated_at = datetime.utcnow().isoformat()
+
+                async def parchear_bloque(status: str, texto: Optional[str], ids: List[int]) -> List[dict]:
+                    update_data = {"status": status, "updated_at": updated_at}
+                    if texto:
+                        update_data["respuesta"] = texto
+                    if atendido_por:
+                        update_data["atendido_por"] = atendido_por
+                    response = await client.patch(
+                        url,
+                        params={"id": f"in.({','.join(map(str, ids))})", "select": "id"},
+                        headers={**headers, "Prefer": "return=representation"},
+                        json=update_data
+                    )
+                    response.raise_for_status()
+                    return response.json()
+
+                paginas = await asyncio.gather(*(
+                    parchear_bloque(status, texto, bloque)
+                    for (status, texto), ids in grupos.items()
+                    for bloque in chunked(ids, IN_FILTER_CHUNK)
+                ))
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=500, detail="Error actualizando los mensajes")
+
+        actualizados = {fila["id"] for pagina in paginas for fila in pagina}
+        self._stats_cache.pop(tenant, None)
+        return {
+            "success": True,
+            "actualizados": len(actualizados),
+            "no_encontrados": sorted({cambio.id for cambio in cambios} - actualizados),
+            "solicitudes": len(paginas)
+        }
@@ -7,6 +7,8 @@ import os
 import sys
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# back/ contiene el paquete shared (en la imagen se copia junto al servicio)
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -19,6 +21,7 @@ if not all([SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE_KEY]):
     raise RuntimeError("Variables de entorno de Supabase no configuradas. Verifica tu archivo .env")
 
 from routes.contact_routes import router as contact_router
+from utils.contact_queue import contact_queue
 
 app = FastAPI(
     title="Contact Microservice",
@@ -59,6 +62,15 @@ async def validation_exception_handler(request, exc):
 # Registrar rutas
 app.include_router(contact_router)
 
+# Worker de la cola write-behind del formulario de contacto
+@app.on_event("startup")
+async def start_contact_queue():
+    await contact_queue.start()
+
+@app.on_event("shutdown")
+async def stop_contact_queue():
+    await contact_queue.stop()
+
 # Endpoints básicos
 @app.get("/")
 async def root():
@@ -70,10 +82,12 @@ async def root():
 
 @app.get("/health")
 async def health():
+    cola = contact_queue.status()
     return {
-        "status": "healthy",
+        "status": "healthy" if cola["worker"] == "activo" else "degraded",
         "timestamp": datetime.utcnow().isoformat(),
-        "service": "contact"
+        "service": "contact",
+        "contact_queue": cola
     }
 
 # Manejo de errores global
@@ -7,7 +7,7 @@ from typing import Optional
 from datetime import datetime
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class ContactMessage(BaseModel):
@@ -65,4 +65,13 @@ class ContactStats(BaseModel):
     mensajes_pendientes: int
     mensajes_respondidos: int
     tenant: str
-    ultimo_mensaje: Optional[datetime]
\ No newline at end of file
+    ultimo_mensaje: Optional[datetime]
+
+class ContactStatusChange(BaseModel):
+    id: int
+    status: str
+
+class ContactBulkStatusUpdate(BaseModel):
+    """Cambio de estado en bloque; respuesta admite {nombre}, {email} y {asunto}"""
+    cambios: List[ContactStatusChange] = Field(..., min_length=1, max_length=5000)
+    respuesta: Optional[str] = None
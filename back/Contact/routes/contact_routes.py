@@ -1,11 +1,16 @@
-from fastapi import APIRouter, HTTPException, Request, Header, Depends
+from fastapi import APIRouter, HTTPException, Request, Header, Depends, Query
 from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
 from typing import Optional, List
+from datetime import datetime
 import httpx
 
-from models.contact import ContactMessage, ContactMessageResponse, ContactStats, ContactMessageUpdate
+from models.contact import ContactMessage, ContactMessageResponse, ContactStats, ContactMessageUpdate, ContactBulkStatusUpdate
 from controllers.contact_controller import ContactController
 from utils.supabase import get_tenant_from_email, get_current_user
+from utils.contact_queue import QueueFull
+from utils.pagination import DEFAULT_LIMIT, MAX_LIMIT
+from utils.rate_limit import ip_limiter, email_limiter, duplicate_filter, content_fingerprint
 
 router = APIRouter(prefix="/api/contact", tags=["Contact"])
 
@@ -17,6 +22,9 @@ async def send_contact_message(request: Request):
     """
     Enviar un mensaje de contacto
     El tenant se determina automáticamente por el dominio del email
+    Responde 202 apenas el mensaje queda en la cola; la inserción es en segundo plano.
+    El `id` de la respuesta es el id hexadecimal del spool (columna spool_id), no el id de la fila
+    Limita por IP y por email, y descarta duplicados, antes de tocar Supabase
     """
     try:
         # Get the raw JSON body
@@ -37,13 +45,43 @@ async def send_contact_message(request: Request):
         user_agent = request.headers.get("user-agent")
         ip_address = request.client.host if request.client else None
         
-        result = await contact_controller.create_contact_message(
-            message=message,
-            user_agent=user_agent,
-            ip_address=ip_address
-        )
+        # Rate limiting en memoria: se rechaza antes de cualquier llamada a Supabase
+        for limiter, key in ((ip_limiter, ip_address), (email_limiter, message.email.lower())):
+            if not key:
+                continue
+            allowed, retry_after = limiter.acquire(key)
+            if not allowed:
+                return JSONResponse(
+                    status_code=429,
+                    content={"success": False, "message": "Demasiados mensajes, intenta nuevamente más tarde"},
+                    headers={"Retry-After": str(int(retry_after) + 1)}
+                )
         
-        return result
+        fingerprint = content_fingerprint(message.email, message.asunto, message.mensaje)
+        if duplicate_filter.check_and_add(fingerprint):
+            return JSONResponse(
+                status_code=409,
+                content={"success": False, "message": "Este mensaje ya fue enviado recientemente"}
+            )
+        
+        try:
+            result = await contact_controller.accept_contact_message(
+                message=message,
+                user_agent=user_agent,
+                ip_address=ip_address
+            )
+        except QueueFull:
+            duplicate_filter.discard(fingerprint)
+            return JSONResponse(
+                status_code=503,
+                content={"success": False, "message": "Servicio saturado, intenta nuevamente en unos segundos"},
+                headers={"Retry-After": "5"}
+            )
+        except HTTPException as e:
+            duplicate_filter.discard(fingerprint)
+            return JSONResponse(status_code=e.status_code, content={"success": False, "message": e.detail})
+        
+        return JSONResponse(status_code=202, content=result)
         
     except Exception as e:
         return {
@@ -54,11 +92,17 @@ async def send_contact_message(request: Request):
 @router.get("/messages/{tenant}", response_model=dict)
 async def get_contact_messages(
     tenant: str,
-    limit: int = 50,
+    limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    q: Optional[str] = Query(default=None, description="Búsqueda de texto en asunto y mensaje"),
     authorization: str = Header(None)
 ):
     """
     Obtener mensajes de contacto por tenant (requiere autenticación)
+    Paginado por cursor: pasar next_cursor de la respuesta para la página siguiente
     """
     try:
         # Verificar autenticación
@@ -75,7 +119,9 @@ async def get_contact_messages(
         else:
             raise HTTPException(status_code=401, detail="Autenticación requerida")
         
-        result = await contact_controller.get_contact_messages(tenant, limit)
+        result = await contact_controller.get_contact_messages(
+            tenant, limit, cursor=cursor, status=status, desde=desde, hasta=hasta, q=q
+        )
         return result
         
     except HTTPException:
@@ -149,6 +195,37 @@ async def update_message_status(
     except Exception as e:
         raise HTTPException(status_code=500, detail="Error actualizando mensaje")
 
+@router.patch("/messages/status/bulk", response_model=dict)
+async def bulk_update_message_status(
+    update: ContactBulkStatusUpdate,
+    authorization: str = Header(None)
+):
+    """
+    Actualizar el estado de muchos mensajes a la vez (requiere autenticación)
+    La respuesta opcional es una plantilla con {nombre}, {email} y {asunto}
+    """
+    try:
+        # Verificar autenticación
+        if not authorization:
+            raise HTTPException(status_code=401, detail="Autenticación requerida")
+        
+        user = await get_current_user(authorization)
+        tenant = get_tenant_from_email(user["email"])
+        
+        result = await contact_controller.bulk_update_status(
+            tenant=tenant,
+            cambios=update.cambios,
+            respuesta=update.respuesta,
+            atendido_por=user["email"]
+        )
+        
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error actualizando mensajes")
+
 @router.get("/tenants", response_model=dict)
 async def get_supported_tenants():
     """
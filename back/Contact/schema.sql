@@ -88,4 +88,45 @@ CREATE TRIGGER update_upb_contact_updated_at BEFORE UPDATE ON tenant_upb_contact
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 CREATE TRIGGER update_gmail_contact_updated_at BEFORE UPDATE ON tenant_gmail_contact_messages 
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
\ No newline at end of file
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- ═══════════════════════════════════════════════════════════════
+-- 🔹 PAGINACIÓN Y BÚSQUEDA EN LA BANDEJA (migración)
+-- ═══════════════════════════════════════════════════════════════
+-- La bandeja se pagina por cursor sobre (created_at, id) y se busca por texto
+-- en asunto/mensaje con busqueda=wfts(spanish).<consulta> desde PostgREST.
+-- El vector de búsqueda es una columna generada: no hay que mantenerlo a mano.
+
+ALTER TABLE tenant_ucb_contact_messages ADD COLUMN IF NOT EXISTS busqueda tsvector
+    GENERATED ALWAYS AS (to_tsvector('spanish', coalesce(asunto, '') || ' ' || mensaje)) STORED;
+CREATE INDEX IF NOT EXISTS idx_ucb_contact_busqueda ON tenant_ucb_contact_messages USING GIN (busqueda);
+CREATE INDEX IF NOT EXISTS idx_ucb_contact_cursor ON tenant_ucb_contact_messages(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_ucb_contact_status_cursor ON tenant_ucb_contact_messages(status, created_at DESC, id DESC);
+
+ALTER TABLE tenant_upb_contact_messages ADD COLUMN IF NOT EXISTS busqueda tsvector
+    GENERATED ALWAYS AS (to_tsvector('spanish', coalesce(asunto, '') || ' ' || mensaje)) STORED;
+CREATE INDEX IF NOT EXISTS idx_upb_contact_busqueda ON tenant_upb_contact_messages USING GIN (busqueda);
+CREATE INDEX IF NOT EXISTS idx_upb_contact_cursor ON tenant_upb_contact_messages(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_upb_contact_status_cursor ON tenant_upb_contact_messages(status, created_at DESC, id DESC);
+
+ALTER TABLE tenant_gmail_contact_messages ADD COLUMN IF NOT EXISTS busqueda tsvector
+    GENERATED ALWAYS AS (to_tsvector('spanish', coalesce(asunto, '') || ' ' || mensaje)) STORED;
+CREATE INDEX IF NOT EXISTS idx_gmail_contact_busqueda ON tenant_gmail_contact_messages USING GIN (busqueda);
+CREATE INDEX IF NOT EXISTS idx_gmail_contact_cursor ON tenant_gmail_contact_messages(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_gmail_contact_status_cursor ON tenant_gmail_contact_messages(status, created_at DESC, id DESC);
+
+-- ═══════════════════════════════════════════════════════════════
+-- 🔹 INSERCIÓN IDEMPOTENTE DESDE LA COLA (migración)
+-- ═══════════════════════════════════════════════════════════════
+-- El worker de la cola inserta con on_conflict=spool_id e ignora duplicados:
+-- reintentar un lote que la base ya guardó (p. ej. tras un timeout) no duplica filas.
+-- Las filas anteriores a la cola quedan con spool_id NULL (no chocan entre sí).
+
+ALTER TABLE tenant_ucb_contact_messages ADD COLUMN IF NOT EXISTS spool_id VARCHAR(32);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ucb_contact_spool_id ON tenant_ucb_contact_messages(spool_id);
+
+ALTER TABLE tenant_upb_contact_messages ADD COLUMN IF NOT EXISTS spool_id VARCHAR(32);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_upb_contact_spool_id ON tenant_upb_contact_messages(spool_id);
+
+ALTER TABLE tenant_gmail_contact_messages ADD COLUMN IF NOT EXISTS spool_id VARCHAR(32);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_gmail_contact_spool_id ON tenant_gmail_contact_messages(spool_id);
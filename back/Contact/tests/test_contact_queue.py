@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+import utils.contact_queue as contact_queue
+from utils.contact_queue import ContactWriteQueue, QueueFull
+
+_sleep = asyncio.sleep
+
+
+def mensaje(n, tenant="ucb.edu.bo"):
+    return {"nombre": f"Ana {n}", "email": f"ana{n}@ucb.edu.bo", "mensaje": f"Hola {n}",
+            "asunto": None, "telefono": None, "tenant": tenant, "status": "pendiente",
+            "user_agent": "pytest", "ip_address": "127.0.0.1"}
+
+
+def leer(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class FakeSupabase:
+    """insert_contact_messages con respuestas programadas por llamada"""
+
+    def __init__(self, *respuestas):
+        self.respuestas = list(respuestas)
+        self.llamadas = []
+
+    async def insert(self, tenant, rows):
+        self.llamadas.append((tenant, [row["spool_id"] for row in rows]))
+        respuesta = self.respuestas.pop(0) if self.respuestas else ([], [])
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+    async def user_ids(self, tenant, emails):
+        return {"ana1@ucb.edu.bo": 7}
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    def instalar(*respuestas):
+        fake = FakeSupabase(*respuestas)
+        monkeypatch.setattr(contact_queue, "insert_contact_messages", fake.insert)
+        monkeypatch.setattr(contact_queue, "get_user_ids_by_email", fake.user_ids)
+        return fake
+    return instalar
+
+
+@pytest.fixture(autouse=True)
+def sin_backoff(monkeypatch):
+    """Los reintentos no esperan el backoff real"""
+    async def sleep(seconds):
+        await _sleep(0)
+    monkeypatch.setattr(contact_queue.asyncio, "sleep", sleep)
+
+
+def nueva_cola(tmp_path, **kwargs):
+    return ContactWriteQueue(spool_dir=str(tmp_path), flush_interval=0.01, **kwargs)
+
+
+def test_rechaza_cuando_la_cola_esta_llena(tmp_path):
+    async def escenario():
+        cola = nueva_cola(tmp_path, maxsize=1)
+        await cola.enqueue(mensaje(1))
+        with pytest.raises(QueueFull):
+            await cola.enqueue(mensaje(2))
+        assert len(cola) == 1
+        assert cola.status()["worker"] == "detenido"
+
+    asyncio.run(escenario())
+
+
+def test_inserta_en_bloque_y_compacta_el_spool(tmp_path, supabase):
+    fake = supabase()
+
+    async def escenario():
+        cola = nueva_cola(tmp_path)
+        await cola.start()
+        assert cola.status()["worker"] == "activo"
+        ids = [await cola.enqueue(mensaje(n)) for n in (1, 2)]
+        await cola.stop()
+        return ids
+
+    ids = asyncio.run(escenario())
+    assert fake.llamadas == [("ucb.edu.bo", ids)]
+    # Cola vacía: spool y acked se truncan
+    assert leer(tmp_path / "spool.jsonl") == []
+    assert leer(tmp_path / "acked.jsonl") == []
+
+
+def test_reintenta_solo_las_filas_pendientes(tmp_path, supabase):
+    fake = supabase(([], [1]), httpx.ConnectError("sin red"), ([], []))
+
+    async def escenario():
+        cola = nueva_cola(tmp_path)
+        await cola.start()
+        ids = [await cola.enqueue(mensaje(n)) for n in (1, 2)]
+        await cola.stop()
+        return ids, cola.status()
+
+    ids, status = asyncio.run(escenario())
+    assert fake.llamadas == [("ucb.edu.bo", ids), ("ucb.edu.bo", ids[1:]), ("ucb.edu.bo", ids[1:])]
+    assert "ConnectError" in status["ultimo_error"]
+    assert leer(tmp_path / "dead.jsonl") == []
+
+
+def test_filas_rechazadas_y_errores_inesperados_van_a_dead(tmp_path, supabase):
+    supabase(([0], []), RuntimeError("bug"))
+
+    async def escenario():
+        cola = nueva_cola(tmp_path, batch_size=1)
+        await cola.start()
+        ids = [await cola.enqueue(mensaje(n)) for n in (1, 2)]
+        await cola.stop()
+        return ids, cola.status()
+
+    ids, status = asyncio.run(escenario())
+    assert [item["spool_id"] for item in leer(tmp_path / "dead.jsonl")] == ids
+    assert status["worker"] == "detenido"
+    assert status["pendientes"] == 0
+
+
+def test_recupera_del_spool_lo_no_confirmado(tmp_path, supabase):
+    fake = supabase()
+
+    async def escenario():
+        anterior = nueva_cola(tmp_path)
+        ids = [await anterior.enqueue(mensaje(n)) for n in (1, 2, 3)]
+        # Simula un corte después de confirmar solo el primero
+        anterior._append(anterior.acked_path, [{"spool_id": ids[0]}])
+        with open(anterior.spool_path, "a", encoding="utf-8") as f:
+            f.write('{"spool_id": "trunc')
+
+        cola = nueva_cola(tmp_path)
+        await cola.start()
+        await cola.stop()
+        return ids
+
+    ids = asyncio.run(escenario())
+    assert fake.llamadas == [("ucb.edu.bo", ids[1:])]
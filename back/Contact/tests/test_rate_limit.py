@@ -0,0 +1,64 @@
+from utils.rate_limit import DuplicateFilter, TokenBucketLimiter, content_fingerprint
+
+
+def test_bucket_permite_la_rafaga_y_luego_limita():
+    limiter = TokenBucketLimiter(capacity=2, refill_per_sec=0.5)
+    assert limiter.acquire("1.2.3.4", now=0) == (True, 0.0)
+    assert limiter.acquire("1.2.3.4", now=0) == (True, 0.0)
+    allowed, retry_after = limiter.acquire("1.2.3.4", now=0)
+    assert not allowed and retry_after == 2.0
+    # Otra clave tiene su propio bucket
+    assert limiter.acquire("5.6.7.8", now=0)[0]
+
+
+def test_bucket_se_recarga_con_el_tiempo_sin_pasar_la_capacidad():
+    limiter = TokenBucketLimiter(capacity=2, refill_per_sec=0.5)
+    limiter.acquire("ip", now=0)
+    limiter.acquire("ip", now=0)
+    allowed, retry_after = limiter.acquire("ip", now=1)
+    assert not allowed and retry_after == 1.0
+    assert limiter.acquire("ip", now=2)[0]
+    # Mucho tiempo inactivo: solo se acumula hasta la capacidad
+    assert [limiter.acquire("ip", now=1000)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_bucket_expulsa_las_claves_menos_recientes():
+    limiter = TokenBucketLimiter(capacity=1, refill_per_sec=0.01, max_keys=2)
+    limiter.acquire("a", now=0)
+    limiter.acquire("b", now=0)
+    limiter.acquire("a", now=1)
+    limiter.acquire("c", now=1)
+    assert len(limiter) == 2
+    # "b" fue expulsada: vuelve con el bucket lleno; "c" sigue limitada
+    assert limiter.acquire("b", now=2)[0]
+    assert not limiter.acquire("c", now=2)[0]
+
+
+def test_duplicados_dentro_de_la_ventana():
+    filtro = DuplicateFilter(window=60)
+    assert not filtro.check_and_add("h1", now=0)
+    assert filtro.check_and_add("h1", now=30)
+    assert not filtro.check_and_add("h1", now=61)
+    assert len(filtro) == 1
+
+
+def test_discard_olvida_una_huella():
+    filtro = DuplicateFilter(window=60)
+    filtro.check_and_add("h1", now=0)
+    filtro.discard("h1")
+    assert not filtro.check_and_add("h1", now=1)
+
+
+def test_duplicados_respetan_max_keys():
+    filtro = DuplicateFilter(window=60, max_keys=2)
+    for i, huella in enumerate(("h1", "h2", "h3")):
+        filtro.check_and_add(huella, now=i)
+    assert len(filtro) == 2
+    assert not filtro.check_and_add("h1", now=3)
+
+
+def test_huella_ignora_mayusculas_y_espacios():
+    a = content_fingerprint("Ana@UCB.edu.bo", "Consulta", "Hola,  quiero   info")
+    b = content_fingerprint("ana@ucb.edu.bo", " consulta ", "hola, quiero info")
+    assert a == b
+    assert a != content_fingerprint("ana@ucb.edu.bo", None, "hola, quiero info")
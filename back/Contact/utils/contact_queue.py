@@ -0,0 +1,252 @@
+import asyncio
+import json
+import os
+import traceback
+import uuid
+from typing import Dict, List, Optional, Set
+
+import httpx
+
+from utils.supabase import insert_contact_messages, get_user_ids_by_email
+
+# Mensajes que pueden esperar en memoria antes de rechazar con 503
+QUEUE_MAXSIZE = int(os.getenv("CONTACT_QUEUE_MAXSIZE", "10000"))
+# Filas por inserción en bloque
+FLUSH_BATCH_SIZE = int(os.getenv("CONTACT_FLUSH_BATCH_SIZE", "200"))
+# Espera máxima para juntar un lote antes de insertarlo (segundos)
+FLUSH_INTERVAL = float(os.getenv("CONTACT_FLUSH_INTERVAL", "1.0"))
+# Directorio del spool local que sobrevive a reinicios
+SPOOL_DIR = os.getenv("CONTACT_SPOOL_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "spool"))
+
+MAX_BACKOFF = 60.0
+
+CONTACT_COLUMNS = ("spool_id", "nombre", "email", "mensaje", "asunto", "telefono", "tenant", "status", "user_agent", "ip_address")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ContactWriteQueue:
+    """
+    Cola write-behind para el formulario de contacto.
+
+    Cada mensaje se agrega primero a spool.jsonl y luego a la cola en memoria;
+    el worker inserta lotes agrupados por tenant y registra los ids ya
+    persistidos en acked.jsonl. Al reiniciar se reencolan los mensajes del
+    spool que no fueron confirmados; cuando la cola queda vacía ambos archivos
+    se compactan (truncan).
+
+    La inserción es idempotente (upsert sobre la columna única spool_id), así
+    que reintentar un lote que quizá ya se insertó no duplica filas.
+    """
+
+    def __init__(self, spool_dir: str = SPOOL_DIR, maxsize: int = QUEUE_MAXSIZE,
+                 batch_size: int = FLUSH_BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.spool_path = os.path.join(spool_dir, "spool.jsonl")
+        self.acked_path = os.path.join(spool_dir, "acked.jsonl")
+        self.dead_path = os.path.join(spool_dir, "dead.jsonl")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._spool_dir = spool_dir
+        self.maxsize = maxsize
+        # Sin maxsize propio: el cupo se controla con _reserved para no perder
+        # un lugar entre el chequeo y el put (hay un await de por medio)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._reserved = 0
+        self._file_lock = asyncio.Lock()
+        self._in_flight = 0
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+
+    def __len__(self) -> int:
+        return self._queue.qsize() + self._in_flight
+
+    def status(self) -> Dict:
+        """Estado del worker para el health check"""
+        if self._worker is None:
+            estado = "detenido"
+        elif self._worker.done():
+            estado = "caido"
+        else:
+            estado = "activo"
+        return {
+            "worker": estado,
+            "pendientes": len(self),
+            "reinicios": self.restarts,
+            "ultimo_error": self.last_error
+        }
+
+    async def enqueue(self, contact_data: Dict) -> str:
+        """Aceptar un mensaje: durable en el spool antes de confirmar al cliente"""
+        # Chequeo y reserva sin await entre medio: dos requests no toman el mismo lugar
+        if self._queue.qsize() + self._reserved >= self.maxsize:
+            raise QueueFull()
+        self._reserved += 1
+        try:
+            item = {"spool_id": uuid.uuid4().hex, **contact_data}
+            async with self._file_lock:
+                await asyncio.to_thread(self._append, self.spool_path, [item])
+                self._queue.put_nowait(item)
+        finally:
+            self._reserved -= 1
+        return item["spool_id"]
+
+    async def start(self):
+        os.makedirs(self._spool_dir, exist_ok=True)
+        for item in await asyncio.to_thread(self._pending_from_spool):
+            self._queue.put_nowait(item)
+        if self._queue.qsize():
+            print(f"📦 {self._queue.qsize()} mensajes de contacto recuperados del spool")
+        self._stopping = False
+        self._start_worker()
+
+    def _start_worker(self):
+        self._worker = asyncio.create_task(self._run())
+        self._worker.add_done_callback(self._on_worker_done)
+
+    def _on_worker_done(self, task: asyncio.Task):
+        # _run no debería terminar nunca; si lo hace (salvo en stop) se relanza
+        if self._stopping or task.cancelled():
+            return
+        error = task.exception()
+        self.last_error = repr(error)
+        self.restarts += 1
+        print(f"❌ Worker de la cola de contacto terminó inesperadamente, reiniciando: {error!r}")
+        self._start_worker()
+
+    async def stop(self, timeout: float = 10.0):
+        """Intentar vaciar la cola; lo que quede sigue en el spool para el próximo arranque"""
+        if self._worker is None:
+            return
+        self._stopping = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ {len(self)} mensajes de contacto quedan en el spool")
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            # Juntar más mensajes hasta completar el lote o agotar el intervalo
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            self._in_flight = len(batch)
+            try:
+                await self._flush_with_retry(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Fallo fuera de la inserción (p. ej. al escribir el spool): se registra,
+                # el worker sigue y el lote vuelve a la cola (reinsertar es idempotente)
+                self.last_error = repr(e)
+                print(f"❌ Error procesando un lote de contacto: {e!r}")
+                traceback.print_exc()
+                await asyncio.sleep(self.flush_interval)
+                for item in batch:
+                    self._queue.put_nowait(item)
+            finally:
+                self._in_flight = 0
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush_with_retry(self, batch: List[Dict]):
+        por_tenant: Dict[str, List[Dict]] = {}
+        for item in batch:
+            por_tenant.setdefault(item["tenant"], []).append(item)
+
+        # Cada tenant se reintenta por separado, y solo con las filas aún pendientes
+        for tenant, items in por_tenant.items():
+            backoff = 1.0
+            while items:
+                try:
+                    items = await self._flush_tenant(tenant, items)
+                except httpx.HTTPError as e:
+                    # Base no disponible: el lote se reintenta (el upsert por spool_id evita duplicados)
+                    self.last_error = repr(e)
+                    print(f"⚠️ Error insertando mensajes de contacto, reintento en {backoff:.0f}s: {e}")
+                except Exception as e:
+                    # Error inesperado: el lote va a dead.jsonl en lugar de bloquear la cola
+                    self.last_error = repr(e)
+                    print(f"❌ Error inesperado insertando mensajes de contacto: {e!r}")
+                    traceback.print_exc()
+                    await asyncio.to_thread(self._append, self.dead_path, items)
+                    break
+                if items:
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, MAX_BACKOFF)
+
+        async with self._file_lock:
+            await asyncio.to_thread(self._append, self.acked_path, [{"spool_id": item["spool_id"]} for item in batch])
+            if self._queue.empty():
+                await asyncio.to_thread(self._compact)
+
+    async def _flush_tenant(self, tenant: str, items: List[Dict]) -> List[Dict]:
+        """Insertar los mensajes de un tenant; devuelve los que hay que reintentar"""
+        # Un solo lookup de usuarios por lote en lugar de uno por mensaje
+        user_ids = await get_user_ids_by_email(tenant, [item["email"] for item in items])
+        rows = []
+        for item in items:
+            # Todas las filas con las mismas columnas: PostgREST lo exige en inserciones en bloque
+            row = {column: item.get(column) for column in CONTACT_COLUMNS}
+            row["user_id"] = user_ids.get(item["email"].lower())
+            rows.append(row)
+
+        rejected, pending = await insert_contact_messages(tenant, rows)
+        if rejected:
+            # Filas que la base rechaza (4xx) no se reintentan: quedan en dead.jsonl
+            dead = [items[i] for i in rejected]
+            print(f"⚠️ {len(dead)} mensajes de contacto rechazados por la base")
+            await asyncio.to_thread(self._append, self.dead_path, dead)
+        return [items[i] for i in pending]
+
+    @staticmethod
+    def _append(path: str, items: List[Dict]):
+        with open(path, "a", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(item, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _compact(self):
+        for path in (self.spool_path, self.acked_path):
+            open(path, "w").close()
+
+    def _pending_from_spool(self) -> List[Dict]:
+        acked: Set[str] = set()
+        for item in self._read(self.acked_path):
+            acked.add(item["spool_id"])
+        return [item for item in self._read(self.spool_path) if item["spool_id"] not in acked]
+
+    @staticmethod
+    def _read(path: str) -> List[Dict]:
+        if not os.path.exists(path):
+            return []
+        items = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    # Línea truncada por un corte durante la escritura
+                    continue
+        return items
+
+
+contact_queue = ContactWriteQueue()
@@ -0,0 +1,15 @@
+from typing import Dict, List, Optional, Tuple
+
+from shared import pagination
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def keyset_params(cursor: Optional[str], limit: int) -> List[Tuple[str, str]]:
+    """Parámetros de PostgREST para paginar por (created_at desc, id desc); un cursor inválido lanza ValueError"""
+    return pagination.keyset_params(cursor, limit, MAX_LIMIT)
+
+
+def next_cursor(rows: List[Dict], limit: int) -> Optional[str]:
+    return pagination.next_cursor(rows, limit, MAX_LIMIT)
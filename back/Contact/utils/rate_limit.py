@@ -0,0 +1,106 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Límite por IP: ráfaga de 5 mensajes, luego 1 cada 60 s
+IP_CAPACITY = float(os.getenv("CONTACT_RATE_IP_CAPACITY", "5"))
+IP_REFILL_PER_SEC = float(os.getenv("CONTACT_RATE_IP_REFILL", str(1 / 60)))
+# Límite por email: ráfaga de 3 mensajes, luego 1 cada 5 min
+EMAIL_CAPACITY = float(os.getenv("CONTACT_RATE_EMAIL_CAPACITY", "3"))
+EMAIL_REFILL_PER_SEC = float(os.getenv("CONTACT_RATE_EMAIL_REFILL", str(1 / 300)))
+# Ventana en la que un mensaje idéntico se considera duplicado (segundos)
+DUPLICATE_WINDOW = float(os.getenv("CONTACT_DUPLICATE_WINDOW", "600"))
+# Máximo de claves en memoria por estructura; se expulsan las más antiguas
+MAX_KEYS = int(os.getenv("CONTACT_RATE_MAX_KEYS", "50000"))
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket por clave (IP o email).
+
+    Cada bucket es solo [tokens, último_acceso] en un OrderedDict ordenado por
+    uso; al superar max_keys se expulsan los menos recientes. Un bucket
+    expulsado equivale a uno lleno, así que solo se pierde el estado de
+    claves inactivas.
+    """
+
+    def __init__(self, capacity: float, refill_per_sec: float, max_keys: int = MAX_KEYS):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Consumir un token; devuelve (permitido, segundos hasta el próximo token)"""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [self.capacity, now]
+            self._buckets[key] = bucket
+            self._evict()
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill_per_sec)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True, 0.0
+        return False, (1 - bucket[0]) / self.refill_per_sec
+
+    def _evict(self):
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+
+class DuplicateFilter:
+    """Huellas de contenido vistas en la ventana deslizante, en orden de llegada"""
+
+    def __init__(self, window: float = DUPLICATE_WINDOW, max_keys: int = MAX_KEYS):
+        self.window = window
+        self.max_keys = max_keys
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def check_and_add(self, fingerprint: str, now: Optional[float] = None) -> bool:
+        """True si la huella ya se vio dentro de la ventana; si no, la registra"""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        if fingerprint in self._seen:
+            return True
+        self._seen[fingerprint] = now
+        while len(self._seen) > self.max_keys:
+            self._seen.popitem(last=False)
+        return False
+
+    def discard(self, fingerprint: str):
+        """Olvidar una huella cuyo mensaje finalmente no se aceptó"""
+        self._seen.pop(fingerprint, None)
+
+    def _expire(self, now: float):
+        # Las entradas están ordenadas por tiempo: basta con recortar desde el inicio
+        while self._seen:
+            fingerprint, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.window:
+                break
+            self._seen.popitem(last=False)
+
+
+def content_fingerprint(email: str, asunto: Optional[str], mensaje: str) -> str:
+    """Hash del contenido normalizado (mayúsculas y espacios no cuentan)"""
+    normalized = "\x1f".join(
+        " ".join((value or "").lower().split()) for value in (email, asunto, mensaje)
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+ip_limiter = TokenBucketLimiter(IP_CAPACITY, IP_REFILL_PER_SEC)
+email_limiter = TokenBucketLimiter(EMAIL_CAPACITY, EMAIL_REFILL_PER_SEC)
+duplicate_filter = DuplicateFilter()
@@ -1,15 +1,25 @@
 import httpx
 import os
-from typing import Optional, Dict
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple
 from fastapi import HTTPException, Header
 import jwt
 
+from shared.postgrest import chunked, content_range_total, in_filter
+from utils.pagination import keyset_params
+
 # Variables de entorno
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", SUPABASE_ANON_KEY)
 
+# Ids por filtro id=in.(...) para no exceder el largo de la URL
+IN_FILTER_CHUNK = 500
+
+# Columnas de la bandeja (sin el tsvector de búsqueda)
+MESSAGE_COLUMNS = "id,nombre,email,mensaje,asunto,telefono,tenant,status,user_id,user_agent,ip_address,respuesta,atendido_por,created_at,updated_at"
+
 def get_tenant_from_email(email: str) -> Optional[str]:
     """Obtener dominio del tenant según el email - Similar al C# Program.cs"""
     if not email:
@@ -76,80 +86,93 @@ async def get_current_user(authorization: str = Header(None)) -> Dict:
     except jwt.InvalidTokenError as e:
         raise HTTPException(status_code=401, detail="Token inválido")
 
-async def get_user_by_email(email: str, tenant: str) -> Optional[Dict]:
-    """Obtener datos del usuario por email según el tenant"""
-    try:
-        table_prefix = get_tenant_table_prefix(tenant)
-        table_name = f"{table_prefix}_usuarios"
-        
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            headers = {
-                "apikey": SUPABASE_SERVICE_ROLE_KEY,
-                "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}"
-            }
-            response = await client.get(
-                f"{SUPABASE_URL}/rest/v1/{table_name}?email=eq.{email}&select=*",
-                headers=headers
-            )
-            if response.status_code == 200:
-                users = response.json()
-                return users[0] if users else None
-    except Exception as e:
-        return None
+async def get_contact_messages_by_tenant(tenant: str, limit: int = 50, cursor: Optional[str] = None,
+                                         status: Optional[str] = None, desde: Optional[datetime] = None,
+                                         hasta: Optional[datetime] = None,
+                                         q: Optional[str] = None) -> Tuple[List[Dict], Optional[int]]:
+    """
+    Una página de mensajes del tenant (más recientes primero) y el total estimado
+    de mensajes que cumplen los filtros (count=estimated, None si no viene)
+    Filtros y búsqueda de texto (índice GIN sobre asunto/mensaje) se resuelven en la base;
+    un cursor inválido lanza ValueError
+    """
+    table_prefix = get_tenant_table_prefix(tenant)
+    table_name = f"{table_prefix}_contact_messages"
+    
+    params = keyset_params(cursor, limit)
+    params.append(("select", MESSAGE_COLUMNS))
+    if status:
+        params.append(("status", f"eq.{status}"))
+    if desde:
+        params.append(("created_at", f"gte.{desde.isoformat()}"))
+    if hasta:
+        params.append(("created_at", f"lte.{hasta.isoformat()}"))
+    if q and q.strip():
+        params.append(("busqueda", f"wfts(spanish).{q.strip()}"))
+    
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        headers = {
+            "apikey": SUPABASE_SERVICE_ROLE_KEY,
+            "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
+            "Prefer": "count=estimated"
+        }
+        response = await client.get(
+            f"{SUPABASE_URL}/rest/v1/{table_name}",
+            params=params,
+            headers=headers
+        )
+        response.raise_for_status()
+        return response.json(), content_range_total(response.headers.get("content-range"))
 
-async def create_contact_message(contact_data: Dict, tenant: str) -> Optional[Dict]:
-    """Crear mensaje de contacto en la tabla correspondiente al tenant"""
-    try:
-        table_prefix = get_tenant_table_prefix(tenant)
-        table_name = f"{table_prefix}_contact_messages"
-        
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            headers = {
-                "apikey": SUPABASE_SERVICE_ROLE_KEY,
-                "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
-                "Content-Type": "application/json",
-                "Prefer": "return=representation"
-            }
-            
-            response = await client.post(
-                f"{SUPABASE_URL}/rest/v1/{table_name}",
-                headers=headers,
-                json=contact_data
-            )
-            
-            if response.status_code == 201:
-                try:
-                    result = response.json()
-                    return result
-                except Exception as json_error:
-                    # Return a basic success response if JSON parsing fails
-                    return {"success": True, "message": "Contact message created"}
-            elif response.status_code == 409:
-                return None
-            elif response.status_code == 400:
-                return None
-            else:
-                return None
-                
-    except Exception as e:
-        return None
+async def get_user_ids_by_email(tenant: str, emails: List[str]) -> Dict[str, int]:
+    """Resolver muchos emails a user_id con una consulta email=in.(...); claves en minúsculas"""
+    emails = list(dict.fromkeys(e for e in emails if e))
+    if not emails:
+        return {}
+    table_name = f"{get_tenant_table_prefix(tenant)}_usuarios"
+    
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        headers = {
+            "apikey": SUPABASE_SERVICE_ROLE_KEY,
+            "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}"
+        }
+        response = await client.get(
+            f"{SUPABASE_URL}/rest/v1/{table_name}",
+            params={"email": in_filter(emails), "select": "id,email"},
+            headers=headers
+        )
+        response.raise_for_status()
+        return {user["email"].lower(): user["id"] for user in response.json()}
 
-async def get_contact_messages_by_tenant(tenant: str, limit: int = 50) -> list:
-    """Obtener mensajes de contacto del tenant"""
-    try:
-        table_prefix = get_tenant_table_prefix(tenant)
-        table_name = f"{table_prefix}_contact_messages"
+async def insert_contact_messages(tenant: str, rows: List[Dict]) -> Tuple[List[int], List[int]]:
+    """
+    Insertar mensajes en bloque, idempotente: upsert sobre spool_id que ignora
+    las filas ya insertadas (un reintento no duplica). Errores de red se propagan.
+    Si el bloque falla se prueba fila por fila y se devuelven los índices
+    (rechazadas por la base con 4xx, pendientes por un 5xx para reintentar)
+    """
+    table_name = f"{get_tenant_table_prefix(tenant)}_contact_messages"
+    url = f"{SUPABASE_URL}/rest/v1/{table_name}"
+    params = {"on_conflict": "spool_id"}
+    headers = {
+        "apikey": SUPABASE_SERVICE_ROLE_KEY,
+        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
+        "Content-Type": "application/json",
+        "Prefer": "resolution=ignore-duplicates,return=minimal"
+    }
+    
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        response = await client.post(url, params=params, headers=headers, json=rows)
+        if response.status_code < 400:
+            return [], []
+        if response.status_code >= 500:
+            return [], list(range(len(rows)))
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            headers = {
-                "apikey": SUPABASE_SERVICE_ROLE_KEY,
-                "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}"
-            }
-            response = await client.get(
-                f"{SUPABASE_URL}/rest/v1/{table_name}?order=created_at.desc&limit={limit}",
-                headers=headers
-            )
-            if response.status_code == 200:
-                return response.json()
-    except Exception as e:
-        return []
\ No newline at end of file
+        rejected, pending = [], []
+        for i, row in enumerate(rows):
+            response = await client.post(url, params=params, headers=headers, json=[row])
+            if response.status_code >= 500:
+                pending.append(i)
+            elif response.status_code >= 400:
+                rejected.append(i)
+        return rejected, pending
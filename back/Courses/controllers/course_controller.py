@@ -1,7 +1,10 @@
+import asyncio
+import hashlib
 import httpx
+import json
 from fastapi import HTTPException
 from datetime import datetime
-from typing import Dict
+from typing import AsyncIterator, Dict, List, Set, Tuple
 import sys
 import os
 
@@ -9,17 +12,65 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
-from models.course import Course, CourseEnrollment
+from models.course import Course, CourseEnrollment, TeacherAssignment
+from utils.cache import TTLCache
 from utils.supabase import (
     SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE_KEY,
-    get_tenant_from_email, get_tenant_info, get_user_by_email
+    get_tenant_from_email, get_tenant_info, get_user_by_email,
+    fetch_by_ids, fetch_all_rows, in_filter, chunked,
+    collect_ids, count_by_ids, delete_by_ids
 )
+from utils.bulk_import import batched
+from utils.course_search import get_search_index, index_courses, unindex_course
+from utils.schedule import ScheduleIndex, get_schedule_index, loaded_schedule_index
+
+# Cursos por usuario (schema, usuario_id); se invalida al inscribir/desinscribir
+_my_courses_cache = TTLCache(ttl=60.0)
+
+
+# Borrado en cascada de cursos: (tabla, columna de filtro, tabla padre cuyos ids se filtran).
+# Hijos antes que padres: un fallo a mitad nunca deja huérfanos y repetir la operación
+# completa lo que faltó. Incluye las tablas de Grades y Attendance.
+COURSE_CASCADE = [
+    ("notas", "inscripcion_id", "inscripciones"),
+    ("pesos_parciales", "configuracion_id", "configuracion_notas"),
+    ("configuracion_notas", "curso_id", "cursos"),
+    ("excusas", "curso_id", "cursos"),
+    ("asistencias", "curso_id", "cursos"),
+    ("inscripciones", "curso_id", "cursos"),
+    ("cursos", "id", "cursos"),
+]
+
+
+# Catálogo de cursos por tenant; se invalida en create/update/delete/assign_teacher
+_catalog_cache = TTLCache(ttl=600.0, maxsize=100)
+
+
+def invalidate_catalog(schema: str):
+    _catalog_cache.invalidate(schema)
+
+
+def is_capacity_error(response: httpx.Response) -> bool:
+    """El CHECK inscritos <= cupo de la tabla de cursos rechazó la escritura"""
+    try:
+        return response.json().get("code") == "23514"
+    except ValueError:
+        return False
+
+
+def invalidate_my_courses(schema: str, usuario_id: int = None):
+    """Invalidar la caché de "mis cursos" de un usuario o de todo el tenant"""
+    if usuario_id is None:
+        _my_courses_cache.invalidate_where(lambda key: key[0] == schema)
+    else:
+        _my_courses_cache.invalidate((schema, usuario_id))
+
 
 class CourseController:
     
     @staticmethod
-    async def list_courses(email: str) -> Dict:
-        """Listar todos los cursos del tenant"""
+    async def get_course_catalog(email: str) -> Dict:
+        """Snapshot del catálogo del tenant con su versión (ETag), cacheado en proceso"""
         tenant_domain = get_tenant_from_email(email)
         if not tenant_domain:
             raise HTTPException(status_code=400, detail="Tenant no identificado")
@@ -30,6 +81,14 @@ class CourseController:
         
         schema = tenant_info["schema_name"]
         
+        return await CourseController._fetch_catalog(schema)
+    
+    @staticmethod
+    async def _fetch_catalog(schema: str) -> Dict:
+        cached = _catalog_cache.get(schema)
+        if cached is not None:
+            return cached
+        
         async with httpx.AsyncClient(timeout=10.0) as client:
             headers = {
                 "apikey": SUPABASE_ANON_KEY,
@@ -41,10 +100,91 @@ class CourseController:
                 headers=headers
             )
             if response.status_code == 200:
-                return {"tenant": schema, "cursos": response.json()}
+                cursos = response.json()
+                version = hashlib.sha1(
+                    json.dumps(cursos, sort_keys=True, default=str).encode()
+                ).hexdigest()
+                catalog = {"tenant": schema, "cursos": cursos, "etag": f'"{version}"'}
+                _catalog_cache.set(schema, catalog)
+                return catalog
             else:
                 raise HTTPException(status_code=500, detail="Error al obtener cursos")
     
+    @staticmethod
+    async def search_courses(email: str, q: str, limit: int = 20, offset: int = 0) -> Dict:
+        """Buscar cursos por nombre, código o descripción (prefijo y difuso)"""
+        tenant_domain = get_tenant_from_email(email)
+        if not tenant_domain:
+            raise HTTPException(status_code=400, detail="Tenant no identificado")
+        
+        tenant_info = await get_tenant_info(tenant_domain)
+        if not tenant_info:
+            raise HTTPException(status_code=404, detail="Tenant no encontrado")
+        
+        schema = tenant_info["schema_name"]
+        
+        catalog = await CourseController._fetch_catalog(schema)
+        
+        async def load_courses():
+            return catalog["cursos"]
+        
+        index = await get_search_index(schema, load_courses)
+        total, page = index.search(q, limit, offset)
+        
+        # Los datos (y el conteo de inscritos) salen del catálogo vigente, no del índice
+        por_id = {curso["id"]: curso for curso in catalog["cursos"]}
+        cursos = [
+            {**por_id[curso_id], "score": score}
+            for curso_id, score in page if curso_id in por_id
+        ]
+        return {"tenant": schema, "q": q, "total": total, "limit": limit, "offset": offset, "cursos": cursos}
+    
+    @staticmethod
+    async def _schedule_index(schema: str) -> ScheduleIndex:
+        """Índice de horarios del tenant (cursos del catálogo + todas las inscripciones)"""
+        async def load():
+            catalog = await CourseController._fetch_catalog(schema)
+            inscripciones = await fetch_all_rows(f"{schema}_inscripciones", "curso_id,usuario_id")
+            return catalog["cursos"], inscripciones
+        
+        try:
+            return await get_schedule_index(schema, load)
+        except httpx.HTTPError:
+            raise HTTPException(status_code=500, detail="Error al cargar horarios")
+    
+    @staticmethod
+    async def _conflict_detail(schema: str, mensaje: str, conflictos: List[Dict]) -> str:
+        """Mensaje de error legible que nombra los cursos con los que choca el horario"""
+        try:
+            catalog = await CourseController._fetch_catalog(schema)
+            nombres = {curso["id"]: curso.get("nombre") for curso in catalog["cursos"]}
+        except (HTTPException, httpx.HTTPError):
+            nombres = {}
+        cursos = []
+        for conflicto in conflictos:
+            nombre = nombres.get(conflicto["curso_id"]) or f"curso {conflicto['curso_id']}"
+            cursos.append(f"{nombre} ({', '.join(conflicto['horarios'])})")
+        return f"{mensaje}: {'; '.join(cursos)}"
+    
+    @staticmethod
+    async def get_schedule_conflicts(email: str) -> Dict:
+        """Reporte de choques de horario del tenant (solo directores/admin)"""
+        tenant_domain = get_tenant_from_email(email)
+        if not tenant_domain:
+            raise HTTPException(status_code=400, detail="Tenant no identificado")
+        
+        tenant_info = await get_tenant_info(tenant_domain)
+        if not tenant_info:
+            raise HTTPException(status_code=404, detail="Tenant no encontrado")
+        
+        schema = tenant_info["schema_name"]
+        user_data = await get_user_by_email(email, schema)
+        if not user_data or user_data.get("rol") not in ["Director", "admin"]:
+            raise HTTPException(status_code=403, detail="No tienes permisos para ver conflictos de horario")
+        
+        index = await CourseController._schedule_index(schema)
+        return {"tenant": schema, **index.report()}
+    
     @staticmethod
     async def create_course(course: Course, email: str) -> Dict:
         """Crear nuevo curso (solo directores/admin)"""
@@ -76,6 +216,7 @@ class CourseController:
                 "descripcion": course.descripcion,
                 "creditos": course.creditos,
                 "horario": course.horario,
+                "cupo": course.cupo,
                 "created_at": datetime.utcnow().isoformat()
             }
             response = await client.post(
@@ -84,7 +225,14 @@ class CourseController:
                 headers=headers
             )
             if response.status_code in [200, 201]:
-                return {"success": True, "curso": response.json()}
+                curso = response.json()
+                invalidate_catalog(schema)
+                index_courses(schema, curso)
+                schedule = loaded_schedule_index(schema)
+                if schedule is not None:
+                    for row in curso:
+                        schedule.set_course(row["id"], row.get("horario"))
+                return {"success": True, "curso": curso}
             else:
                 raise HTTPException(status_code=500, detail=f"Error al crear curso: {response.text}")
     
@@ -104,29 +252,214 @@ class CourseController:
         if not user_data or user_data.get("rol") not in ["Director", "admin"]:
             raise HTTPException(status_code=403, detail="No tienes permisos para inscribir")
         
+        schedule = await CourseController._schedule_index(schema)
+        conflictos = schedule.conflicts(enrollment.usuario_id, enrollment.curso_id)
+        if conflictos:
+            raise HTTPException(
+                status_code=409,
+                detail=await CourseController._conflict_detail(
+                    schema, "El horario del curso choca con otros cursos del usuario", conflictos
+                )
+            )
+        
         async with httpx.AsyncClient(timeout=10.0) as client:
+            # Upsert idempotente sobre el UNIQUE(curso_id, usuario_id) de la tabla: reintentos no crean duplicados.
+            # created_at no se envía para que una inscripción existente conserve su fecha.
             headers = {
                 "apikey": SUPABASE_SERVICE_ROLE_KEY,
                 "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
                 "Content-Type": "application/json",
-                "Prefer": "return=representation"
+                "Prefer": "resolution=merge-duplicates,return=representation"
             }
             table_name = f"{schema}_inscripciones"
             payload = {
                 "curso_id": enrollment.curso_id,
-                "usuario_id": enrollment.usuario_id,
-                "created_at": datetime.utcnow().isoformat()
+                "usuario_id": enrollment.usuario_id
             }
             response = await client.post(
-                f"{SUPABASE_URL}/rest/v1/{table_name}",
+                f"{SUPABASE_URL}/rest/v1/{table_name}?on_conflict=curso_id,usuario_id",
                 json=payload,
                 headers=headers
             )
             if response.status_code in [200, 201]:
+                invalidate_my_courses(schema, enrollment.usuario_id)
+                invalidate_catalog(schema)
+                schedule.attach(enrollment.usuario_id, enrollment.curso_id)
                 return {"success": True, "inscripcion": response.json()}
+            elif is_capacity_error(response):
+                raise HTTPException(status_code=409, detail="El curso no tiene cupos disponibles")
             else:
                 raise HTTPException(status_code=500, detail=f"Error al inscribir: {response.text}")
     
+    @staticmethod
+    async def bulk_enroll(rows: AsyncIterator[Dict], email: str) -> Dict:
+        """Inscripción masiva desde CSV/JSON-lines (solo directores/admin)"""
+        tenant_domain = get_tenant_from_email(email)
+        if not tenant_domain:
+            raise HTTPException(status_code=400, detail="Tenant no identificado")
+        
+        tenant_info = await get_tenant_info(tenant_domain)
+        if not tenant_info:
+            raise HTTPException(status_code=404, detail="Tenant no encontrado")
+        
+        schema = tenant_info["schema_name"]
+        user_data = await get_user_by_email(email, schema)
+        if not user_data or user_data.get("rol") not in ["Director", "admin"]:
+            raise HTTPException(status_code=403, detail="No tienes permisos para inscribir")
+        
+        resultados: List[Dict] = []
+        vistos: Set[Tuple[int, int]] = set()
+        schedule = await CourseController._schedule_index(schema)
+        
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            headers = {
+                "apikey": SUPABASE_SERVICE_ROLE_KEY,
+                "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
+                "Content-Type": "application/json"
+            }
+            async for batch in batched(rows):
+                resultados.extend(
+                    await CourseController._enroll_batch(client, headers, schema, batch, vistos, schedule)
+                )
+        
+        resumen: Dict[str, int] = {}
+        for resultado in resultados:
+            resumen[resultado["estado"]] = resumen.get(resultado["estado"], 0) + 1
+        return {"success": True, "total": len(resultados), "resumen": resumen, "resultados": resultados}
+    
+    @staticmethod
+    async def _enroll_batch(client: httpx.AsyncClient, headers: Dict, schema: str,
+                            batch: List[Dict], vistos: Set[Tuple[int, int]],
+                            schedule: ScheduleIndex) -> List[Dict]:
+        """Resolver emails, descartar duplicados/existentes e insertar un lote de inscripciones"""
+        resultados = []
+        validas = []
+        for row in batch:
+            if row.get("error"):
+                resultados.append({"linea": row["linea"], "estado": "invalido", "detalle": row["error"]})
+            else:
+                validas.append(row)
+        
+        try:
+            # Resolver emails a ids y validar cursos con lookups en bloque
+            # (in.() distingue mayúsculas: se consulta en minúsculas, como se guardan los emails)
+            emails = [row["email"].lower() for row in validas if row["usuario_id"] is None]
+            usuarios = await fetch_by_ids(client, f"{schema}_usuarios", emails, "id,email", headers, column="email")
+            id_por_email = {u["email"].lower(): u["id"] for u in usuarios}
+            
+            cursos = await fetch_by_ids(
+                client, f"{schema}_cursos", (row["curso_id"] for row in validas), "id,inscritos,cupo", headers
+            )
+            cursos_existentes = {c["id"] for c in cursos}
+            # Cupos libres por curso (None = sin límite); el CHECK de la tabla sigue siendo la garantía final
+            libres = {
+                c["id"]: None if c.get("cupo") is None else c["cupo"] - (c.get("inscritos") or 0)
+                for c in cursos
+            }
+            
+            candidatas = []
+            for row in validas:
+                usuario_id = row["usuario_id"] or id_por_email.get((row["email"] or "").lower())
+                if usuario_id is None:
+                    resultados.append({"linea": row["linea"], "estado": "usuario_no_encontrado", "email": row["email"]})
+                elif row["curso_id"] not in cursos_existentes:
+                    resultados.append({"linea": row["linea"], "estado": "curso_no_encontrado", "curso_id": row["curso_id"]})
+                elif (row["curso_id"], usuario_id) in vistos:
+                    resultados.append({"linea": row["linea"], "estado": "duplicado", "curso_id": row["curso_id"], "usuario_id": usuario_id})
+                else:
+                    vistos.add((row["curso_id"], usuario_id))
+                    candidatas.append({**row, "usuario_id": usuario_id})
+            
+            # Diferencia de conjuntos contra las inscripciones existentes
+            existentes_rows = await fetch_by_ids(
+                client, f"{schema}_inscripciones", (row["usuario_id"] for row in candidatas),
+                "curso_id,usuario_id", headers, column="usuario_id",
+                extra_params={"curso_id": in_filter(sorted({row["curso_id"] for row in candidatas}))}
+            ) if candidatas else []
+        except httpx.HTTPError as e:
+            return resultados + [
+                {"linea": row["linea"], "estado": "error", "detalle": f"Error en lookup: {e}"} for row in validas
+            ]
+        
+        existentes = {(r["curso_id"], r["usuario_id"]) for r in existentes_rows}
+        nuevas = []
+        for row in candidatas:
+            if (row["curso_id"], row["usuario_id"]) in existentes:
+                resultados.append({"linea": row["linea"], "estado": "ya_inscrito", "curso_id": row["curso_id"], "usuario_id": row["usuario_id"]})
+                continue
+            if libres.get(row["curso_id"]) is not None and libres[row["curso_id"]] <= 0:
+                resultados.append({"linea": row["linea"], "estado": "sin_cupo", "curso_id": row["curso_id"], "usuario_id": row["usuario_id"]})
+                continue
+            conflictos = schedule.conflicts(row["usuario_id"], row["curso_id"])
+            if conflictos:
+                resultados.append({"linea": row["linea"], "estado": "conflicto_horario", "curso_id": row["curso_id"],
+                                   "usuario_id": row["usuario_id"], "conflictos": conflictos})
+            else:
+                # Se reserva el horario de inmediato para detectar choques dentro del mismo archivo
+                schedule.attach(row["usuario_id"], row["curso_id"])
+                if libres.get(row["curso_id"]) is not None:
+                    libres[row["curso_id"]] -= 1
+                nuevas.append(row)
+        
+        # Inserción en bloques con un solo POST por bloque
+        created_at = datetime.utcnow().isoformat()
+        table_name = f"{schema}_inscripciones"
+        
+        async def insertar(filas) -> httpx.Response:
+            # ignore-duplicates: inscripciones concurrentes o reintentos no hacen fallar el bloque;
+            # las filas omitidas no vuelven en la representación
+            return await client.post(
+                f"{SUPABASE_URL}/rest/v1/{table_name}",
+                params={"on_conflict": "curso_id,usuario_id", "select": "curso_id,usuario_id"},
+                json=filas,
+                headers={**headers, "Prefer": "resolution=ignore-duplicates,return=representation"}
+            )
+        
+        bloques = list(chunked(nuevas))
+        for numero, bloque in enumerate(bloques):
+            payload = [
+                {"curso_id": row["curso_id"], "usuario_id": row["usuario_id"], "created_at": created_at}
+                for row in bloque
+            ]
+            try:
+                response = await insertar(payload)
+                if is_capacity_error(response):
+                    # Otro proceso ocupó los últimos cupos: se reintenta fila por fila para aislar las que no entran
+                    respuestas = [await insertar(fila) for fila in payload]
+                else:
+                    respuestas = [response] * len(bloque)
+            except httpx.HTTPError as e:
+                # Nada de este bloque ni de los siguientes se insertó con certeza: liberar sus reservas
+                for pendiente in bloques[numero:]:
+                    for row in pendiente:
+                        schedule.detach(row["usuario_id"], row["curso_id"])
+                        resultados.append({"linea": row["linea"], "estado": "error", "curso_id": row["curso_id"],
+                                           "usuario_id": row["usuario_id"], "detalle": f"Error de red: {e}"})
+                break
+            
+            insertadas = {
+                (r["curso_id"], r["usuario_id"])
+                for respuesta in {id(r): r for r in respuestas}.values() if respuesta.status_code in [200, 201]
+                for r in respuesta.json()
+            }
+            for row, respuesta in zip(bloque, respuestas):
+                resultado = {"linea": row["linea"], "curso_id": row["curso_id"], "usuario_id": row["usuario_id"]}
+                if respuesta.status_code in [200, 201]:
+                    # Omitida por ignore-duplicates: otra petición la inscribió entre el lookup y el POST
+                    resultado["estado"] = "inscrito" if (row["curso_id"], row["usuario_id"]) in insertadas else "ya_inscrito"
+                    invalidate_my_courses(schema, row["usuario_id"])
+                else:
+                    resultado["estado"] = "sin_cupo" if is_capacity_error(respuesta) else "error"
+                    if resultado["estado"] == "error":
+                        resultado["detalle"] = respuesta.text
+                    schedule.detach(row["usuario_id"], row["curso_id"])
+                resultados.append(resultado)
+        
+        if nuevas:
+            invalidate_catalog(schema)
+        
+        return sorted(resultados, key=lambda r: r["linea"])
+    
     @staticmethod
     async def get_my_courses(email: str) -> Dict:
         """Obtener cursos del usuario actual (estudiantes Y profesores)"""
@@ -147,6 +480,10 @@ class CourseController:
         user_id = user_data["id"]
         user_rol = user_data.get("rol", "Estudiante")
         
+        cached = _my_courses_cache.get((schema, user_id))
+        if cached is not None:
+            return cached
+        
         async with httpx.AsyncClient(timeout=10.0) as client:
             headers = {
                 "apikey": SUPABASE_ANON_KEY,
@@ -162,41 +499,24 @@ class CourseController:
                     headers=headers
                 )
                 
-                if cursos_response.status_code == 200:
-                    cursos = cursos_response.json()
-                    return {"usuario": email, "rol": user_rol, "cursos": cursos}
-                else:
+                if cursos_response.status_code != 200:
                     raise HTTPException(status_code=500, detail="Error al obtener cursos del profesor")
-            
-            # Si es estudiante, obtener cursos por inscripciones
-            inscripciones_table = f"{schema}_inscripciones"
-            
-            response = await client.get(
-                f"{SUPABASE_URL}/rest/v1/{inscripciones_table}?usuario_id=eq.{user_id}&select=*",
-                headers=headers
-            )
-            
-            if response.status_code == 200:
-                inscripciones = response.json()
-                curso_ids = [insc["curso_id"] for insc in inscripciones]
-                
-                if not curso_ids:
-                    return {"usuario": email, "rol": user_rol, "cursos": []}
-                
-                ids_query = ",".join(map(str, curso_ids))
-                
-                cursos_response = await client.get(
-                    f"{SUPABASE_URL}/rest/v1/{cursos_table}?id=in.({ids_query})&select=*",
+                cursos = cursos_response.json()
+            else:
+                # Si es estudiante, obtener cursos por inscripciones embebiendo el curso (una sola consulta)
+                inscripciones_table = f"{schema}_inscripciones"
+                response = await client.get(
+                    f"{SUPABASE_URL}/rest/v1/{inscripciones_table}?usuario_id=eq.{user_id}&select=curso:{cursos_table}(*)",
                     headers=headers
                 )
                 
-                if cursos_response.status_code == 200:
-                    cursos = cursos_response.json()
-                    return {"usuario": email, "rol": user_rol, "cursos": cursos}
-                else:
+                if response.status_code != 200:
                     raise HTTPException(status_code=500, detail="Error al obtener cursos")
-            else:
-                raise HTTPException(status_code=500, detail="Error al obtener inscripciones")
+                cursos = [insc["curso"] for insc in response.json() if insc.get("curso")]
+            
+            result = {"usuario": email, "rol": user_rol, "cursos": cursos}
+            _my_courses_cache.set((schema, user_id), result)
+            return result
     
     @staticmethod
     async def get_course_enrollments(curso_id: int, email: str) -> Dict:
@@ -242,50 +562,37 @@ class CourseController:
             elif user_rol not in ["director", "admin"]:
                 raise HTTPException(status_code=403, detail="No tienes permisos suficientes")
             
-            # Obtener inscripciones del curso CON ID
             inscripciones_table = f"{schema}_inscripciones"
-            inscripciones_response = await client.get(
-                f"{SUPABASE_URL}/rest/v1/{inscripciones_table}?curso_id=eq.{curso_id}&select=id,usuario_id,created_at",
+            usuarios_table = f"{schema}_usuarios"
+            
+            # Una sola consulta: inscripciones con el usuario embebido vía la FK usuario_id de schema.sql
+            response = await client.get(
+                f"{SUPABASE_URL}/rest/v1/{inscripciones_table}?curso_id=eq.{curso_id}"
+                f"&select=id,usuario_id,created_at,usuario:{usuarios_table}(id,nombre,apellido,email,rol)",
                 headers=headers
             )
-            
-            if inscripciones_response.status_code == 200:
-                inscripciones = inscripciones_response.json()
-                usuario_ids = [insc["usuario_id"] for insc in inscripciones]
-                
-                if not usuario_ids:
-                    return {"inscripciones": []}
-                
-                # Obtener datos de usuarios
-                usuarios_table = f"{schema}_usuarios"
-                ids_query = ",".join(map(str, usuario_ids))
-                
-                usuarios_response = await client.get(
-                    f"{SUPABASE_URL}/rest/v1/{usuarios_table}?id=in.({ids_query})&select=id,nombre,apellido,email,rol",
-                    headers=headers
-                )
-                
-                if usuarios_response.status_code == 200:
-                    usuarios = usuarios_response.json()
-                    # Combinar inscripciones con datos de usuario
-                    inscritos = []
-                    for insc in inscripciones:
-                        usuario = next((u for u in usuarios if u["id"] == insc["usuario_id"]), None)
-                        if usuario:
-                            inscritos.append({
-                                "inscripcion_id": insc["id"],
-                                "usuario_id": usuario["id"],
-                                "nombre": usuario["nombre"],
-                                "apellido": usuario["apellido"],
-                                "email": usuario["email"],
-                                "rol": usuario["rol"],
-                                "fecha_inscripcion": insc.get("created_at")
-                            })
-                    return {"inscripciones": inscritos}
-                else:
-                    raise HTTPException(status_code=500, detail="Error al obtener usuarios")
-            else:
+            if response.status_code != 200:
                 raise HTTPException(status_code=500, detail="Error al obtener inscripciones")
+            inscripciones = response.json()
+            usuarios_por_id = {
+                insc["usuario"]["id"]: insc["usuario"] for insc in inscripciones if insc.get("usuario")
+            }
+            
+            # Combinar inscripciones con datos de usuario (hash join)
+            inscritos = []
+            for insc in inscripciones:
+                usuario = usuarios_por_id.get(insc["usuario_id"])
+                if usuario:
+                    inscritos.append({
+                        "inscripcion_id": insc["id"],
+                        "usuario_id": usuario["id"],
+                        "nombre": usuario["nombre"],
+                        "apellido": usuario["apellido"],
+                        "email": usuario["email"],
+                        "rol": usuario["rol"],
+                        "fecha_inscripcion": insc.get("created_at")
+                    })
+            return {"inscripciones": inscritos}
     
     @staticmethod
     async def delete_enrollment(inscripcion_id: int, email: str) -> Dict:
@@ -308,7 +615,8 @@ class CourseController:
         async with httpx.AsyncClient(timeout=10.0) as client:
             headers = {
                 "apikey": SUPABASE_SERVICE_ROLE_KEY,
-                "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}"
+                "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
+                "Prefer": "return=representation"
             }
             table_name = f"{schema}_inscripciones"
             response = await client.delete(
@@ -316,6 +624,13 @@ class CourseController:
                 headers=headers
             )
             if response.status_code in [200, 204]:
+                eliminadas = response.json() if response.status_code == 200 else []
+                invalidate_catalog(schema)
+                schedule = loaded_schedule_index(schema)
+                for inscripcion in eliminadas:
+                    invalidate_my_courses(schema, inscripcion["usuario_id"])
+                    if schedule is not None:
+                        schedule.detach(inscripcion["usuario_id"], inscripcion["curso_id"])
                 return {"success": True, "message": "Inscripción eliminada"}
             else:
                 raise HTTPException(status_code=500, detail=f"Error al eliminar inscripción: {response.text}")
@@ -353,19 +668,40 @@ class CourseController:
                 "creditos": course.creditos,
                 "horario": course.horario
             }
+            # El cupo solo se toca si el cliente lo envió: omitirlo no quita el límite
+            if "cupo" in course.model_fields_set:
+                payload["cupo"] = course.cupo
             response = await client.patch(
                 f"{SUPABASE_URL}/rest/v1/{table_name}?id=eq.{curso_id}",
                 json=payload,
                 headers=headers
             )
             if response.status_code == 200:
-                return {"success": True, "curso": response.json()}
+                curso = response.json()
+                invalidate_my_courses(schema)
+                invalidate_catalog(schema)
+                index_courses(schema, curso)
+                schedule = loaded_schedule_index(schema)
+                if schedule is not None:
+                    for row in curso:
+                        schedule.set_course(row["id"], row.get("horario"))
+                return {"success": True, "curso": curso}
+            elif is_capacity_error(response):
+                raise HTTPException(status_code=409, detail="El cupo no puede ser menor a la cantidad de inscritos")
             else:
                 raise HTTPException(status_code=500, detail=f"Error al actualizar curso: {response.text}")
     
     @staticmethod
-    async def delete_course(curso_id: int, email: str) -> Dict:
-        """Eliminar curso (solo directores/admin)"""
+    async def delete_course(curso_id: int, email: str, dry_run: bool = False) -> Dict:
+        """Eliminar curso y sus datos dependientes (solo directores/admin)"""
+        result = await CourseController.delete_courses([curso_id], email, dry_run)
+        if not dry_run:
+            result["message"] = "Curso eliminado exitosamente"
+        return result
+    
+    @staticmethod
+    async def delete_courses(curso_ids: List[int], email: str, dry_run: bool = False) -> Dict:
+        """Eliminar cursos en bloque con borrado en cascada; dry_run solo cuenta las filas afectadas"""
         tenant_domain = get_tenant_from_email(email)
         if not tenant_domain:
             raise HTTPException(status_code=400, detail="Tenant no identificado")
@@ -381,30 +717,65 @@ class CourseController:
         if not user_data or user_data.get("rol") not in ["Director", "admin"]:
             raise HTTPException(status_code=403, detail="No tienes permisos para eliminar cursos")
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with httpx.AsyncClient(timeout=30.0) as client:
             headers = {
                 "apikey": SUPABASE_SERVICE_ROLE_KEY,
                 "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}"
             }
             
-            # Primero eliminar inscripciones relacionadas
-            inscripciones_table = f"{schema}_inscripciones"
-            await client.delete(
-                f"{SUPABASE_URL}/rest/v1/{inscripciones_table}?curso_id=eq.{curso_id}",
-                headers=headers
-            )
-            
-            # Luego eliminar el curso
-            cursos_table = f"{schema}_cursos"
-            response = await client.delete(
-                f"{SUPABASE_URL}/rest/v1/{cursos_table}?id=eq.{curso_id}",
-                headers=headers
-            )
+            # Resolver los ids padre una sola vez; cada paso es un DELETE filtrado por in.(...)
+            try:
+                cursos = await fetch_by_ids(client, f"{schema}_cursos", curso_ids, "id", headers)
+                padres = {"cursos": [c["id"] for c in cursos]}
+                if not padres["cursos"]:
+                    raise HTTPException(status_code=404, detail="Curso no encontrado")
+                padres["inscripciones"], padres["configuracion_notas"] = await asyncio.gather(
+                    collect_ids(client, f"{schema}_inscripciones", "curso_id", padres["cursos"], headers),
+                    collect_ids(client, f"{schema}_configuracion_notas", "curso_id", padres["cursos"], headers)
+                )
+            except httpx.HTTPError as e:
+                raise HTTPException(status_code=500, detail=f"Error al preparar eliminación: {e}")
             
-            if response.status_code in [200, 204]:
-                return {"success": True, "message": "Curso eliminado exitosamente"}
-            else:
-                raise HTTPException(status_code=500, detail=f"Error al eliminar curso: {response.text}")
+            filas: Dict[str, int] = {}
+            try:
+                for tabla, columna, padre in COURSE_CASCADE:
+                    ids = padres[padre]
+                    if not ids:
+                        filas[tabla] = 0
+                    elif dry_run:
+                        filas[tabla] = await count_by_ids(client, f"{schema}_{tabla}", columna, ids, headers)
+                    else:
+                        filas[tabla] = await delete_by_ids(client, f"{schema}_{tabla}", columna, ids, headers)
+            except httpx.HTTPError as e:
+                if not dry_run:
+                    CourseController._forget_courses(schema, padres["cursos"])
+                raise HTTPException(
+                    status_code=500,
+                    detail={"mensaje": f"Error al eliminar {tabla}: {e}", "eliminados": filas}
+                )
+        
+        if not dry_run:
+            CourseController._forget_courses(schema, padres["cursos"])
+        
+        no_encontrados = sorted(set(curso_ids) - set(padres["cursos"]))
+        return {
+            "success": True,
+            "dry_run": dry_run,
+            "cursos": padres["cursos"],
+            "no_encontrados": no_encontrados,
+            "filas": filas
+        }
+    
+    @staticmethod
+    def _forget_courses(schema: str, curso_ids: List[int]):
+        """Quitar cursos eliminados de cachés e índices en memoria"""
+        invalidate_my_courses(schema)
+        invalidate_catalog(schema)
+        schedule = loaded_schedule_index(schema)
+        for curso_id in curso_ids:
+            unindex_course(schema, curso_id)
+            if schedule is not None:
+                schedule.remove_course(curso_id)
     
     @staticmethod
     async def assign_teacher(curso_id: int, profesor_id: int, email: str) -> Dict:
@@ -446,6 +817,16 @@ class CourseController:
             else:
                 raise HTTPException(status_code=404, detail="Usuario no encontrado")
             
+            schedule = await CourseController._schedule_index(schema)
+            conflictos = schedule.conflicts(profesor_id, curso_id)
+            if conflictos:
+                raise HTTPException(
+                    status_code=409,
+                    detail=await CourseController._conflict_detail(
+                        schema, "El horario del curso choca con otros cursos del profesor", conflictos
+                    )
+                )
+            
             # Actualizar el curso con el profesor asignado
             cursos_table = f"{schema}_cursos"
             payload = {"profesor_id": profesor_id}
@@ -457,10 +838,123 @@ class CourseController:
             )
             
             if response.status_code == 200:
+                invalidate_my_courses(schema)
+                invalidate_catalog(schema)
+                schedule.set_professor(curso_id, profesor_id)
                 return {"success": True, "message": "Profesor asignado exitosamente"}
             else:
                 raise HTTPException(status_code=500, detail=f"Error al asignar profesor: {response.text}")
     
+    @staticmethod
+    async def assign_teachers_bulk(asignaciones: List[TeacherAssignment], email: str) -> Dict:
+        """Asignar profesores a muchos cursos en una sola operación (solo directores/admin)"""
+        tenant_domain = get_tenant_from_email(email)
+        if not tenant_domain:
+            raise HTTPException(status_code=400, detail="Tenant no identificado")
+        
+        tenant_info = await get_tenant_info(tenant_domain)
+        if not tenant_info:
+            raise HTTPException(status_code=404, detail="Tenant no encontrado")
+        
+        schema = tenant_info["schema_name"]
+        
+        # Verificar permisos
+        user_data = await get_user_by_email(email, schema)
+        if not user_data or user_data.get("rol") not in ["Director", "admin"]:
+            raise HTTPException(status_code=403, detail="No tienes permisos para asignar profesores")
+        
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            headers = {
+                "apikey": SUPABASE_SERVICE_ROLE_KEY,
+                "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
+                "Content-Type": "application/json"
+            }
+            
+            # Validar roles y cursos con un lookup en bloque cada uno
+            try:
+                profesores = await fetch_by_ids(
+                    client, f"{schema}_usuarios", (a.profesor_id for a in asignaciones), "id,rol", headers
+                )
+                cursos = await fetch_by_ids(
+                    client, f"{schema}_cursos", (a.curso_id for a in asignaciones), "id,profesor_id", headers
+                )
+            except httpx.HTTPError:
+                raise HTTPException(status_code=500, detail="Error al validar asignaciones")
+            es_profesor = {u["id"] for u in profesores if u.get("rol") == "Profesor"}
+            profesor_actual = {c["id"]: c.get("profesor_id") for c in cursos}
+            
+            schedule = await CourseController._schedule_index(schema)
+            resultados: List[Dict] = []
+            por_profesor: Dict[int, List[int]] = {}
+            vistos: Set[int] = set()
+            for asignacion in asignaciones:
+                curso_id, profesor_id = asignacion.curso_id, asignacion.profesor_id
+                resultado = {"curso_id": curso_id, "profesor_id": profesor_id}
+                if curso_id in vistos:
+                    resultado["estado"] = "duplicado"
+                elif curso_id not in profesor_actual:
+                    resultado["estado"] = "curso_no_encontrado"
+                elif profesor_id not in es_profesor:
+                    resultado["estado"] = "no_es_profesor"
+                else:
+                    conflictos = schedule.conflicts(profesor_id, curso_id)
+                    if conflictos:
+                        resultado["estado"] = "conflicto_horario"
+                        resultado["conflictos"] = conflictos
+                    else:
+                        # Reservar el horario ya, para detectar choques entre asignaciones del mismo lote
+                        schedule.set_professor(curso_id, profesor_id)
+                        por_profesor.setdefault(profesor_id, []).append(curso_id)
+                        resultado["estado"] = "asignado"
+                vistos.add(curso_id)
+                resultados.append(resultado)
+            
+            # Un PATCH id=in.(...) por profesor (y bloque), en paralelo
+            async def patch_group(profesor_id: int, ids: List[int]) -> List[Tuple[List[int], httpx.Response]]:
+                respuestas = []
+                for bloque in chunked(ids):
+                    response = await client.patch(
+                        f"{SUPABASE_URL}/rest/v1/{schema}_cursos",
+                        params={"id": in_filter(bloque)},
+                        json={"profesor_id": profesor_id},
+                        headers={**headers, "Prefer": "return=minimal"}
+                    )
+                    respuestas.append((bloque, response))
+                return respuestas
+            
+            try:
+                grupos = await asyncio.gather(*(patch_group(p, ids) for p, ids in por_profesor.items()))
+            except httpx.HTTPError as e:
+                # Resultado incierto: se revierten las reservas hechas en el índice de horarios
+                for ids in por_profesor.values():
+                    for curso_id in ids:
+                        schedule.set_professor(curso_id, profesor_actual[curso_id])
+                invalidate_my_courses(schema)
+                invalidate_catalog(schema)
+                raise HTTPException(status_code=500, detail=f"Error al asignar profesores: {e}")
+        
+        fallidos: Dict[int, str] = {}
+        for grupo in grupos:
+            for bloque, response in grupo:
+                if response.status_code not in [200, 204]:
+                    for curso_id in bloque:
+                        fallidos[curso_id] = response.text
+        
+        for resultado in resultados:
+            if resultado["estado"] == "asignado" and resultado["curso_id"] in fallidos:
+                resultado["estado"] = "error"
+                resultado["detalle"] = fallidos[resultado["curso_id"]]
+                schedule.set_professor(resultado["curso_id"], profesor_actual[resultado["curso_id"]])
+        
+        if por_profesor:
+            invalidate_my_courses(schema)
+            invalidate_catalog(schema)
+        
+        resumen: Dict[str, int] = {}
+        for resultado in resultados:
+            resumen[resultado["estado"]] = resumen.get(resultado["estado"], 0) + 1
+        return {"success": True, "total": len(resultados), "resumen": resumen, "resultados": resultados}
+    
     @staticmethod
     async def get_course_students_for_attendance(curso_id: int, email: str) -> Dict:
         """Obtener SOLO estudiantes inscritos en un curso para tomar asistencia (profesores)"""
@@ -520,23 +1014,17 @@ class CourseController:
             if not usuario_ids:
                 return {"inscripciones": []}
             
-            # Obtener datos de usuarios inscritos
+            # Obtener datos de usuarios inscritos en bloques concurrentes
             usuarios_table = f"{schema}_usuarios"
-            ids_query = ",".join(map(str, usuario_ids))
-            
-            usuarios_response = await client.get(
-                f"{SUPABASE_URL}/rest/v1/{usuarios_table}?id=in.({ids_query})&select=id,nombre,apellido,email,rol",
-                headers=headers
-            )
-            
-            if usuarios_response.status_code == 200:
-                usuarios = usuarios_response.json()
-                # Filtrar SOLO estudiantes
-                estudiantes = [
-                    {"usuario_id": u["id"]}
-                    for u in usuarios 
-                    if u.get("rol", "").lower() == "estudiante"
-                ]
-                return {"inscripciones": estudiantes}
-            else:
+            try:
+                usuarios = await fetch_by_ids(client, usuarios_table, usuario_ids, "id,rol", headers)
+            except httpx.HTTPError:
                 raise HTTPException(status_code=500, detail="Error al obtener usuarios")
+            
+            # Filtrar SOLO estudiantes
+            estudiantes = [
+                {"usuario_id": u["id"]}
+                for u in usuarios 
+                if u.get("rol", "").lower() == "estudiante"
+            ]
+            return {"inscripciones": estudiantes}
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 class Course(BaseModel):
     nombre: str
@@ -7,11 +7,23 @@ class Course(BaseModel):
     descripcion: Optional[str] = None
     creditos: int = 3
     horario: Optional[str] = None
+    cupo: Optional[int] = Field(default=None, ge=0)
 
 class CourseEnrollment(BaseModel):
     curso_id: int
     usuario_id: int
 
+class TeacherAssignment(BaseModel):
+    curso_id: int
+    profesor_id: int
+
+class TeacherBulkAssignment(BaseModel):
+    asignaciones: List[TeacherAssignment] = Field(..., min_length=1, max_length=1000)
+
+class CourseBulkDelete(BaseModel):
+    curso_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    dry_run: bool = False
+
 class CourseResponse(BaseModel):
     id: int
     nombre: str
@@ -19,4 +31,6 @@ class CourseResponse(BaseModel):
     descripcion: Optional[str] = None
     creditos: int
     horario: Optional[str] = None
+    inscritos: int = 0
+    cupo: Optional[int] = None
     created_at: str
@@ -1,21 +1,48 @@
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
 import sys
 import os
 
 # Añadir path para imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.course import Course, CourseEnrollment
+from models.course import Course, CourseEnrollment, CourseBulkDelete, TeacherBulkAssignment
 from controllers.course_controller import CourseController
 from utils.supabase import get_current_user
+from utils.bulk_import import parse_enrollment_rows
 
 router = APIRouter(prefix="/api/courses", tags=["Courses"])
 
 @router.get("/")
-async def list_courses(authorization: str = Header(None)):
-    """Listar todos los cursos del tenant"""
+async def list_courses(request: Request, authorization: str = Header(None)):
+    """Listar todos los cursos del tenant (soporta If-None-Match / 304)"""
     user = await get_current_user(authorization)
-    return await CourseController.list_courses(user["email"])
+    catalog = await CourseController.get_course_catalog(user["email"])
+    headers = {
+        "ETag": catalog["etag"],
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization"
+    }
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if catalog["etag"] in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    
+    return JSONResponse(
+        content={"tenant": catalog["tenant"], "cursos": catalog["cursos"]},
+        headers=headers
+    )
+
+@router.get("/search")
+async def search_courses(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    authorization: str = Header(None)
+):
+    """Buscar cursos del tenant por nombre, código o descripción"""
+    user = await get_current_user(authorization)
+    return await CourseController.search_courses(user["email"], q, limit, offset)
 
 @router.post("/")
 async def create_course(course: Course, authorization: str = Header(None)):
@@ -29,6 +56,32 @@ async def enroll_course(enrollment: CourseEnrollment, authorization: str = Heade
     user = await get_current_user(authorization)
     return await CourseController.enroll_course(enrollment, user["email"])
 
+@router.post("/enroll/bulk")
+async def bulk_enroll(request: Request, authorization: str = Header(None)):
+    """Inscripción masiva (solo directores/admin)
+    Cuerpo text/csv con encabezado (curso_id,email o curso_id,usuario_id) o application/x-ndjson"""
+    user = await get_current_user(authorization)
+    rows = parse_enrollment_rows(request.stream(), request.headers.get("content-type", ""))
+    return await CourseController.bulk_enroll(rows, user["email"])
+
+@router.post("/bulk-delete")
+async def delete_courses(request: CourseBulkDelete, authorization: str = Header(None)):
+    """Eliminar cursos en bloque con todos sus datos dependientes (solo directores/admin)"""
+    user = await get_current_user(authorization)
+    return await CourseController.delete_courses(request.curso_ids, user["email"], request.dry_run)
+
+@router.post("/assign-teacher/bulk")
+async def assign_teachers_bulk(request: TeacherBulkAssignment, authorization: str = Header(None)):
+    """Asignar profesores a muchos cursos en una sola petición (solo directores/admin)"""
+    user = await get_current_user(authorization)
+    return await CourseController.assign_teachers_bulk(request.asignaciones, user["email"])
+
+@router.get("/schedule/conflicts")
+async def get_schedule_conflicts(authorization: str = Header(None)):
+    """Choques de horario entre cursos de un mismo estudiante o profesor (directores/admin)"""
+    user = await get_current_user(authorization)
+    return await CourseController.get_schedule_conflicts(user["email"])
+
 @router.get("/my-courses")
 async def get_my_courses(authorization: str = Header(None)):
     """Obtener cursos del usuario actual"""
@@ -72,10 +125,10 @@ async def update_course(curso_id: int, course: Course, authorization: str = Head
     return await CourseController.update_course(curso_id, course, user["email"])
 
 @router.delete("/{curso_id}")
-async def delete_course(curso_id: int, authorization: str = Header(None)):
-    """Eliminar curso (solo directores/admin)"""
+async def delete_course(curso_id: int, dry_run: bool = False, authorization: str = Header(None)):
+    """Eliminar curso y sus datos dependientes (solo directores/admin); dry_run solo cuenta"""
     user = await get_current_user(authorization)
-    return await CourseController.delete_course(curso_id, user["email"])
+    return await CourseController.delete_course(curso_id, user["email"], dry_run)
 
 @router.post("/{curso_id}/assign-teacher")
 async def assign_teacher(curso_id: int, profesor_id: int, authorization: str = Header(None)):
@@ -79,6 +79,70 @@ CREATE TABLE IF NOT EXISTS tenant_gmail_inscripciones (
 CREATE INDEX IF NOT EXISTS idx_gmail_inscripciones_usuario ON tenant_gmail_inscripciones(usuario_id);
 CREATE INDEX IF NOT EXISTS idx_gmail_inscripciones_curso ON tenant_gmail_inscripciones(curso_id);
 
+-- ═══════════════════════════════════════════════════════════════
+-- 🔹 CONTADOR DE INSCRITOS Y CUPO POR CURSO
+-- ═══════════════════════════════════════════════════════════════
+-- inscritos se mantiene con un trigger sobre _inscripciones, así listar cursos
+-- con su cantidad de inscritos es una sola consulta. El UPDATE del contador
+-- bloquea la fila del curso y el CHECK rechaza (23514) la inscripción que
+-- excede el cupo, de forma atómica aun con inscripciones concurrentes.
+
+CREATE OR REPLACE FUNCTION actualizar_inscritos_curso() RETURNS TRIGGER AS $$
+DECLARE
+  cursos_table TEXT := TG_ARGV[0];
+BEGIN
+  IF TG_OP = 'UPDATE' AND OLD.curso_id IS NOT DISTINCT FROM NEW.curso_id THEN
+    RETURN NULL;
+  END IF;
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    EXECUTE format('UPDATE %I SET inscritos = inscritos - 1 WHERE id = $1', cursos_table) USING OLD.curso_id;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    EXECUTE format('UPDATE %I SET inscritos = inscritos + 1 WHERE id = $1', cursos_table) USING NEW.curso_id;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE tenant_ucb_cursos
+  ADD COLUMN IF NOT EXISTS inscritos INTEGER NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS cupo INTEGER CHECK (cupo IS NULL OR cupo >= 0);
+UPDATE tenant_ucb_cursos c
+  SET inscritos = (SELECT COUNT(*) FROM tenant_ucb_inscripciones i WHERE i.curso_id = c.id);
+ALTER TABLE tenant_ucb_cursos DROP CONSTRAINT IF EXISTS chk_ucb_cursos_cupo;
+ALTER TABLE tenant_ucb_cursos
+  ADD CONSTRAINT chk_ucb_cursos_cupo CHECK (cupo IS NULL OR inscritos <= cupo);
+DROP TRIGGER IF EXISTS trg_ucb_inscripciones_contador ON tenant_ucb_inscripciones;
+CREATE TRIGGER trg_ucb_inscripciones_contador
+  AFTER INSERT OR DELETE OR UPDATE OF curso_id ON tenant_ucb_inscripciones
+  FOR EACH ROW EXECUTE FUNCTION actualizar_inscritos_curso('tenant_ucb_cursos');
+
+ALTER TABLE tenant_upb_cursos
+  ADD COLUMN IF NOT EXISTS inscritos INTEGER NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS cupo INTEGER CHECK (cupo IS NULL OR cupo >= 0);
+UPDATE tenant_upb_cursos c
+  SET inscritos = (SELECT COUNT(*) FROM tenant_upb_inscripciones i WHERE i.curso_id = c.id);
+ALTER TABLE tenant_upb_cursos DROP CONSTRAINT IF EXISTS chk_upb_cursos_cupo;
+ALTER TABLE tenant_upb_cursos
+  ADD CONSTRAINT chk_upb_cursos_cupo CHECK (cupo IS NULL OR inscritos <= cupo);
+DROP TRIGGER IF EXISTS trg_upb_inscripciones_contador ON tenant_upb_inscripciones;
+CREATE TRIGGER trg_upb_inscripciones_contador
+  AFTER INSERT OR DELETE OR UPDATE OF curso_id ON tenant_upb_inscripciones
+  FOR EACH ROW EXECUTE FUNCTION actualizar_inscritos_curso('tenant_upb_cursos');
+
+ALTER TABLE tenant_gmail_cursos
+  ADD COLUMN IF NOT EXISTS inscritos INTEGER NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS cupo INTEGER CHECK (cupo IS NULL OR cupo >= 0);
+UPDATE tenant_gmail_cursos c
+  SET inscritos = (SELECT COUNT(*) FROM tenant_gmail_inscripciones i WHERE i.curso_id = c.id);
+ALTER TABLE tenant_gmail_cursos DROP CONSTRAINT IF EXISTS chk_gmail_cursos_cupo;
+ALTER TABLE tenant_gmail_cursos
+  ADD CONSTRAINT chk_gmail_cursos_cupo CHECK (cupo IS NULL OR inscritos <= cupo);
+DROP TRIGGER IF EXISTS trg_gmail_inscripciones_contador ON tenant_gmail_inscripciones;
+CREATE TRIGGER trg_gmail_inscripciones_contador
+  AFTER INSERT OR DELETE OR UPDATE OF curso_id ON tenant_gmail_inscripciones
+  FOR EACH ROW EXECUTE FUNCTION actualizar_inscritos_curso('tenant_gmail_cursos');
+
 -- ═══════════════════════════════════════════════════════════════
 -- 🔹 DATOS DE PRUEBA (OPCIONAL)
 -- ═══════════════════════════════════════════════════════════════
@@ -0,0 +1,81 @@
+import asyncio
+
+import utils.course_search as course_search
+from utils.course_search import CourseSearchIndex
+
+CURSOS = [
+    {"id": 1, "codigo": "MAT-101", "nombre": "Cálculo I", "descripcion": "Límites y derivadas"},
+    {"id": 2, "codigo": "MAT-102", "nombre": "Cálculo II", "descripcion": "Integrales"},
+    {"id": 3, "codigo": "INF-110", "nombre": "Programación", "descripcion": "Introducción al cálculo de algoritmos"},
+]
+
+
+def indice():
+    index = CourseSearchIndex()
+    index.load(CURSOS)
+    return index
+
+
+def ids(resultado):
+    return [curso_id for curso_id, _ in resultado[1]]
+
+
+def test_busqueda_por_prefijo_sin_acentos():
+    index = indice()
+    assert ids(index.search("calc")) == [1, 2, 3]
+    assert ids(index.search("PROGRAMACION")) == [3]
+    assert ids(index.search("calculo ii")) == [2]
+
+
+def test_codigo_pesa_mas_que_descripcion():
+    total, pagina = indice().search("mat")
+    assert total == 2
+    assert [curso_id for curso_id, _ in pagina] == [1, 2]
+    assert all(score > 0 for _, score in pagina)
+
+
+def test_busqueda_difusa_tolera_errores():
+    assert ids(indice().search("integarles")) == [2]
+    assert ids(indice().search("xyzw")) == []
+
+
+def test_paginacion_con_total():
+    total, pagina = indice().search("calculo", limit=1, offset=1)
+    assert total == 3
+    assert len(pagina) == 1
+
+
+def test_upsert_y_remove_actualizan_el_indice():
+    index = indice()
+    index.upsert({**CURSOS[2], "descripcion": "Estructuras de datos"})
+    assert ids(index.search("calculo")) == [1, 2]
+    index.remove(1)
+    assert ids(index.search("calculo")) == [2]
+    assert len(index) == 2
+
+
+def test_cambios_durante_la_construccion_no_se_pierden(monkeypatch):
+    monkeypatch.setattr(course_search, "_indexes", course_search.TenantIndexes(ttl=60))
+
+    async def escenario():
+        construyendo = asyncio.Event()
+        continuar = asyncio.Event()
+
+        async def cargar():
+            construyendo.set()
+            await continuar.wait()
+            return CURSOS
+
+        tarea = asyncio.create_task(course_search.get_search_index("tenant_ucb", cargar))
+        await construyendo.wait()
+        # Llegan mientras se lee el catálogo: se reaplican al terminar
+        course_search.index_courses("tenant_ucb", [{"id": 4, "codigo": "FIS-100", "nombre": "Física", "descripcion": ""}])
+        course_search.unindex_course("tenant_ucb", 2)
+        continuar.set()
+        index = await tarea
+
+        assert ids(index.search("fisica")) == [4]
+        assert ids(index.search("calculo")) == [1, 3]
+        assert await course_search.get_search_index("tenant_ucb", cargar) is index
+
+    asyncio.run(escenario())
@@ -0,0 +1,95 @@
+from utils.schedule import MINUTES_PER_DAY, ScheduleIndex, format_slot, parse_horario
+
+
+def slot(dia: int, desde: str, hasta: str):
+    h1, m1 = map(int, desde.split(":"))
+    h2, m2 = map(int, hasta.split(":"))
+    return (dia * MINUTES_PER_DAY + h1 * 60 + m1, dia * MINUTES_PER_DAY + h2 * 60 + m2)
+
+
+def test_parse_single_day():
+    assert parse_horario("Vie 08:00-11:00") == [slot(4, "08:00", "11:00")]
+
+
+def test_parse_alternate_days_pair():
+    assert parse_horario("Lun-Mie 10:00-12:00") == [slot(0, "10:00", "12:00"), slot(2, "10:00", "12:00")]
+    assert parse_horario("Mar-Jue 14:00-16:00") == [slot(1, "14:00", "16:00"), slot(3, "14:00", "16:00")]
+
+
+def test_parse_day_range_expands_every_day():
+    assert parse_horario("Lun-Vie 08:00-10:00") == [slot(d, "08:00", "10:00") for d in range(5)]
+
+
+def test_parse_lists_and_segments():
+    assert parse_horario("Mar y Jue 10:00-12:00") == [slot(1, "10:00", "12:00"), slot(3, "10:00", "12:00")]
+    assert parse_horario("Lun-Mie-Vie 08:00-09:00") == [slot(d, "08:00", "09:00") for d in (0, 2, 4)]
+    assert parse_horario("Lun 10:00-12:00; Jue 14:00-16:00") == [slot(0, "10:00", "12:00"), slot(3, "14:00", "16:00")]
+    assert parse_horario("Miércoles 8:00-9:30") == [slot(2, "08:00", "09:30")]
+
+
+def test_parse_empty_is_no_schedule():
+    assert parse_horario(None) == []
+    assert parse_horario("   ") == []
+
+
+def test_parse_rejects_partial_or_invalid_text():
+    assert parse_horario("Lunes a Viernes 8:00-10:00") is None
+    assert parse_horario("Lun 10:00-12:00 aula 5") is None
+    assert parse_horario("Vie-Lun 08:00-09:00") is None
+    assert parse_horario("Lun 12:00-10:00") is None
+    assert parse_horario("Xyz 10:00-12:00") is None
+
+
+def test_format_slot():
+    assert format_slot(slot(3, "14:00", "16:30")) == "Jue 14:00-16:30"
+
+
+def build_index():
+    index = ScheduleIndex()
+    index.load(
+        [
+            {"id": 1, "horario": "Lun 08:00-16:00"},
+            {"id": 2, "horario": "Lun 09:00-10:00"},
+            {"id": 3, "horario": "Lun 09:30-11:00"},
+            {"id": 4, "horario": "Lun 13:30-14:00"},
+            {"id": 5, "horario": "Mar 08:00-09:00", "profesor_id": 9},
+            {"id": 6, "horario": "Lun-Vie 08:30-08:45"},
+        ],
+        [{"usuario_id": 5, "curso_id": c} for c in (1, 2)] + [{"usuario_id": 6, "curso_id": c} for c in (1, 2, 3)],
+    )
+    return index
+
+
+def test_conflicts_with_self_overlapping_timeline():
+    index = build_index()
+    assert index.conflicts(5, 4) == [{"curso_id": 1, "horarios": ["Lun 13:30-14:00"]}]
+    assert index.conflicts(5, 5) == []
+
+
+def test_conflicts_for_professor_and_ranges():
+    index = build_index()
+    assert index.conflicts(9, 6) == [{"curso_id": 5, "horarios": ["Mar 08:30-08:45"]}]
+
+
+def test_report_lists_every_pair():
+    report = build_index().report()
+    pares = {(c["usuario_id"], tuple(c["cursos"])) for c in report["conflictos"]}
+    assert pares == {(5, (1, 2)), (6, (1, 2)), (6, (1, 3)), (6, (2, 3))}
+
+
+def test_detach_and_course_changes():
+    index = build_index()
+    index.detach(5, 1)
+    assert index.conflicts(5, 4) == []
+    index.set_course(2, "Lun 13:00-14:00")
+    assert index.conflicts(5, 4) == [{"curso_id": 2, "horarios": ["Lun 13:30-14:00"]}]
+    index.remove_course(2)
+    assert index.conflicts(5, 4) == []
+
+
+def test_uninterpretable_schedules_are_reported():
+    index = ScheduleIndex()
+    index.load([{"id": 1, "horario": "Lunes a Viernes 8:00-10:00"}], [])
+    assert index.report()["horarios_no_interpretables"] == [
+        {"curso_id": 1, "horario": "Lunes a Viernes 8:00-10:00"}
+    ]
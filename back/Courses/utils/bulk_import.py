@@ -0,0 +1,81 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Optional
+
+# Filas procesadas por lote (lookups, dedup e inserción)
+BATCH_SIZE = 500
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Convertir un stream de bytes en líneas de texto sin cargar el cuerpo completo"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _build_row(linea: int, data: Dict) -> Dict:
+    curso_id = _to_int(data.get("curso_id"))
+    usuario_id = _to_int(data.get("usuario_id")) if data.get("usuario_id") not in (None, "") else None
+    email = (data.get("email") or "").strip() or None
+
+    row = {"linea": linea, "curso_id": curso_id, "usuario_id": usuario_id, "email": email, "error": None}
+    if curso_id is None:
+        row["error"] = "curso_id inválido"
+    elif usuario_id is None and not email:
+        row["error"] = "Se requiere email o usuario_id"
+    return row
+
+
+async def parse_enrollment_rows(chunks: AsyncIterator[bytes], content_type: str) -> AsyncIterator[Dict]:
+    """Parsear CSV (con encabezado) o JSON-lines con columnas curso_id y email/usuario_id"""
+    is_jsonl = "json" in (content_type or "")
+    header: Optional[List[str]] = None
+    linea = 0
+
+    async for line in iter_lines(chunks):
+        linea += 1
+        if not line.strip():
+            continue
+
+        if is_jsonl:
+            try:
+                data = json.loads(line)
+                if not isinstance(data, dict):
+                    raise ValueError
+            except ValueError:
+                yield {"linea": linea, "error": "JSON inválido"}
+                continue
+            yield _build_row(linea, data)
+            continue
+
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            continue
+        yield _build_row(linea, dict(zip(header, values)))
+
+
+async def batched(rows: AsyncIterator[Dict], size: int = BATCH_SIZE) -> AsyncIterator[List[Dict]]:
+    batch: List[Dict] = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,76 @@
+import os
+from typing import Awaitable, Callable, Dict, Iterable, List, Tuple
+
+from shared.text_index import TenantIndexes, TextIndex, normalize, tokenize
+
+# Peso de cada campo en el ranking
+FIELD_WEIGHTS = {"codigo": 3.0, "nombre": 2.0, "descripcion": 1.0}
+# Segundos antes de reconstruir el índice de un tenant desde el catálogo
+SEARCH_INDEX_TTL = float(os.getenv("COURSES_SEARCH_INDEX_TTL", "300"))
+
+
+class CourseSearchIndex:
+    """
+    Índice en memoria de cursos de un tenant (trie de prefijos + trigramas).
+
+    Solo guarda los términos y el nombre (para desempatar); los datos que
+    cambian con las inscripciones, como `inscritos`, se leen al armar la respuesta.
+    """
+
+    def __init__(self):
+        self._text = TextIndex()
+        self._names: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def load(self, courses: Iterable[Dict]):
+        for course in courses:
+            self.upsert(course)
+
+    def upsert(self, course: Dict):
+        terms: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(course.get(field)):
+                terms[token] = max(terms.get(token, 0.0), weight)
+        self._names[course["id"]] = normalize(course.get("nombre"))
+        self._text.upsert(course["id"], terms)
+
+    def remove(self, curso_id: int):
+        self._names.pop(curso_id, None)
+        self._text.remove(curso_id)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[int, List[Tuple[int, float]]]:
+        """Buscar cursos; cada término debe coincidir por prefijo o de forma difusa.
+
+        Devuelve el total y la página como pares (curso_id, puntaje)."""
+        ranked = sorted(
+            self._text.scores(query).items(),
+            key=lambda item: (-item[1], self._names[item[0]])
+        )
+        page = ranked[offset:offset + limit]
+        return len(ranked), [(curso_id, round(score, 3)) for curso_id, score in page]
+
+
+# Índices por tenant (schema) construidos bajo demanda
+_indexes = TenantIndexes(SEARCH_INDEX_TTL)
+
+
+async def get_search_index(schema: str, load_courses: Callable[[], Awaitable[List[Dict]]]) -> CourseSearchIndex:
+    """Obtener el índice del tenant, construyéndolo desde el catálogo si no existe o venció"""
+    async def build():
+        index = CourseSearchIndex()
+        index.load(await load_courses())
+        return index
+
+    return await _indexes.get(schema, build)
+
+
+def index_courses(schema: str, courses: Iterable[Dict]):
+    """Actualizar incrementalmente el índice (si ya existe) tras crear/editar cursos"""
+    courses = list(courses)
+    _indexes.apply(schema, lambda index: index.load(courses))
+
+
+def unindex_course(schema: str, curso_id: int):
+    _indexes.apply(schema, lambda index: index.remove(curso_id))
@@ -0,0 +1,253 @@
+import asyncio
+import heapq
+import re
+from bisect import bisect_left, insort
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.course_search import normalize
+
+MINUTES_PER_DAY = 24 * 60
+
+DIAS = {
+    "lun": 0, "lunes": 0,
+    "mar": 1, "martes": 1,
+    "mie": 2, "mier": 2, "miercoles": 2,
+    "jue": 3, "jueves": 3,
+    "vie": 4, "viernes": 4,
+    "sab": 5, "sabado": 5,
+    "dom": 6, "domingo": 6,
+}
+NOMBRES_DIAS = ["Lun", "Mar", "Mie", "Jue", "Vie", "Sab", "Dom"]
+
+# "Lun-Mie 10:00-12:00", "Vie 08:00-11:00", "Lun-Vie 08:00-10:00", "Lun 10:00-12:00; Jue 14:00-16:00"
+_SEGMENT_RE = re.compile(
+    r"(?P<dias>[a-z]+(?:\s*[-,/y]\s*[a-z]+)*)\s+(?P<h1>\d{1,2}):(?P<m1>\d{2})\s*-\s*(?P<h2>\d{1,2}):(?P<m2>\d{2})"
+)
+# Separador entre segmentos: ";", ",", "/", "y" o solo espacios
+_SEPARATOR_RE = re.compile(r"\s*(?:[;,/]|\by\b)?\s*")
+
+Slot = Tuple[int, int]  # (inicio, fin) en minutos desde el lunes 00:00
+
+
+def parse_horario(horario: Optional[str]) -> Optional[List[Slot]]:
+    """Convertir el horario libre en intervalos semanales; None si no se puede interpretar"""
+    if not horario or not horario.strip():
+        return []
+    texto = normalize(horario).strip()
+    slots: List[Slot] = []
+    # Los segmentos y sus separadores deben cubrir todo el texto: nada se ignora en silencio
+    pos = 0
+    while pos < len(texto):
+        match = _SEGMENT_RE.match(texto, pos)
+        if match is None:
+            return None
+        pos = _SEPARATOR_RE.match(texto, match.end()).end()
+        inicio = int(match["h1"]) * 60 + int(match["m1"])
+        fin = int(match["h2"]) * 60 + int(match["m2"])
+        if fin <= inicio or fin > MINUTES_PER_DAY:
+            return None
+        dias = _parse_dias(match["dias"])
+        if dias is None:
+            return None
+        for dia in dias:
+            offset = dia * MINUTES_PER_DAY
+            slots.append((offset + inicio, offset + fin))
+    return sorted(set(slots)) if slots else None
+
+
+def _parse_dias(texto: str) -> Optional[List[int]]:
+    """
+    Días de un segmento: "Lun, Mie", "Mar y Jue", "Lun-Vie" (rango) o "Lun-Mie-Vie" (lista).
+    Como en los datos de ejemplo, un par separado por guion a dos días de distancia
+    ("Lun-Mie", "Mar-Jue") es la notación de días alternos: solo esos dos días
+    """
+    dias: List[int] = []
+    for item in re.split(r"\s*[,/]\s*|\s+y\s+", texto):
+        partes = re.split(r"\s*-\s*", item)
+        if any(parte not in DIAS for parte in partes):
+            return None
+        numeros = [DIAS[parte] for parte in partes]
+        if len(numeros) == 2 and numeros[1] - numeros[0] != 2:
+            if numeros[1] <= numeros[0]:
+                return None
+            numeros = list(range(numeros[0], numeros[1] + 1))
+        dias.extend(numeros)
+    return dias
+
+
+def format_slot(slot: Slot) -> str:
+    dia, inicio = divmod(slot[0], MINUTES_PER_DAY)
+    fin = slot[1] - dia * MINUTES_PER_DAY
+    return f"{NOMBRES_DIAS[dia]} {inicio // 60:02d}:{inicio % 60:02d}-{fin // 60:02d}:{fin % 60:02d}"
+
+
+class ScheduleIndex:
+    """Índice de intervalos semanales por usuario (estudiantes inscritos y profesores asignados)"""
+
+    def __init__(self):
+        self._slots: Dict[int, List[Slot]] = {}
+        self._no_interpretables: Dict[int, str] = {}
+        self._members: Dict[int, Set[int]] = {}
+        self._profesores: Dict[int, int] = {}
+        # usuario_id -> lista ordenada de (inicio, fin, curso_id)
+        self._timelines: Dict[int, List[Tuple[int, int, int]]] = {}
+        # usuario_id -> máximo `fin` acumulado hasta cada posición de su timeline
+        self._max_fin: Dict[int, List[int]] = {}
+
+    def load(self, courses: Iterable[Dict], enrollments: Iterable[Dict]):
+        for course in courses:
+            self.set_course(course["id"], course.get("horario"))
+            self.set_professor(course["id"], course.get("profesor_id"))
+        for enrollment in enrollments:
+            self.attach(enrollment["usuario_id"], enrollment["curso_id"])
+
+    def set_course(self, curso_id: int, horario: Optional[str]):
+        """Registrar o cambiar el horario de un curso, reubicando a sus miembros"""
+        members = list(self._members.get(curso_id, ()))
+        for usuario_id in members:
+            self._remove_intervals(usuario_id, curso_id)
+
+        slots = parse_horario(horario)
+        if slots is None:
+            self._no_interpretables[curso_id] = horario
+            slots = []
+        else:
+            self._no_interpretables.pop(curso_id, None)
+        self._slots[curso_id] = slots
+
+        for usuario_id in members:
+            self._add_intervals(usuario_id, curso_id)
+
+    def set_professor(self, curso_id: int, profesor_id: Optional[int]):
+        """Cambiar el profesor asignado, liberando el horario del anterior"""
+        anterior = self._profesores.pop(curso_id, None)
+        if anterior is not None and anterior != profesor_id:
+            self.detach(anterior, curso_id)
+        if profesor_id:
+            self._profesores[curso_id] = profesor_id
+            self.attach(profesor_id, curso_id)
+
+    def remove_course(self, curso_id: int):
+        for usuario_id in list(self._members.get(curso_id, ())):
+            self.detach(usuario_id, curso_id)
+        self._profesores.pop(curso_id, None)
+        self._slots.pop(curso_id, None)
+        self._members.pop(curso_id, None)
+        self._no_interpretables.pop(curso_id, None)
+
+    def attach(self, usuario_id: int, curso_id: int):
+        members = self._members.setdefault(curso_id, set())
+        if usuario_id in members:
+            return
+        members.add(usuario_id)
+        self._add_intervals(usuario_id, curso_id)
+
+    def detach(self, usuario_id: int, curso_id: int):
+        members = self._members.get(curso_id)
+        if not members or usuario_id not in members:
+            return
+        members.discard(usuario_id)
+        self._remove_intervals(usuario_id, curso_id)
+
+    def conflicts(self, usuario_id: int, curso_id: int) -> List[Dict]:
+        """Cursos del usuario que se solapan con curso_id (búsqueda binaria por intervalo)"""
+        timeline = self._timelines.get(usuario_id, [])
+        max_fin = self._max_fin.get(usuario_id, [])
+        found: Dict[int, List[str]] = {}
+
+        def add(otro: int, slot: Slot):
+            horarios = found.setdefault(otro, [])
+            texto = format_slot(slot)
+            if texto not in horarios:
+                horarios.append(texto)
+
+        for inicio, fin in self._slots.get(curso_id, []):
+            i = bisect_left(timeline, (inicio, -1, -1))
+            # Los intervalos que empiezan antes pueden solaparse entre sí (datos existentes):
+            # se retrocede mientras el máximo `fin` acumulado siga pasando de `inicio`
+            j = i - 1
+            while j >= 0 and max_fin[j] > inicio:
+                if timeline[j][1] > inicio and timeline[j][2] != curso_id:
+                    add(timeline[j][2], (inicio, fin))
+                j -= 1
+            while i < len(timeline) and timeline[i][0] < fin:
+                if timeline[i][2] != curso_id:
+                    add(timeline[i][2], (inicio, fin))
+                i += 1
+        return [{"curso_id": otro, "horarios": horarios} for otro, horarios in found.items()]
+
+    def report(self) -> Dict:
+        """Todos los solapamientos del tenant en una pasada por usuario"""
+        conflictos = []
+        for usuario_id, timeline in self._timelines.items():
+            pares: Set[Tuple[int, int]] = set()
+            # Intervalos activos en un heap por `fin`: cada intervalo nuevo se empareja con todos
+            activos: List[Tuple[int, int]] = []
+            for inicio, fin, curso_id in timeline:
+                while activos and activos[0][0] <= inicio:
+                    heapq.heappop(activos)
+                for _, otro in activos:
+                    if otro != curso_id:
+                        pares.add(tuple(sorted((otro, curso_id))))
+                heapq.heappush(activos, (fin, curso_id))
+            for a, b in sorted(pares):
+                conflictos.append({"usuario_id": usuario_id, "cursos": [a, b]})
+        return {
+            "conflictos": conflictos,
+            "horarios_no_interpretables": [
+                {"curso_id": curso_id, "horario": horario}
+                for curso_id, horario in sorted(self._no_interpretables.items())
+            ]
+        }
+
+    def _add_intervals(self, usuario_id: int, curso_id: int):
+        timeline = self._timelines.setdefault(usuario_id, [])
+        for inicio, fin in self._slots.get(curso_id, []):
+            insort(timeline, (inicio, fin, curso_id))
+        self._rebuild_max_fin(usuario_id)
+
+    def _remove_intervals(self, usuario_id: int, curso_id: int):
+        timeline = self._timelines.get(usuario_id)
+        if not timeline:
+            return
+        timeline[:] = [interval for interval in timeline if interval[2] != curso_id]
+        if not timeline:
+            del self._timelines[usuario_id]
+            self._max_fin.pop(usuario_id, None)
+        else:
+            self._rebuild_max_fin(usuario_id)
+
+    def _rebuild_max_fin(self, usuario_id: int):
+        max_fin, actual = [], -1
+        for _, fin, _ in self._timelines[usuario_id]:
+            actual = max(actual, fin)
+            max_fin.append(actual)
+        self._max_fin[usuario_id] = max_fin
+
+
+# Índices por tenant (schema) construidos bajo demanda
+_indexes: Dict[str, ScheduleIndex] = {}
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+async def get_schedule_index(schema: str,
+                             load: Callable[[], Awaitable[Tuple[List[Dict], List[Dict]]]]) -> ScheduleIndex:
+    """Obtener el índice del tenant, construyéndolo con cursos + inscripciones la primera vez"""
+    index = _indexes.get(schema)
+    if index is not None:
+        return index
+
+    lock = _locks.setdefault(schema, asyncio.Lock())
+    async with lock:
+        index = _indexes.get(schema)
+        if index is None:
+            courses, enrollments = await load()
+            index = ScheduleIndex()
+            index.load(courses, enrollments)
+            _indexes[schema] = index
+    return index
+
+
+def loaded_schedule_index(schema: str) -> Optional[ScheduleIndex]:
+    """Índice del tenant solo si ya fue construido (para mantenimiento incremental)"""
+    return _indexes.get(schema)
@@ -1,15 +1,24 @@
+import asyncio
 import httpx
 import os
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Iterable
 from fastapi import HTTPException, Header
 import jwt
 
+from shared import postgrest
+from shared.postgrest import chunked, in_filter
+from utils.cache import TTLCache
+
 # Variables de entorno
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", SUPABASE_ANON_KEY)
 
+# Los tenants casi nunca cambian; los usuarios (y su rol) se cachean poco tiempo
+_tenant_cache = TTLCache(ttl=300.0, maxsize=100)
+_user_cache = TTLCache(ttl=30.0)
+
 def get_tenant_from_email(email: str) -> Optional[str]:
     """Obtener dominio del tenant según el email"""
     if not email:
@@ -24,7 +33,10 @@ def get_tenant_from_email(email: str) -> Optional[str]:
     return None
 
 async def get_tenant_info(domain: str) -> Optional[Dict]:
-    """Obtener información del tenant desde Supabase"""
+    """Obtener información del tenant desde Supabase (cacheada)"""
+    cached = _tenant_cache.get(domain)
+    if cached is not None:
+        return cached
     try:
         async with httpx.AsyncClient(timeout=10.0) as client:
             headers = {
@@ -37,7 +49,10 @@ async def get_tenant_info(domain: str) -> Optional[Dict]:
             )
             if response.status_code == 200:
                 tenants = response.json()
-                return tenants[0] if tenants else None
+                if tenants:
+                    _tenant_cache.set(domain, tenants[0])
+                    return tenants[0]
+                return None
     except Exception as e:
         print(f"❌ Error obteniendo tenant info: {e}")
     return None
@@ -67,7 +82,10 @@ async def get_current_user(authorization: str = Header(None)) -> Dict:
         raise HTTPException(status_code=401, detail="Token inválido")
 
 async def get_user_by_email(email: str, schema: str) -> Optional[Dict]:
-    """Obtener datos del usuario por email"""
+    """Obtener datos del usuario por email (cacheado unos segundos)"""
+    cached = _user_cache.get((schema, email))
+    if cached is not None:
+        return cached
     try:
         async with httpx.AsyncClient(timeout=10.0) as client:
             headers = {
@@ -81,7 +99,88 @@ async def get_user_by_email(email: str, schema: str) -> Optional[Dict]:
             )
             if response.status_code == 200:
                 users = response.json()
-                return users[0] if users else None
+                if users:
+                    _user_cache.set((schema, email), users[0])
+                    return users[0]
+                return None
     except Exception as e:
         print(f"❌ Error obteniendo usuario: {e}")
     return None
+
+async def fetch_by_ids(client: httpx.AsyncClient, table_name: str, ids: Iterable[int],
+                       select: str, headers: Dict, column: str = "id",
+                       extra_params: Dict = None) -> List[Dict]:
+    """Obtener filas por una lista de ids en bloques concurrentes de id=in.(...)"""
+    return await postgrest.fetch_by_ids(
+        client, f"{SUPABASE_URL}/rest/v1/{table_name}", ids, select, headers,
+        column=column, extra_params=extra_params
+    )
+
+def content_range_total(content_range: Optional[str]) -> int:
+    """Total de un Content-Range de PostgREST ("0-9/42" o "*/42")"""
+    return postgrest.content_range_total(content_range) or 0
+
+async def collect_ids(client: httpx.AsyncClient, table_name: str, column: str,
+                      values: Iterable, headers: Dict, page_size: int = 1000) -> List[int]:
+    """Ids de las filas cuyo `column` está en `values`, paginando cada bloque de in.(...)"""
+    async def collect_chunk(chunk: List) -> List[int]:
+        ids, offset = [], 0
+        while True:
+            response = await client.get(
+                f"{SUPABASE_URL}/rest/v1/{table_name}",
+                params={column: in_filter(chunk), "select": "id", "order": "id.asc",
+                        "limit": page_size, "offset": offset},
+                headers=headers
+            )
+            if response.status_code == 404:
+                # Tabla de un servicio que no está desplegado en este tenant
+                return ids
+            response.raise_for_status()
+            page = response.json()
+            ids.extend(row["id"] for row in page)
+            if len(page) < page_size:
+                return ids
+            offset += page_size
+    
+    pages = await asyncio.gather(*(collect_chunk(chunk) for chunk in chunked(list(dict.fromkeys(values)))))
+    return [row_id for page in pages for row_id in page]
+
+async def count_by_ids(client: httpx.AsyncClient, table_name: str, column: str,
+                       values: Iterable, headers: Dict) -> int:
+    """Contar filas con `column` in.(...) sin traerlas (HEAD + count=exact)"""
+    async def count_chunk(chunk: List) -> int:
+        response = await client.head(
+            f"{SUPABASE_URL}/rest/v1/{table_name}",
+            params={column: in_filter(chunk), "select": "id"},
+            headers={**headers, "Prefer": "count=exact", "Range": "0-0"}
+        )
+        if response.status_code == 404:
+            return 0
+        response.raise_for_status()
+        return content_range_total(response.headers.get("content-range"))
+    
+    return sum(await asyncio.gather(*(count_chunk(chunk) for chunk in chunked(list(dict.fromkeys(values))))))
+
+async def delete_by_ids(client: httpx.AsyncClient, table_name: str, column: str,
+                        values: Iterable, headers: Dict) -> int:
+    """Borrar filas con `column` in.(...) en bloques concurrentes; devuelve cuántas se borraron"""
+    async def delete_chunk(chunk: List) -> int:
+        response = await client.delete(
+            f"{SUPABASE_URL}/rest/v1/{table_name}",
+            params={column: in_filter(chunk)},
+            headers={**headers, "Prefer": "return=minimal,count=exact"}
+        )
+        if response.status_code == 404:
+            return 0
+        response.raise_for_status()
+        return content_range_total(response.headers.get("content-range"))
+    
+    return sum(await asyncio.gather(*(delete_chunk(chunk) for chunk in chunked(list(dict.fromkeys(values))))))
+
+async def fetch_all_rows(table_name: str, select: str, page_size: int = 1000) -> List[Dict]:
+    """Leer una tabla completa en páginas (max-rows de PostgREST) con una proyección"""
+    headers = {
+        "apikey": SUPABASE_SERVICE_ROLE_KEY,
+        "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}"
+    }
+    return await postgrest.fetch_all_rows(f"{SUPABASE_URL}/rest/v1/{table_name}", select, headers, page_size)
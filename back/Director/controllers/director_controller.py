@@ -1,20 +1,42 @@
+import asyncio
 import httpx
 import os
+import random
 import secrets
 import string
-from typing import List, Optional
-from models.usuario import UsuarioCreate, UsuarioUpdate, UsuarioResponse
-from utils.supabase import supabase_request, get_tenant_schema
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from pydantic import ValidationError
+from models.usuario import UsuarioCreate, UsuarioUpdate, UsuarioResponse, UsuarioRoleChange
+from utils.supabase import (
+    supabase_request, get_tenant_schema, get_supabase_headers,
+    chunked, fetch_in, fetch_all_rows, in_filter
+)
+from utils.pagination import keyset_params, select_param, parse_total, next_cursor
+from utils.bulk_import import batched
+from utils.user_search import get_search_index
+from utils.events import event_bus, USER_CREATED, USER_UPDATED, USER_DELETED
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
+# Bulk provisioning: concurrent Auth Admin calls and retry policy
+AUTH_CONCURRENCY = int(os.getenv("DIRECTOR_AUTH_CONCURRENCY", "10"))
+AUTH_MAX_ATTEMPTS = 4
+AUTH_BACKOFF_SECONDS = 0.5
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Columns a caller may project with select= (auth_user_id stays internal)
+USER_COLUMNS = ("id", "nombre", "apellido", "email", "rol", "created_at", "updated_at")
+# Columns kept in the in-memory search index
+SEARCH_COLUMNS = "id,nombre,apellido,email,rol,created_at"
+
 def generate_password(length: int = 12) -> str:
     """Generate a secure random password"""
     characters = string.ascii_letters + string.digits + "!@#$%^&*"
     return ''.join(secrets.choice(characters) for _ in range(length))
 
-async def create_supabase_auth_user(email: str, password: str) -> dict:
+async def create_supabase_auth_user(email: str, password: str,
+                                    client: Optional[httpx.AsyncClient] = None) -> dict:
     """Create a user in Supabase Auth using Admin API"""
     url = f"{SUPABASE_URL}/auth/v1/admin/users"
     headers = {
@@ -32,12 +54,17 @@ async def create_supabase_auth_user(email: str, password: str) -> dict:
         }
     }
     
+    if client is not None:
+        response = await client.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        return response.json()
+    
     async with httpx.AsyncClient() as client:
         response = await client.post(url, headers=headers, json=payload)
         response.raise_for_status()
         return response.json()
 
-async def delete_supabase_auth_user(user_id: str) -> bool:
+async def delete_supabase_auth_user(user_id: str, client: Optional[httpx.AsyncClient] = None) -> bool:
     """Delete a user from Supabase Auth"""
     url = f"{SUPABASE_URL}/auth/v1/admin/users/{user_id}"
     headers = {
@@ -45,21 +72,74 @@ async def delete_supabase_auth_user(user_id: str) -> bool:
         "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}"
     }
     
+    if client is not None:
+        response = await client.delete(url, headers=headers)
+        return response.status_code == 200
+    
     async with httpx.AsyncClient() as client:
         response = await client.delete(url, headers=headers)
         return response.status_code == 200
 
-async def get_all_users(tenant_schema: str) -> List[UsuarioResponse]:
-    """Get all users from a tenant's usuarios table"""
-    table_name = f"{tenant_schema}_usuarios"
-    endpoint = f"{table_name}?select=*&order=created_at.desc"
+async def create_auth_user_with_retry(client: httpx.AsyncClient, semaphore: asyncio.Semaphore,
+                                      email: str, password: str) -> dict:
+    """Create an Auth user under the concurrency limit, retrying throttling and server errors"""
+    async with semaphore:
+        for attempt in range(AUTH_MAX_ATTEMPTS):
+            try:
+                return await create_supabase_auth_user(email, password, client)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in RETRYABLE_STATUS or attempt == AUTH_MAX_ATTEMPTS - 1:
+                    raise
+            except httpx.TransportError:
+                if attempt == AUTH_MAX_ATTEMPTS - 1:
+                    raise
+            # Exponential backoff with jitter so parallel workers don't retry in lockstep
+            await asyncio.sleep(AUTH_BACKOFF_SECONDS * 2 ** attempt + random.uniform(0, AUTH_BACKOFF_SECONDS))
+
+async def rollback_auth_users(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, auth_ids: List[str]):
+    """Delete Auth users whose database row could not be created"""
+    async def rollback(auth_id: str):
+        async with semaphore:
+            try:
+                if not await delete_supabase_auth_user(auth_id, client):
+                    print(f"⚠️ Could not roll back Auth user {auth_id}")
+            except httpx.HTTPError as e:
+                print(f"⚠️ Could not roll back Auth user {auth_id}: {e}")
     
-    try:
-        data = await supabase_request("GET", endpoint)
-        return [UsuarioResponse(**user) for user in data]
-    except Exception as e:
-        print(f"❌ Error getting users: {e}")
-        raise
+    await asyncio.gather(*(rollback(auth_id) for auth_id in auth_ids))
+
+async def list_users_page(tenant_schema: str, roles: Optional[List[str]] = None, limit: int = 100,
+                          cursor: Optional[str] = None,
+                          select: Optional[str] = None) -> Tuple[List[Dict], Optional[str], Optional[int]]:
+    """
+    One keyset page of a tenant's users (newest first)
+    Returns (rows, next_cursor, estimated_total); filters, projection and count run in PostgREST
+    """
+    params = keyset_params(cursor, limit)
+    params.append(("select", select_param(select, USER_COLUMNS) if select else ",".join(USER_COLUMNS)))
+    if roles:
+        params.append(("rol", in_filter(roles)))
+    
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            f"{SUPABASE_URL}/rest/v1/{tenant_schema}_usuarios",
+            params=params,
+            headers={**get_supabase_headers(), "Prefer": "count=estimated"}
+        )
+        response.raise_for_status()
+        rows = response.json()
+    
+    return rows, next_cursor(rows, limit), parse_total(response.headers.get("content-range"))
+
+async def search_users(tenant_schema: str, query: str, limit: int = 20,
+                       roles: Optional[List[str]] = None) -> Dict:
+    """Ranked, accent-insensitive search over nombre, apellido and email"""
+    async def load_users():
+        return await fetch_all_rows(f"{tenant_schema}_usuarios", SEARCH_COLUMNS)
+    
+    index = await get_search_index(tenant_schema, load_users)
+    total, users = index.search(query, limit, roles)
+    return {"query": query, "total": total, "users": users}
 
 async def get_user_by_id(tenant_schema: str, user_id: int) -> Optional[UsuarioResponse]:
     """Get a specific user by ID"""
@@ -95,18 +175,20 @@ async def create_user(tenant_schema: str, user_data: UsuarioCreate) -> dict:
     Returns: dict with user info and generated password
     """
     table_name = f"{tenant_schema}_usuarios"
+    # Stored lowercase, like bulk provisioning, so lookups and duplicate checks agree
+    email = user_data.email.lower()
     
     # Check if user already exists
-    existing = await get_user_by_email(tenant_schema, user_data.email)
+    existing = await get_user_by_email(tenant_schema, email)
     if existing:
-        raise ValueError(f"User with email {user_data.email} already exists")
+        raise ValueError(f"User with email {email} already exists")
     
     # Generate password for Auth
     password = generate_password()
     
     # Create Auth user first
     try:
-        auth_user = await create_supabase_auth_user(user_data.email, password)
+        auth_user = await create_supabase_auth_user(email, password)
         print(f"✅ Created Auth user: {auth_user.get('id')}")
     except Exception as e:
         print(f"❌ Error creating Auth user: {e}")
@@ -116,8 +198,9 @@ async def create_user(tenant_schema: str, user_data: UsuarioCreate) -> dict:
     db_data = {
         "nombre": user_data.nombre,
         "apellido": user_data.apellido,
-        "email": user_data.email,
-        "rol": user_data.rol
+        "email": email,
+        "rol": user_data.rol,
+        "auth_user_id": auth_user.get('id')
     }
     
     try:
@@ -126,6 +209,7 @@ async def create_user(tenant_schema: str, user_data: UsuarioCreate) -> dict:
         
         if created_users and len(created_users) > 0:
             created_user = created_users[0]
+            await event_bus.publish(USER_CREATED, tenant_schema, [created_user])
             return {
                 "user": UsuarioResponse(**created_user),
                 "password": password,
@@ -155,6 +239,7 @@ async def update_user(tenant_schema: str, user_id: int, user_data: UsuarioUpdate
         updated_users = await supabase_request("PATCH", endpoint, update_data)
         
         if updated_users and len(updated_users) > 0:
+            await event_bus.publish(USER_UPDATED, tenant_schema, updated_users, update_data.keys())
             return UsuarioResponse(**updated_users[0])
         else:
             raise ValueError(f"User with ID {user_id} not found")
@@ -176,12 +261,220 @@ async def delete_user(tenant_schema: str, user_id: int) -> bool:
     try:
         await supabase_request("DELETE", endpoint)
         print(f"✅ Deleted user {user_id} from database")
+        await event_bus.publish(USER_DELETED, tenant_schema, [{"id": user_id}])
         
-        # Note: We can't easily delete from Auth without the Auth user ID
-        # For production, you'd want to store auth_user_id in the usuarios table
-        # For now, we just delete from the database
+        # Users created before auth_user_id was stored can't be removed from Auth here
+        if user.auth_user_id and not await delete_supabase_auth_user(user.auth_user_id):
+            print(f"⚠️ Could not delete Auth user {user.auth_user_id}")
         
         return True
     except Exception as e:
         print(f"❌ Error deleting user: {e}")
         raise
+
+def validate_bulk_row(tenant_schema: str, row: Dict) -> Optional[str]:
+    """Apply the same checks as the single-user endpoint; returns an error message or None"""
+    try:
+        UsuarioCreate(nombre=row["nombre"], apellido=row["apellido"], email=row["email"], rol=row["rol"])
+    except ValidationError as e:
+        return "; ".join(f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors())
+    if not row["nombre"] or not row["apellido"]:
+        return "nombre and apellido are required"
+    if row["rol"] not in ["Estudiante", "Profesor"]:
+        return "Rol must be 'Estudiante' or 'Profesor'"
+    try:
+        if get_tenant_schema(row["email"]) != tenant_schema:
+            return "User email domain must match your institution"
+    except ValueError as e:
+        return str(e)
+    return None
+
+async def insert_user_rows(client: httpx.AsyncClient, table_name: str, rows: List[Dict]) -> List[Dict]:
+    """Insert many usuarios rows with a single POST"""
+    response = await client.post(
+        f"{SUPABASE_URL}/rest/v1/{table_name}",
+        headers=get_supabase_headers(),
+        json=rows
+    )
+    response.raise_for_status()
+    return response.json()
+
+async def provision_batch(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, tenant_schema: str,
+                          batch: List[Dict], seen: Set[str]) -> List[Dict]:
+    """Provision one batch: validate, skip existing emails, create Auth users, insert DB rows"""
+    table_name = f"{tenant_schema}_usuarios"
+    results = []
+    valid = []
+    for row in batch:
+        error = validate_bulk_row(tenant_schema, row)
+        key = row["email"].lower()
+        if error:
+            results.append({"line": row["line"], "email": row["email"], "status": "invalid", "detail": error})
+        elif key in seen:
+            results.append({"line": row["line"], "email": row["email"], "status": "duplicate"})
+        else:
+            seen.add(key)
+            valid.append(row)
+    
+    # One batched in.() lookup instead of an existence check per user;
+    # in.() is case-sensitive, so emails are looked up (and stored) lowercased
+    try:
+        existing = await fetch_in(client, table_name, "email", (row["email"].lower() for row in valid), "email")
+    except httpx.HTTPError as e:
+        return results + [
+            {"line": row["line"], "email": row["email"], "status": "failed", "detail": f"Lookup failed: {e}"}
+            for row in valid
+        ]
+    existing_emails = {user["email"].lower() for user in existing}
+    
+    pending = []
+    for row in valid:
+        if row["email"].lower() in existing_emails:
+            results.append({"line": row["line"], "email": row["email"], "status": "exists"})
+        else:
+            pending.append({**row, "password": generate_password()})
+    
+    auth_results = await asyncio.gather(
+        *(create_auth_user_with_retry(client, semaphore, row["email"], row["password"]) for row in pending),
+        return_exceptions=True
+    )
+    created = []
+    for row, auth_user in zip(pending, auth_results):
+        if isinstance(auth_user, Exception):
+            detail = auth_user.response.text if isinstance(auth_user, httpx.HTTPStatusError) else str(auth_user)
+            results.append({"line": row["line"], "email": row["email"], "status": "failed", "detail": f"Auth: {detail}"})
+        else:
+            created.append({**row, "auth_user_id": auth_user.get("id")})
+    
+    for chunk in chunked(created):
+        payload = [
+            {"nombre": row["nombre"], "apellido": row["apellido"], "email": row["email"].lower(),
+             "rol": row["rol"], "auth_user_id": row["auth_user_id"]}
+            for row in chunk
+        ]
+        try:
+            inserted = await insert_user_rows(client, table_name, payload)
+            outcomes = [(row, None) for row in chunk]
+        except httpx.HTTPError:
+            # Isolate the offending rows so one bad row does not roll back the whole chunk
+            inserted, outcomes = [], []
+            for row, data in zip(chunk, payload):
+                try:
+                    inserted.extend(await insert_user_rows(client, table_name, [data]))
+                    outcomes.append((row, None))
+                except httpx.HTTPError as e:
+                    detail = e.response.text if isinstance(e, httpx.HTTPStatusError) else str(e)
+                    outcomes.append((row, detail))
+        
+        users_by_email = {user["email"].lower(): user for user in inserted}
+        await event_bus.publish(USER_CREATED, tenant_schema, inserted)
+        await rollback_auth_users(client, semaphore, [row["auth_user_id"] for row, error in outcomes if error])
+        for row, error in outcomes:
+            if error:
+                results.append({"line": row["line"], "email": row["email"], "status": "failed", "detail": f"Database: {error}"})
+            else:
+                results.append({
+                    "line": row["line"],
+                    "email": row["email"],
+                    "status": "created",
+                    "user": users_by_email.get(row["email"].lower()),
+                    "password": row["password"],
+                    "auth_user_id": row["auth_user_id"]
+                })
+    
+    return sorted(results, key=lambda result: result["line"])
+
+async def provision_users(tenant_schema: str, rows: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+    """
+    Bulk-create users from a stream of rows, yielding a progress event per batch
+    and a final summary. Created rows include the generated password.
+    """
+    totals = {"processed": 0, "created": 0, "exists": 0, "duplicate": 0, "invalid": 0, "failed": 0}
+    seen: Set[str] = set()
+    semaphore = asyncio.Semaphore(AUTH_CONCURRENCY)
+    
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        async for batch in batched(rows):
+            results = await provision_batch(client, semaphore, tenant_schema, batch, seen)
+            totals["processed"] += len(results)
+            for result in results:
+                totals[result["status"]] += 1
+            yield {"event": "progress", **totals, "results": results}
+    
+    yield {"event": "done", **totals}
+
+async def bulk_update_roles(tenant_schema: str, changes: List[UsuarioRoleChange]) -> Dict:
+    """Apply many role changes with one PATCH id=in.(...) per target role (and chunk)"""
+    table_name = f"{tenant_schema}_usuarios"
+    by_role: Dict[str, List[int]] = {}
+    for change in changes:
+        by_role.setdefault(change.rol, []).append(change.id)
+    
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        async def patch_chunk(rol: str, ids: List[int]) -> List[Dict]:
+            response = await client.patch(
+                f"{SUPABASE_URL}/rest/v1/{table_name}",
+                params={"id": in_filter(ids)},
+                headers=get_supabase_headers(),
+                json={"rol": rol}
+            )
+            response.raise_for_status()
+            return response.json()
+        
+        pages = await asyncio.gather(*(
+            patch_chunk(rol, chunk)
+            for rol, ids in by_role.items()
+            for chunk in chunked(list(dict.fromkeys(ids)))
+        ))
+    
+    updated = [user for page in pages for user in page]
+    await event_bus.publish(USER_UPDATED, tenant_schema, updated, ["rol"])
+    updated_ids = {user["id"] for user in updated}
+    return {
+        "updated": len(updated),
+        "not_found": sorted({change.id for change in changes} - updated_ids),
+        "users": updated
+    }
+
+async def bulk_delete_users(tenant_schema: str, user_ids: List[int]) -> Dict:
+    """
+    Delete many users with chunked DELETE id=in.(...) requests, then remove
+    their Auth users concurrently using the stored auth_user_id
+    """
+    table_name = f"{tenant_schema}_usuarios"
+    unique_ids = list(dict.fromkeys(user_ids))
+    
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        async def delete_chunk(ids: List[int]) -> List[Dict]:
+            response = await client.delete(
+                f"{SUPABASE_URL}/rest/v1/{table_name}",
+                params={"id": in_filter(ids), "select": "id,auth_user_id"},
+                headers=get_supabase_headers()
+            )
+            response.raise_for_status()
+            return response.json()
+        
+        pages = await asyncio.gather(*(delete_chunk(chunk) for chunk in chunked(unique_ids)))
+        deleted = [user for page in pages for user in page]
+        await event_bus.publish(USER_DELETED, tenant_schema, deleted)
+        
+        semaphore = asyncio.Semaphore(AUTH_CONCURRENCY)
+        
+        async def delete_auth(auth_id: str) -> bool:
+            async with semaphore:
+                try:
+                    return await delete_supabase_auth_user(auth_id, client)
+                except httpx.HTTPError:
+                    return False
+        
+        with_auth = [user for user in deleted if user.get("auth_user_id")]
+        auth_results = await asyncio.gather(*(delete_auth(user["auth_user_id"]) for user in with_auth))
+    
+    deleted_ids = {user["id"] for user in deleted}
+    return {
+        "deleted": len(deleted),
+        "not_found": sorted(set(unique_ids) - deleted_ids),
+        "auth_deleted": sum(auth_results),
+        "auth_failed": [user["id"] for user, ok in zip(with_auth, auth_results) if not ok],
+        "without_auth_id": sorted(user["id"] for user in deleted if not user.get("auth_user_id"))
+    }
@@ -5,6 +5,8 @@ import os
 import sys
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# back/ holds the shared package (the image copies it next to the service)
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -17,6 +19,11 @@ if not all([SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE_KEY]):
     raise RuntimeError("❌ Variables de entorno de Supabase no configuradas")
 
 from routes.director_routes import router as director_router
+from utils.events import event_bus
+from utils.user_search import apply_user_event
+
+# The search index consumes the user change events published by the controller
+event_bus.subscribe(apply_user_event)
 
 app = FastAPI(
     title="Director Microservice",
@@ -35,6 +42,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 app.include_router(director_router)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional
 from datetime import datetime
 
 class Usuario(BaseModel):
@@ -29,5 +29,26 @@ class UsuarioResponse(BaseModel):
     apellido: str
     email: str
     rol: str
+    auth_user_id: Optional[str] = None
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
+
+class UsuarioListItem(BaseModel):
+    """A row of the paged user list; only the projected columns (select=) are returned"""
+    id: int
+    nombre: Optional[str] = None
+    apellido: Optional[str] = None
+    email: Optional[str] = None
+    rol: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+class UsuarioRoleChange(BaseModel):
+    id: int
+    rol: str
+
+class UsuarioBulkUpdate(BaseModel):
+    changes: List[UsuarioRoleChange] = Field(..., min_length=1, max_length=5000)
+
+class UsuarioBulkDelete(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=5000)
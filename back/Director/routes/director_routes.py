@@ -1,14 +1,24 @@
-from fastapi import APIRouter, HTTPException, Header, status
-from typing import Optional, List
-from models.usuario import UsuarioCreate, UsuarioUpdate, UsuarioResponse
+import json
+from fastapi import APIRouter, HTTPException, Header, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from models.usuario import (
+    UsuarioCreate, UsuarioUpdate, UsuarioResponse, UsuarioListItem, UsuarioBulkUpdate, UsuarioBulkDelete
+)
 from controllers.director_controller import (
-    get_all_users,
+    list_users_page,
+    search_users,
     get_user_by_id,
     create_user,
     update_user,
-    delete_user
+    delete_user,
+    provision_users,
+    bulk_update_roles,
+    bulk_delete_users
 )
 from utils.supabase import get_tenant_schema
+from utils.bulk_import import parse_user_rows
+from utils.pagination import DEFAULT_LIMIT, MAX_LIMIT
 
 router = APIRouter(prefix="/api/director", tags=["Director"])
 
@@ -28,22 +38,61 @@ def extract_tenant_from_header(x_user_email: Optional[str]) -> str:
             detail=str(e)
         )
 
-@router.get("/users", response_model=List[UsuarioResponse])
-async def list_users(x_user_email: Optional[str] = Header(None)):
+@router.get("/users", response_model=List[UsuarioListItem], response_model_exclude_unset=True)
+async def list_users(
+    response: Response,
+    rol: Optional[str] = Query(default=None, description="Comma-separated roles, e.g. Estudiante,Profesor"),
+    limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    select: Optional[str] = Query(default=None, description="Comma-separated columns"),
+    x_user_email: Optional[str] = Header(None)
+):
     """
-    Get all users (students and teachers) in the director's tenant
+    Get one page of users (newest first) in the director's tenant
     Requires X-User-Email header to determine tenant
+    The body is the list of users; X-Next-Cursor holds the cursor of the next
+    page (absent on the last one) and X-Total-Count an estimated total
     """
     tenant_schema = extract_tenant_from_header(x_user_email)
+    roles = [r.strip() for r in rol.split(",") if r.strip()] if rol else None
     
     try:
-        users = await get_all_users(tenant_schema)
-        return users
+        users, cursor_next, total = await list_users_page(tenant_schema, roles, limit, cursor, select)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error retrieving users: {str(e)}"
         )
+    
+    if cursor_next:
+        response.headers["X-Next-Cursor"] = cursor_next
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    return users
+
+@router.get("/users/search")
+async def search_users_endpoint(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(default=20, ge=1, le=100),
+    rol: Optional[str] = Query(default=None, description="Comma-separated roles"),
+    x_user_email: Optional[str] = Header(None)
+):
+    """Search users by partial name, surname or email (accent-insensitive, typo-tolerant)"""
+    tenant_schema = extract_tenant_from_header(x_user_email)
+    roles = [r.strip() for r in rol.split(",") if r.strip()] if rol else None
+    
+    try:
+        return await search_users(tenant_schema, q, limit, roles)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error searching users: {str(e)}"
+        )
 
 @router.get("/users/{user_id}", response_model=UsuarioResponse)
 async def get_user(user_id: int, x_user_email: Optional[str] = Header(None)):
@@ -115,6 +164,58 @@ async def create_new_user(user_data: UsuarioCreate, x_user_email: Optional[str]
             detail=f"Error creating user: {str(e)}"
         )
 
+@router.post("/users/bulk")
+async def bulk_create_users(request: Request, x_user_email: Optional[str] = Header(None)):
+    """
+    Create many users from a CSV body (header: nombre,apellido,email,rol)
+    Streams NDJSON: one progress event per batch with per-row results
+    (including generated passwords), then a final "done" summary
+    """
+    tenant_schema = extract_tenant_from_header(x_user_email)
+    rows = parse_user_rows(request.stream())
+    
+    async def events():
+        try:
+            async for event in provision_users(tenant_schema, rows):
+                yield json.dumps(event, default=str) + "\n"
+        except ValueError as e:
+            yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.patch("/users/bulk")
+async def bulk_update_users(request: UsuarioBulkUpdate, x_user_email: Optional[str] = Header(None)):
+    """Change the role of many users; requests are grouped per target role"""
+    tenant_schema = extract_tenant_from_header(x_user_email)
+    
+    invalid = sorted({c.rol for c in request.changes} - {"Estudiante", "Profesor", "Director"})
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Rol must be 'Estudiante', 'Profesor', or 'Director'"
+        )
+    
+    try:
+        return await bulk_update_roles(tenant_schema, request.changes)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error updating users: {str(e)}"
+        )
+
+@router.post("/users/bulk-delete")
+async def bulk_delete(request: UsuarioBulkDelete, x_user_email: Optional[str] = Header(None)):
+    """Delete many users from the tenant and from Supabase Auth"""
+    tenant_schema = extract_tenant_from_header(x_user_email)
+    
+    try:
+        return await bulk_delete_users(tenant_schema, request.user_ids)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error deleting users: {str(e)}"
+        )
+
 @router.put("/users/{user_id}", response_model=UsuarioResponse)
 async def update_existing_user(
     user_id: int, 
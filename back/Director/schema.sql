@@ -0,0 +1,18 @@
+-- ═══════════════════════════════════════════════════════════════
+-- 🔹 ID DE SUPABASE AUTH EN USUARIOS (migración)
+-- ═══════════════════════════════════════════════════════════════
+-- El servicio Director guarda el id del usuario de Supabase Auth al crearlo,
+-- para poder eliminarlo de Auth al borrar el usuario (también en bloque).
+-- Los usuarios creados antes de esta migración quedan con auth_user_id NULL.
+
+ALTER TABLE tenant_ucb_usuarios ADD COLUMN IF NOT EXISTS auth_user_id UUID;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_ucb_usuarios_auth_user_id
+  ON tenant_ucb_usuarios(auth_user_id);
+
+ALTER TABLE tenant_upb_usuarios ADD COLUMN IF NOT EXISTS auth_user_id UUID;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_upb_usuarios_auth_user_id
+  ON tenant_upb_usuarios(auth_user_id);
+
+ALTER TABLE tenant_gmail_usuarios ADD COLUMN IF NOT EXISTS auth_user_id UUID;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_gmail_usuarios_auth_user_id
+  ON tenant_gmail_usuarios(auth_user_id);
@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Service modules are imported as in main.py (utils.*, controllers.*);
+# back/ provides the shared package
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(1, os.path.dirname(SERVICE_DIR))
+
+# Module-level configuration read at import time; requests go to a mock transport
+os.environ.setdefault("SUPABASE_URL", "http://supabase.test")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test-service-key")
@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import controllers.director_controller as director
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    """Record backoff sleeps instead of waiting"""
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(director.asyncio, "sleep", fake_sleep)
+    return sleeps
+
+
+def run_batch(handler, rows):
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await director.provision_batch(client, asyncio.Semaphore(4), "tenant_ucb", rows, set())
+    return asyncio.run(go())
+
+
+def row(line, email, rol="Estudiante"):
+    return {"line": line, "nombre": "Ana", "apellido": "Pérez", "email": email, "rol": rol}
+
+
+class FakeSupabase:
+    """Auth Admin + PostgREST responses scripted per test"""
+
+    def __init__(self, auth_failures=None, bad_insert_emails=(), existing=()):
+        self.auth_failures = dict(auth_failures or {})
+        self.bad_insert_emails = set(bad_insert_emails)
+        self.existing = list(existing)
+        self.auth_attempts = {}
+        self.deleted_auth_ids = []
+        self.next_id = 1
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/auth/v1/admin/users" and request.method == "POST":
+            email = json.loads(request.content)["email"]
+            attempt = self.auth_attempts[email] = self.auth_attempts.get(email, 0) + 1
+            failures = self.auth_failures.get(email, [])
+            if attempt <= len(failures):
+                return httpx.Response(failures[attempt - 1], text="auth error")
+            return httpx.Response(200, json={"id": f"auth-{email}"})
+        if path.startswith("/auth/v1/admin/users/") and request.method == "DELETE":
+            self.deleted_auth_ids.append(path.rsplit("/", 1)[1])
+            return httpx.Response(200)
+        if path == "/rest/v1/tenant_ucb_usuarios" and request.method == "GET":
+            return httpx.Response(200, json=[{"email": email} for email in self.existing])
+        if path == "/rest/v1/tenant_ucb_usuarios" and request.method == "POST":
+            rows = json.loads(request.content)
+            if any(r["email"] in self.bad_insert_emails for r in rows):
+                return httpx.Response(409, text="duplicate key")
+            inserted = []
+            for r in rows:
+                inserted.append({"id": self.next_id, **r})
+                self.next_id += 1
+            return httpx.Response(201, json=inserted)
+        return httpx.Response(404)
+
+
+def test_retries_throttled_auth_calls_with_backoff(no_backoff):
+    fake = FakeSupabase(auth_failures={"ana@ucb.edu.bo": [429, 503]})
+    results = run_batch(fake, [row(2, "ana@ucb.edu.bo")])
+
+    assert [r["status"] for r in results] == ["created"]
+    assert fake.auth_attempts["ana@ucb.edu.bo"] == 3
+    # Exponential backoff: base * 2**attempt plus up to one base of jitter
+    base = director.AUTH_BACKOFF_SECONDS
+    assert len(no_backoff) == 2
+    assert base <= no_backoff[0] <= 2 * base
+    assert 2 * base <= no_backoff[1] <= 3 * base
+
+
+def test_gives_up_after_max_attempts():
+    fake = FakeSupabase(auth_failures={"ana@ucb.edu.bo": [503] * director.AUTH_MAX_ATTEMPTS})
+    results = run_batch(fake, [row(2, "ana@ucb.edu.bo")])
+
+    assert results[0]["status"] == "failed"
+    assert results[0]["detail"].startswith("Auth:")
+    assert fake.auth_attempts["ana@ucb.edu.bo"] == director.AUTH_MAX_ATTEMPTS
+
+
+def test_does_not_retry_client_errors(no_backoff):
+    fake = FakeSupabase(auth_failures={"ana@ucb.edu.bo": [422]})
+    results = run_batch(fake, [row(2, "ana@ucb.edu.bo")])
+
+    assert results[0]["status"] == "failed"
+    assert fake.auth_attempts["ana@ucb.edu.bo"] == 1
+    assert no_backoff == []
+
+
+def test_rolls_back_auth_user_when_its_row_is_rejected():
+    fake = FakeSupabase(bad_insert_emails={"luis@ucb.edu.bo"})
+    results = run_batch(fake, [row(2, "ana@ucb.edu.bo"), row(3, "luis@ucb.edu.bo")])
+
+    assert [(r["line"], r["status"]) for r in results] == [(2, "created"), (3, "failed")]
+    assert results[1]["detail"].startswith("Database:")
+    # Only the Auth user whose row failed is deleted; the good row is kept
+    assert fake.deleted_auth_ids == ["auth-luis@ucb.edu.bo"]
+    assert results[0]["user"]["email"] == "ana@ucb.edu.bo"
+
+
+def test_skips_invalid_duplicate_and_existing_rows():
+    fake = FakeSupabase(existing=["eva@ucb.edu.bo"])
+    results = run_batch(fake, [
+        row(2, "ana@ucb.edu.bo"),
+        row(3, "ANA@ucb.edu.bo"),
+        row(4, "eva@ucb.edu.bo"),
+        row(5, "otro@upb.edu.bo"),
+        row(6, "rol@ucb.edu.bo", rol="Director"),
+    ])
+
+    assert [r["status"] for r in results] == ["created", "duplicate", "exists", "invalid", "invalid"]
+    assert set(fake.auth_attempts) == {"ana@ucb.edu.bo"}
@@ -0,0 +1,87 @@
+import asyncio
+
+import utils.user_search as user_search
+from utils.events import USER_CREATED, USER_DELETED, USER_UPDATED
+from utils.user_search import UserSearchIndex, email_tokens
+
+USERS = [
+    {"id": 1, "nombre": "José", "apellido": "Pérez", "email": "jose.perez@ucb.edu.bo", "rol": "Estudiante"},
+    {"id": 2, "nombre": "Josefina", "apellido": "Ramos", "email": "jramos@ucb.edu.bo", "rol": "Profesor"},
+    {"id": 3, "nombre": "María", "apellido": "Gutiérrez", "email": "mgutierrez@ucb.edu.bo", "rol": "Estudiante"},
+]
+
+
+def build():
+    index = UserSearchIndex()
+    index.load(USERS)
+    return index
+
+
+def ids(result):
+    return [user["id"] for user in result[1]]
+
+
+def test_email_tokens_ignore_the_shared_domain():
+    assert email_tokens("jose.perez@ucb.edu.bo") == ["jose", "perez", "joseperez"]
+    assert email_tokens("jramos@ucb.edu.bo") == ["jramos"]
+
+
+def test_accent_insensitive_prefix_search():
+    index = build()
+    assert ids(index.search("jose")) == [1, 2]
+    assert ids(index.search("PEREZ")) == [1]
+    assert ids(index.search("jos per")) == [1]
+
+
+def test_fuzzy_match_tolerates_typos():
+    assert ids(build().search("gutierez")) == [3]
+
+
+def test_role_filter_and_limit():
+    index = build()
+    assert ids(index.search("jose", roles=["Profesor"])) == [2]
+    total, users = index.search("jose", limit=1)
+    assert total == 2 and len(users) == 1
+
+
+def test_upsert_and_remove_keep_the_index_consistent():
+    index = build()
+    index.upsert({**USERS[0], "apellido": "Quispe", "email": "jquispe@ucb.edu.bo"})
+    assert ids(index.search("perez")) == []
+    assert ids(index.search("quispe")) == [1]
+    index.remove(1)
+    assert ids(index.search("quispe")) == []
+    assert len(index) == 2
+
+
+def test_tenant_index_follows_user_events_and_rebuilds_after_ttl(monkeypatch):
+    loads = []
+
+    async def load_users():
+        loads.append(1)
+        return USERS
+
+    async def scenario():
+        monkeypatch.setattr(user_search, "_indexes", user_search.TenantIndexes(ttl=60))
+        index = await user_search.get_search_index("tenant_ucb", load_users)
+        await user_search.apply_user_event({
+            "type": USER_CREATED, "tenant": "tenant_ucb", "user_ids": [4],
+            "users": [{"id": 4, "nombre": "Lucía", "apellido": "Vargas", "email": "lvargas@ucb.edu.bo", "rol": "Estudiante"}]
+        })
+        await user_search.apply_user_event({
+            "type": USER_UPDATED, "tenant": "tenant_ucb", "user_ids": [3],
+            "users": [{**USERS[2], "rol": "Profesor"}]
+        })
+        await user_search.apply_user_event({"type": USER_DELETED, "tenant": "tenant_ucb", "user_ids": [2], "users": [{"id": 2}]})
+        assert ids(index.search("lucia")) == [4]
+        assert ids(index.search("maria", roles=["Profesor"])) == [3]
+        assert 2 not in ids(index.search("josefina"))
+
+        # Once the TTL expires the index is rebuilt from the table
+        user_search._indexes.ttl = 0
+        rebuilt = await user_search.get_search_index("tenant_ucb", load_users)
+        assert rebuilt is not index
+        assert ids(rebuilt.search("josefina")) == [2]
+
+    asyncio.run(scenario())
+    assert len(loads) == 2
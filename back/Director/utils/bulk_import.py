@@ -0,0 +1,55 @@
+import codecs
+import csv
+from typing import AsyncIterator, Dict, List
+
+# Rows handled per pipeline batch (lookups, Auth creation and inserts)
+BATCH_SIZE = 500
+
+USER_COLUMNS = ("nombre", "apellido", "email", "rol")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Turn a byte stream into text lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def parse_user_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict]:
+    """Parse a CSV with a header row containing nombre, apellido, email and rol"""
+    header = None
+    line_number = 0
+
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            missing = [column for column in USER_COLUMNS if column not in header]
+            if missing:
+                raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+            continue
+
+        data = dict(zip(header, values))
+        yield {"line": line_number, **{column: (data.get(column) or "").strip() for column in USER_COLUMNS}}
+
+
+async def batched(rows: AsyncIterator[Dict], size: int = BATCH_SIZE) -> AsyncIterator[List[Dict]]:
+    batch: List[Dict] = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
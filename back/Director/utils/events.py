@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+USER_CREATED = "user.created"
+USER_UPDATED = "user.updated"
+USER_DELETED = "user.deleted"
+
+# User columns carried in events (auth_user_id stays internal)
+EVENT_USER_COLUMNS = ("id", "nombre", "apellido", "email", "rol", "created_at", "updated_at")
+
+Subscriber = Callable[[Dict], Awaitable[None]]
+
+
+class EventBackend(ABC):
+    """Transport for change events; implementations must not block the event loop"""
+
+    @abstractmethod
+    async def publish(self, event: Dict):
+        ...
+
+
+class InProcessBackend(EventBackend):
+    """Delivers events to async callbacks registered in this process"""
+
+    def __init__(self):
+        self._subscribers: List[Subscriber] = []
+
+    def subscribe(self, callback: Subscriber):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Subscriber):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    async def publish(self, event: Dict):
+        for callback in list(self._subscribers):
+            try:
+                await callback(event)
+            except Exception as e:
+                print(f"⚠️ Event subscriber failed on {event['type']}: {e}")
+
+
+class FileBackend(EventBackend):
+    """
+    Appends events as JSON lines to a local file, so other local processes
+    (or tests) can consume them with follow_event_log()
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = asyncio.Lock()
+
+    def _append(self, line: str):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    async def publish(self, event: Dict):
+        line = json.dumps(event, default=str) + "\n"
+        async with self._lock:
+            await asyncio.to_thread(self._append, line)
+
+
+class EventBus:
+    """Fan-out of change events to every configured backend; publishing never fails the write"""
+
+    def __init__(self, backends: Optional[List[EventBackend]] = None):
+        self.local = InProcessBackend()
+        self.backends: List[EventBackend] = [self.local, *(backends or [])]
+
+    def add_backend(self, backend: EventBackend):
+        self.backends.append(backend)
+
+    def subscribe(self, callback: Subscriber):
+        self.local.subscribe(callback)
+
+    def unsubscribe(self, callback: Subscriber):
+        self.local.unsubscribe(callback)
+
+    async def publish(self, event_type: str, tenant_schema: str, users: Iterable[Dict],
+                      fields: Optional[Iterable[str]] = None):
+        """
+        Publish one event for a set of users (their rows as written; only
+        EVENT_USER_COLUMNS are carried). fields lists the changed columns
+        (None for creations and deletions)
+        """
+        users = [{k: v for k, v in user.items() if k in EVENT_USER_COLUMNS} for user in users]
+        if not users:
+            return
+        event = {
+            "id": str(uuid.uuid4()),
+            "type": event_type,
+            "tenant": tenant_schema,
+            "user_ids": [user["id"] for user in users],
+            "users": users,
+            "fields": sorted(fields) if fields is not None else None,
+            "occurred_at": datetime.utcnow().isoformat()
+        }
+        for backend in self.backends:
+            try:
+                await backend.publish(event)
+            except Exception as e:
+                print(f"⚠️ Could not publish {event_type} to {type(backend).__name__}: {e}")
+
+
+async def follow_event_log(path: str, from_start: bool = False,
+                           poll_interval: float = 0.5) -> AsyncIterator[Dict]:
+    """Tail a FileBackend log and yield its events as they are appended"""
+    while not os.path.exists(path):
+        await asyncio.sleep(poll_interval)
+
+    with open(path, "r", encoding="utf-8") as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        buffer = ""
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                await asyncio.sleep(poll_interval)
+                continue
+            buffer += chunk
+            if not buffer.endswith("\n"):
+                continue
+            line, buffer = buffer.strip(), ""
+            if line:
+                yield json.loads(line)
+
+
+def _build_default_bus() -> EventBus:
+    bus = EventBus()
+    log_path = os.getenv("DIRECTOR_EVENT_LOG")
+    if log_path:
+        bus.add_backend(FileBackend(log_path))
+    return bus
+
+
+# Process-wide bus used by the Director controller
+event_bus = _build_default_bus()
@@ -0,0 +1,17 @@
+from typing import Dict, List, Optional, Tuple
+
+from shared import pagination
+from shared.pagination import select_param
+from shared.postgrest import content_range_total as parse_total
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def keyset_params(cursor: Optional[str], limit: int) -> List[Tuple[str, str]]:
+    """PostgREST params to page by (created_at desc, id desc); an invalid cursor raises ValueError"""
+    return pagination.keyset_params(cursor, limit, MAX_LIMIT)
+
+
+def next_cursor(rows: List[Dict], limit: int) -> Optional[str]:
+    return pagination.next_cursor(rows, limit, MAX_LIMIT)
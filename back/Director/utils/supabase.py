@@ -1,5 +1,9 @@
 import os
 import httpx
+from typing import Dict, Iterable, List
+
+from shared import postgrest
+from shared.postgrest import chunked, in_filter
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -33,6 +37,20 @@ async def supabase_request(method: str, endpoint: str, data: dict = None):
         response.raise_for_status()
         return response.json() if response.text else None
 
+async def fetch_in(client: httpx.AsyncClient, table_name: str, column: str,
+                   values: Iterable, select: str = "*") -> List[Dict]:
+    """Fetch rows whose column is in values, one concurrent in.(...) request per chunk"""
+    return await postgrest.fetch_by_ids(
+        client, f"{SUPABASE_URL}/rest/v1/{table_name}", values, select,
+        get_supabase_headers(), column=column
+    )
+
+async def fetch_all_rows(table_name: str, select: str, page_size: int = 1000) -> List[Dict]:
+    """Read a whole table in id-ordered pages (PostgREST caps rows per response)"""
+    return await postgrest.fetch_all_rows(
+        f"{SUPABASE_URL}/rest/v1/{table_name}", select, get_supabase_headers(), page_size
+    )
+
 def get_tenant_schema(email: str) -> str:
     """Extract tenant schema name from email domain"""
     if email.endswith("@ucb.edu.bo"):
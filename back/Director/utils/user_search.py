@@ -0,0 +1,100 @@
+import os
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from shared.text_index import TenantIndexes, TextIndex, normalize, tokenize
+from utils.events import USER_DELETED
+
+# Ranking weight of each indexed field
+FIELD_WEIGHTS = {"nombre": 2.0, "apellido": 2.0, "email": 1.5}
+# Seconds before a tenant index is rebuilt from the usuarios table; Auth and
+# Roles write users directly, so only a rebuild picks up their changes
+SEARCH_INDEX_TTL = float(os.getenv("DIRECTOR_SEARCH_INDEX_TTL", "300"))
+
+
+def email_tokens(email: Optional[str]) -> List[str]:
+    """Tokens of the local part only: every user of a tenant shares the domain"""
+    local = normalize(email).split("@", 1)[0]
+    tokens = tokenize(local)
+    compact = "".join(tokens)
+    if len(tokens) > 1:
+        tokens.append(compact)
+    return tokens
+
+
+class UserSearchIndex:
+    """In-memory index of a tenant's users (prefix trie plus trigram vocabulary)"""
+
+    def __init__(self):
+        self._text = TextIndex()
+        self._users: Dict[int, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def load(self, users: Iterable[Dict]):
+        for user in users:
+            self.upsert(user)
+
+    def upsert(self, user: Dict):
+        terms: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            tokens = email_tokens(user.get(field)) if field == "email" else tokenize(user.get(field))
+            for token in tokens:
+                terms[token] = max(terms.get(token, 0.0), weight)
+        self._users[user["id"]] = user
+        self._text.upsert(user["id"], terms)
+
+    def remove(self, user_id: int):
+        self._users.pop(user_id, None)
+        self._text.remove(user_id)
+
+    def search(self, query: str, limit: int = 20, roles: Optional[List[str]] = None) -> Tuple[int, List[Dict]]:
+        """Ranked search; every query term must match by prefix or fuzzily"""
+        scores = self._text.scores(query)
+        if roles:
+            scores = {doc: score for doc, score in scores.items() if self._users[doc].get("rol") in roles}
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (
+                -item[1],
+                normalize(self._users[item[0]].get("apellido")),
+                normalize(self._users[item[0]].get("nombre"))
+            )
+        )
+        return len(ranked), [
+            {**self._users[user_id], "score": round(score, 3)} for user_id, score in ranked[:limit]
+        ]
+
+
+# Per-tenant indexes, built on first use and rebuilt once SEARCH_INDEX_TTL expires
+_indexes = TenantIndexes(SEARCH_INDEX_TTL)
+
+
+async def get_search_index(tenant_schema: str, load_users: Callable[[], Awaitable[List[Dict]]]) -> UserSearchIndex:
+    """Return the tenant's index, (re)building it from the usuarios table when missing or stale"""
+    async def build():
+        index = UserSearchIndex()
+        index.load(await load_users())
+        return index
+
+    return await _indexes.get(tenant_schema, build)
+
+
+def index_users(tenant_schema: str, users: Iterable[Dict]):
+    """Apply created/updated users to the index, if it has been built"""
+    users = list(users)
+    _indexes.apply(tenant_schema, lambda index: index.load(users))
+
+
+def unindex_user(tenant_schema: str, user_id: int):
+    _indexes.apply(tenant_schema, lambda index: index.remove(user_id))
+
+
+async def apply_user_event(event: Dict):
+    """EventBus subscriber: keep the tenant's index in step with Director writes"""
+    if event["type"] == USER_DELETED:
+        for user_id in event["user_ids"]:
+            unindex_user(event["tenant"], user_id)
+    else:
+        index_users(event["tenant"], event["users"])
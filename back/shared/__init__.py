@@ -0,0 +1 @@
+"""Utilidades comunes a los servicios Python (paginación y helpers de PostgREST)"""
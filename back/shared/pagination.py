@@ -0,0 +1,51 @@
+import base64
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def encode_cursor(row: Dict) -> str:
+    """Cursor opaco a partir de la última fila de la página (created_at, id)"""
+    raw = json.dumps([row["created_at"], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def keyset_params(cursor: Optional[str], limit: int, max_limit: int) -> List[Tuple[str, str]]:
+    """Parámetros PostgREST para paginar por (created_at desc, id desc); un cursor inválido lanza ValueError"""
+    params = [
+        ("order", "created_at.desc,id.desc"),
+        ("limit", str(max(1, min(limit, max_limit))))
+    ]
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        params.append(
+            ("or", f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id}))')
+        )
+    return params
+
+
+def select_param(select: Optional[str], allowed: Iterable[str]) -> str:
+    """Validar la proyección pedida; id y created_at siempre se incluyen para el cursor"""
+    if not select:
+        return "*"
+    allowed = set(allowed)
+    columnas = [c.strip() for c in select.split(",") if c.strip()]
+    invalidas = [c for c in columnas if c not in allowed]
+    if invalidas:
+        raise ValueError(f"Columnas no permitidas: {', '.join(invalidas)}")
+    for requerida in ("created_at", "id"):
+        if requerida not in columnas:
+            columnas.insert(0, requerida)
+    return ",".join(columnas)
+
+
+def next_cursor(rows: List[Dict], limit: int, max_limit: int) -> Optional[str]:
+    """Cursor de la página siguiente; None si la página vino incompleta (era la última)"""
+    return encode_cursor(rows[-1]) if rows and len(rows) >= min(limit, max_limit) else None
@@ -0,0 +1,70 @@
+import asyncio
+import httpx
+from typing import Dict, Iterable, List, Optional
+
+# Valores por filtro in.(...) para no exceder el largo de la URL
+IN_FILTER_CHUNK = 200
+
+
+def chunked(items: List, size: int = IN_FILTER_CHUNK) -> Iterable[List]:
+    """Dividir una lista en bloques de tamaño fijo"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def in_filter(values: Iterable) -> str:
+    """Construir un filtro in.(...) de PostgREST; los textos van entre comillas"""
+    parts = []
+    for value in values:
+        if isinstance(value, int):
+            parts.append(str(value))
+        else:
+            escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            parts.append(f'"{escaped}"')
+    return f"in.({','.join(parts)})"
+
+
+def content_range_total(content_range: Optional[str]) -> Optional[int]:
+    """Total de un header Content-Range de PostgREST ("0-9/42" o "*/42"); None si no viene"""
+    total = (content_range or "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+async def fetch_by_ids(client: httpx.AsyncClient, url: str, ids: Iterable, select: str,
+                       headers: Dict, column: str = "id", extra_params: Dict = None,
+                       chunk_size: int = IN_FILTER_CHUNK) -> List[Dict]:
+    """Obtener las filas de `url` cuyo `column` está en `ids`, un GET concurrente por bloque de in.(...)"""
+    unique_ids = list(dict.fromkeys(ids))
+    if not unique_ids:
+        return []
+
+    async def fetch_chunk(chunk: List) -> List[Dict]:
+        response = await client.get(
+            url,
+            params={column: in_filter(chunk), "select": select, **(extra_params or {})},
+            headers=headers
+        )
+        response.raise_for_status()
+        return response.json()
+
+    pages = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunked(unique_ids, chunk_size)))
+    return [row for page in pages for row in page]
+
+
+async def fetch_all_rows(url: str, select: str, headers: Dict, page_size: int = 1000) -> List[Dict]:
+    """Leer una tabla completa en páginas ordenadas por id (max-rows de PostgREST) con una proyección"""
+    rows: List[Dict] = []
+    offset = 0
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        while True:
+            response = await client.get(
+                url,
+                params={"select": select, "order": "id.asc", "limit": page_size, "offset": offset},
+                headers=headers
+            )
+            response.raise_for_status()
+            page = response.json()
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            offset += page_size
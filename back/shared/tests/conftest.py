@@ -0,0 +1,5 @@
+import os
+import sys
+
+# back/ aporta el paquete shared, como en los servicios
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -0,0 +1,55 @@
+import pytest
+
+from shared.pagination import decode_cursor, encode_cursor, keyset_params, next_cursor, select_param
+
+FILA = {"id": 42, "created_at": "2025-03-03T10:00:00+00:00", "nombre": "Ana"}
+
+
+def test_cursor_ida_y_vuelta():
+    assert decode_cursor(encode_cursor(FILA)) == ("2025-03-03T10:00:00+00:00", 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "no-es-base64!", encode_cursor({"id": "x", "created_at": "y"}), "WzFd"])
+def test_cursor_invalido(cursor):
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        decode_cursor(cursor)
+
+
+def test_keyset_sin_cursor_acota_el_limite():
+    assert keyset_params(None, 20, 100) == [("order", "created_at.desc,id.desc"), ("limit", "20")]
+    assert dict(keyset_params(None, 5000, 100))["limit"] == "100"
+    assert dict(keyset_params(None, 0, 100))["limit"] == "1"
+
+
+def test_keyset_con_cursor_filtra_despues_de_la_ultima_fila():
+    params = dict(keyset_params(encode_cursor(FILA), 20, 100))
+    assert params["or"] == (
+        '(created_at.lt."2025-03-03T10:00:00+00:00",'
+        'and(created_at.eq."2025-03-03T10:00:00+00:00",id.lt.42))'
+    )
+
+
+def test_keyset_con_cursor_invalido():
+    with pytest.raises(ValueError):
+        keyset_params("basura", 20, 100)
+
+
+def test_select_agrega_las_columnas_del_cursor():
+    permitidas = ("id", "created_at", "nombre", "email")
+    assert select_param(None, permitidas) == "*"
+    assert select_param("nombre, email", permitidas) == "id,created_at,nombre,email"
+    assert select_param("id,nombre,created_at", permitidas) == "id,nombre,created_at"
+
+
+def test_select_rechaza_columnas_no_permitidas():
+    with pytest.raises(ValueError, match="password"):
+        select_param("nombre,password", ("id", "created_at", "nombre"))
+
+
+def test_next_cursor_solo_con_pagina_completa():
+    filas = [{"id": i, "created_at": f"2025-03-0{i}"} for i in (3, 2, 1)]
+    assert decode_cursor(next_cursor(filas, 3, 100)) == ("2025-03-01", 1)
+    assert next_cursor(filas, 4, 100) is None
+    assert next_cursor([], 3, 100) is None
+    # Un limit mayor al máximo se acota igual que en keyset_params
+    assert next_cursor(filas, 500, 3) is not None
@@ -0,0 +1,214 @@
+import asyncio
+import re
+import time
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# Similitud mínima (Jaccard de trigramas) para aceptar un término difuso
+MIN_SIMILARITY = 0.35
+# Penalización de una coincidencia difusa frente a una por prefijo
+FUZZY_FACTOR = 0.6
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Minúsculas y sin acentos"""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "docs")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # doc_id -> mayor peso de campo en el que aparece un token con este prefijo
+        self.docs: Dict[int, float] = {}
+
+
+class TextIndex:
+    """
+    Índice de texto en memoria: trie de prefijos + vocabulario de trigramas.
+
+    Solo guarda los términos (con su peso) de cada documento; quien lo usa
+    decide qué campos indexar y cómo armar los resultados.
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._term_docs: Dict[str, Dict[int, float]] = {}
+        self._trigram_terms: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def upsert(self, doc_id: int, terms: Dict[str, float]):
+        self.remove(doc_id)
+        self._doc_terms[doc_id] = terms
+        for token, weight in terms.items():
+            self._trie_add(token, doc_id, weight)
+            docs = self._term_docs.get(token)
+            if docs is None:
+                docs = self._term_docs[token] = {}
+                for gram in trigrams(token):
+                    self._trigram_terms.setdefault(gram, set()).add(token)
+            docs[doc_id] = weight
+
+    def remove(self, doc_id: int):
+        terms = self._doc_terms.pop(doc_id, None)
+        if not terms:
+            return
+        for token in terms:
+            self._trie_remove(token, doc_id)
+            docs = self._term_docs.get(token)
+            if docs is None:
+                continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self._term_docs[token]
+                for gram in trigrams(token):
+                    grams = self._trigram_terms.get(gram)
+                    if grams is not None:
+                        grams.discard(token)
+                        if not grams:
+                            del self._trigram_terms[gram]
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """Puntaje por documento; cada término debe coincidir por prefijo o de forma difusa"""
+        tokens = tokenize(query)
+        if not tokens:
+            return {}
+
+        scores: Optional[Dict[int, float]] = None
+        for token in tokens:
+            matches = self._match_token(token)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {doc: score + matches[doc] for doc, score in scores.items() if doc in matches}
+            if not scores:
+                return {}
+        return scores
+
+    def _match_token(self, token: str) -> Dict[int, float]:
+        matches: Dict[int, float] = {}
+
+        node = self._find_node(token)
+        if node is not None:
+            for doc_id, weight in node.docs.items():
+                # Un término exacto puntúa más que un prefijo
+                exact = self._doc_terms[doc_id].get(token) == weight
+                matches[doc_id] = weight * (1.0 if exact else 0.8)
+
+        if matches or len(token) < 3:
+            return matches
+
+        # Sin coincidencias por prefijo: similitud de trigramas sobre el vocabulario
+        query_grams = trigrams(token)
+        candidates: Dict[str, int] = {}
+        for gram in query_grams:
+            for term in self._trigram_terms.get(gram, ()):
+                candidates[term] = candidates.get(term, 0) + 1
+        for term, shared in candidates.items():
+            similarity = shared / (len(query_grams) + len(trigrams(term)) - shared)
+            if similarity < MIN_SIMILARITY:
+                continue
+            for doc_id, weight in self._term_docs[term].items():
+                score = weight * similarity * FUZZY_FACTOR
+                if score > matches.get(doc_id, 0.0):
+                    matches[doc_id] = score
+        return matches
+
+    def _find_node(self, prefix: str) -> Optional[_TrieNode]:
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _trie_add(self, token: str, doc_id: int, weight: float):
+        node = self._root
+        for char in token:
+            node = node.children.setdefault(char, _TrieNode())
+            if weight > node.docs.get(doc_id, 0.0):
+                node.docs[doc_id] = weight
+
+    def _trie_remove(self, token: str, doc_id: int):
+        path = [self._root]
+        for char in token:
+            child = path[-1].children.get(char)
+            if child is None:
+                break
+            path.append(child)
+        for depth in range(len(path) - 1, 0, -1):
+            node = path[depth]
+            node.docs.pop(doc_id, None)
+            if not node.docs and not node.children:
+                del path[depth - 1].children[token[depth - 1]]
+
+
+class TenantIndexes:
+    """
+    Un índice por tenant, construido bajo demanda y reconstruido al vencer el TTL
+    (así se ven las escrituras que otros servicios hacen directo en la base).
+
+    Los cambios que llegan mientras se construye un índice se reaplican al
+    terminar; por eso cada cambio debe ser idempotente (upsert/remove del estado final).
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._items: Dict[str, Tuple[float, Any]] = {}
+        self._pending: Dict[str, List[Callable[[Any], None]]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _fresh(self, key: str) -> Optional[Any]:
+        entry = self._items.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        return None
+
+    async def get(self, key: str, build: Callable[[], Awaitable[Any]]) -> Any:
+        index = self._fresh(key)
+        if index is not None:
+            return index
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            index = self._fresh(key)
+            if index is not None:
+                return index
+
+            built_at = time.monotonic()
+            self._pending[key] = []
+            try:
+                index = await build()
+                for change in self._pending[key]:
+                    change(index)
+            finally:
+                self._pending.pop(key, None)
+            self._items[key] = (built_at, index)
+            return index
+
+    def apply(self, key: str, change: Callable[[Any], None]):
+        """Aplicar un cambio al índice vigente y guardarlo si hay una construcción en curso"""
+        entry = self._items.get(key)
+        if entry is not None:
+            change(entry[1])
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.append(change)